@@ -0,0 +1,142 @@
+import logging                         # Biblioteca de criação de logs
+import os                              # Para saber se o arquivo de log já existe
+import threading                       # Thread que escreve periodicamente o buffer no disco
+import time                            # Instante de cada requisição
+from typing import Any, Optional       # Anotações de tipo
+from Configuration import ServerConfig # Configurações do Servidor
+
+"""
+AccessLog.py
+Módulo que escreve o log de acesso do servidor, com uma linha de campos fixos por requisição
+As linhas são separadas por tab (TSV), na ordem de accessLogFields, o que facilita processar o log com outras ferramentas
+O loop principal apenas adiciona a linha a um buffer em memória, uma thread separada escreve o buffer no disco periodicamente
+Assim como o server.log, o log de acesso é aberto para adicionar linhas, então os dois logs são mantidos quando o servidor reinicia
+"""
+
+log = logging.getLogger("Main.Server.AccessLog")
+
+# Campos de cada linha do log de acesso
+accessLogFields = ["timestamp", "client", "method", "path", "status", "bytes", "duration_us", "cache", "encoding"]
+
+class AccessLogWriter():
+    """
+    Classe que guarda as linhas do log de acesso em um buffer e escreve elas no arquivo a cada flushInterval segundos
+    
+    Atributos da Classe:
+        [str] path:            Caminho do arquivo do log de acesso
+        [float] flushInterval: Intervalo em segundos entre escritas no disco
+    """
+    
+    def __init__(self, path:str, flushInterval:float) -> None:
+        self.path          = path
+        self.flushInterval = flushInterval
+        self.pending: list[str] = []
+        self.lock          = threading.Lock()
+        
+        # Arquivos novos começam com uma linha de cabeçalho com o nome dos campos
+        isNew     = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", buffering=64 * 1024, encoding="utf-8")
+        if isNew:
+            self.file.write("#" + "\t".join(accessLogFields) + "\n")
+        
+        self.stopEvent = threading.Event()
+        self.flusher   = threading.Thread(target=self.flush_periodically, name="AccessLogFlusher", daemon=True)
+        self.flusher.start()
+    
+    def write(self, line:str) -> None:
+        """
+        Método que adiciona uma linha ao buffer, sem acessar o disco
+        """
+        
+        # list.append é atômico, mas a troca do buffer em flush() precisa do lock
+        with self.lock:
+            self.pending.append(line)
+    
+    def flush(self) -> None:
+        """
+        Método que escreve no disco todas as linhas do buffer
+        """
+        
+        with self.lock:
+            lines, self.pending = self.pending, []
+        
+        if lines:
+            self.file.write("".join(lines))
+            self.file.flush()
+    
+    def flush_periodically(self) -> None:
+        """
+        Loop da thread que escreve o buffer no disco a cada flushInterval segundos
+        """
+        
+        while not self.stopEvent.wait(self.flushInterval):
+            try:
+                self.flush()
+            except OSError as err:
+                log.error("Erro ao escrever o log de acesso: %r", err)
+    
+    def close(self) -> None:
+        """
+        Método que escreve as linhas pendentes e fecha o arquivo
+        """
+        
+        self.stopEvent.set()
+        self.flusher.join()
+        self.flush()
+        self.file.close()
+
+# Log de acesso, inicializado por init_access_log
+accessLog: Optional[AccessLogWriter] = None
+
+def init_access_log(serverConfig:ServerConfig) -> None:
+    """
+    Função que abre o log de acesso, caso ele esteja habilitado nas configurações
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Nada
+    """
+    
+    global accessLog
+    
+    if not serverConfig.configValue["accessLogEnabled"]:
+        return
+    
+    try:
+        accessLog = AccessLogWriter(serverConfig.configValue["accessLogFile"], serverConfig.configValue["accessLogFlushInterval"])
+    except OSError as err:
+        log.error("Erro ao abrir o log de acesso, ele não será escrito: %r", err)
+
+def record(client:Any, method:str, path:str, status:int, sentBytes:int, durationNs:int, cache:str, encoding:str) -> None:
+    """
+    Função que registra uma requisição no log de acesso
+    
+    Recebe:
+        [Any] client:      Endereço do cliente, tupla (host, porta)
+        [str] method:      Método da requisição, "-" caso não tenha sido possível interpretar ela
+        [str] path:        Recurso requisitado, "-" caso não tenha sido possível interpretar ela
+        [int] status:      Código da resposta enviada
+        [int] sentBytes:   Número de bytes enviados
+        [int] durationNs:  Tempo de processamento da requisição em nanossegundos
+        [str] cache:       "hit", "miss" ou "-" caso a resposta não tenha passado pelo cache
+        [str] encoding:    Codificação do corpo da resposta ("gzip" ou "identity")
+    
+    Retorna:
+        Nada
+    """
+    
+    if accessLog is None:
+        return
+    
+    host = client[0] if isinstance(client, tuple) else "-"
+    accessLog.write(f"{time.time():.3f}\t{host}\t{method}\t{path}\t{status}\t{sentBytes}\t{durationNs // 1000}\t{cache}\t{encoding}\n")
+
+def close_access_log() -> None:
+    """
+    Função que escreve as linhas pendentes e fecha o log de acesso
+    """
+    
+    if accessLog is not None:
+        accessLog.close()
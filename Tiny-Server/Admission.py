@@ -0,0 +1,169 @@
+import logging                         # Biblioteca de criação de logs
+import socket                          # Sockets das conexões esperando a requisição
+import time                            # Duração das iterações do loop
+from collections import OrderedDict    # Conexões esperando a requisição, em ordem de chegada
+from typing import Any, Optional       # Anotações de tipo
+import Metrics                         # Número de conexões abertas
+import Watchdog                        # Instante em que a iteração atual do loop começou
+from Configuration import ServerConfig # Configurações do Servidor
+
+"""
+Admission.py
+Módulo que decide se o servidor está sobrecarregado e deve recusar novas requisições (load shedding)
+Sem limites, um servidor sobrecarregado apenas atrasa: as conexões aceitas se acumulam no seletor e todos os clientes
+    esperam até desistir, ao invés de alguns receberem uma resposta rápida
+São três limites, cada um desabilitado quando vale 0:
+    conexões abertas (sendo lidas, processadas ou enviadas)
+    requisições pendentes, isto é, conexões aceitas cuja requisição ainda não foi lida
+    atraso do loop principal, a duração da iteração anterior ou o tempo desde o início da atual, o que for maior
+        (uma estimativa de quanto tempo uma conexão pronta esperou até ser atendida)
+Acima de qualquer um deles, a requisição recebe imediatamente a resposta 503 pré-renderizada (com Retry-After),
+    sem que nada além da primeira linha seja interpretado e sem acessar o disco
+As requisições recusadas são contadas nas métricas por motivo
+
+Uma conexão que nunca envia a requisição (ou nunca termina o handshake TLS) ocuparia esses limites para sempre,
+    então as conexões esperando a requisição ficam em waiting, em ordem de chegada, e as que passam de
+    [Admission] read_timeout são fechadas pelo loop principal (ver expired)
+Como todas tem o mesmo tempo máximo, as que expiram primeiro são sempre as do início, então verificar é O(1) por conexão fechada
+"""
+
+log = logging.getLogger("Main.Server.Admission")
+
+class PendingRequest():
+    """
+    Classe que representa uma conexão aceita cuja requisição ainda não foi lida, usada como dado da socket no seletor
+    
+    Atributos da Classe:
+        [Any]   address:  Endereço do cliente, como retornado por accept()
+        [float] accepted: Instante em que a conexão foi aceita (time.monotonic)
+    """
+    
+    __slots__ = ("address", "accepted")
+    
+    def __init__(self, address:Any, accepted:float) -> None:
+        self.address  = address
+        self.accepted = accepted
+
+# Estado atualizado pelo loop principal
+# Conexões aceitas cuja requisição ainda não foi lida (ou cujo handshake TLS não terminou) -> dado da socket no seletor,
+#   com o instante em que a conexão foi aceita (PendingRequest ou TLS.Handshake), em ordem de chegada
+waiting: "OrderedDict[socket.socket, Any]" = OrderedDict()
+lastIteration = 0.0 # Duração em segundos da iteração anterior do loop, sem contar a espera no select()
+shedding: Optional[str] = None # Motivo da sobrecarga atual, None enquanto o servidor não está recusando requisições
+
+def accepted(clientSocket:socket.socket, data:Any) -> None:
+    """
+    Função que registra uma conexão aceita, que passa a esperar a requisição
+    
+    Recebe:
+        [socket] clientSocket: Socket do cliente
+        [Any] data:            Dado da socket no seletor, com o atributo accepted
+    
+    Retorna:
+        Nada
+    """
+    
+    waiting[clientSocket] = data
+
+def answered(clientSocket:socket.socket) -> None:
+    """
+    Função que remove uma conexão da espera, quando a requisição foi lida ou a conexão foi fechada
+    """
+    
+    waiting.pop(clientSocket, None)
+
+def expired(serverConfig:ServerConfig, now:float) -> "list[socket.socket]":
+    """
+    Função que remove da espera as conexões que passaram do tempo máximo para enviar a requisição
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+        [float] now:                 Instante atual (time.monotonic)
+    
+    Retorna:
+        As sockets das conexões expiradas, que devem ser fechadas pelo loop principal
+    """
+    
+    readTimeout = serverConfig.configValue["admissionReadTimeout"]
+    if readTimeout <= 0:
+        return []
+    
+    sockets = []
+    while waiting:
+        clientSocket, data = next(iter(waiting.items()))
+        if now - data.accepted < readTimeout:
+            break
+        waiting.popitem(last=False)
+        sockets.append(clientSocket)
+    
+    return sockets
+
+def next_expiration(serverConfig:ServerConfig, now:float) -> Optional[float]:
+    """
+    Função que retorna em quantos segundos a próxima conexão esperando a requisição expira, None caso nenhuma expire
+    Usada como tempo máximo de espera do select(), para que as conexões paradas sejam fechadas mesmo sem outras conexões chegando
+    """
+    
+    readTimeout = serverConfig.configValue["admissionReadTimeout"]
+    if readTimeout <= 0 or not waiting:
+        return None
+    
+    oldest = next(iter(waiting.values()))
+    return max(0.0, oldest.accepted + readTimeout - now)
+
+def end_iteration() -> None:
+    """
+    Função chamada pelo loop principal antes de esperar no select(), guarda a duração da iteração que terminou
+    """
+    
+    global lastIteration
+    
+    since = Watchdog.busySince
+    lastIteration = time.monotonic() - since if since != 0.0 else 0.0
+
+def loop_lag() -> float:
+    """
+    Função que estima o atraso do loop principal em segundos
+    """
+    
+    since = Watchdog.busySince
+    current = time.monotonic() - since if since != 0.0 else 0.0
+    
+    return max(lastIteration, current)
+
+def overload_reason(serverConfig:ServerConfig) -> Optional[str]:
+    """
+    Função que verifica os limites de admissão antes de uma requisição ser lida
+    Registra no log quando a sobrecarga começa, muda de motivo ou termina, e não a cada requisição recusada
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        O motivo pelo qual a requisição deve ser recusada (ver Metrics.shedRequests), ou None caso ela possa ser atendida
+    """
+    
+    global shedding
+    
+    config = serverConfig.configValue
+    reason = None
+    
+    maxConnections = config["admissionMaxConnections"]
+    maxPending     = config["admissionMaxPending"]
+    maxLag         = config["admissionMaxLag"]
+    
+    if maxConnections > 0 and Metrics.connectionsAccepted - Metrics.connectionsClosed > maxConnections:
+        reason = "connections"
+    elif maxPending > 0 and len(waiting) > maxPending:
+        reason = "pending"
+    elif maxLag > 0 and loop_lag() > maxLag:
+        reason = "lag"
+    
+    if reason != shedding:
+        if reason is None:
+            log.info("Fim da sobrecarga (%s), aceitando requisições novamente", shedding)
+        else:
+            log.warning("Servidor sobrecarregado (%s), recusando novas requisições com 503", reason)
+        shedding = reason
+    
+    return reason
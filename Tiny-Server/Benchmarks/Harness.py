@@ -0,0 +1,336 @@
+import json                   # Resultados dos benchmarks
+import os                     # Caminhos e informações do processo do servidor
+import platform               # Informações da máquina, guardadas junto com os resultados
+import random                 # Escolha da porta do servidor
+import socket                 # Requisições ao servidor e espera pela inicialização
+import subprocess             # Processo do servidor e commit atual
+import sys                    # Interpretador usado para executar o servidor
+import tempfile               # Pasta temporária com a configuração e os logs do servidor
+import time                   # Espera pelo servidor
+import tomllib                # Leitura do arquivo de configurações
+from typing import Any, Optional # Anotações de tipo
+
+"""
+Harness.py
+Funções usadas pelos benchmarks do servidor (LoadTest.py, Replay.py)
+    ServerProcess: inicia o Main.py em uma porta aleatória, com uma cópia do config.toml onde é possível alterar configurações,
+        opcionalmente também escutando em uma socket Unix, e mede o uso de CPU e memória do processo do servidor
+    fetch: faz uma requisição ao servidor (por TCP ou pela socket Unix) e lê a resposta inteira
+    percentile / summarize: estatísticas das latências medidas
+    save_results: escreve os resultados em JSON, junto com informações do commit e da máquina, para comparar execuções
+"""
+
+# Pasta do servidor (Tiny-Server/), onde o Main.py precisa ser executado
+serverDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def toml_value(value:Any) -> str:
+    """
+    Função que formata um valor Python como um valor TOML
+    Suporta apenas os tipos usados no config.toml (bool, int, float, str e listas deles)
+    """
+    
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(toml_value(item) for item in value) + "]"
+    # As strings básicas do TOML usam os mesmos escapes que o JSON
+    return json.dumps(str(value))
+
+def dump_toml(config:"dict[str, Any]") -> str:
+    """
+    Função que gera um arquivo TOML a partir de um dict de configurações, com um nível de tabelas
+    Listas de tabelas (ex: [[Listeners]]) são escritas como uma tabela [[nome]] para cada item
+    """
+    
+    isTableList = lambda value: isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+    
+    lines = [f"{key} = {toml_value(value)}" for key, value in config.items() if not isinstance(value, dict) and not isTableList(value)]
+    for table, values in config.items():
+        if isinstance(values, dict):
+            lines.append(f"\n[{table}]")
+            lines.extend(f"{key} = {toml_value(value)}" for key, value in values.items())
+        elif isTableList(values):
+            for item in values:
+                lines.append(f"\n[[{table}]]")
+                lines.extend(f"{key} = {toml_value(value)}" for key, value in item.items())
+    
+    return "\n".join(lines) + "\n"
+
+def parse_override(override:str) -> "tuple[Optional[str], str, Any]":
+    """
+    Função que interpreta uma alteração de configuração no formato Tabela.chave=valor (ou chave=valor)
+    O valor é interpretado como TOML, e como string caso não seja um valor TOML válido
+    
+    Retorna:
+        Uma tupla (tabela ou None, chave, valor)
+    """
+    
+    name, _, rawValue = override.partition("=")
+    table, _, key = name.strip().rpartition(".")
+    
+    try:
+        value = tomllib.loads(f"value = {rawValue.strip()}")["value"]
+    except tomllib.TOMLDecodeError:
+        value = rawValue.strip()
+    
+    return (table or None, key, value)
+
+def free_port() -> int:
+    """
+    Função que escolhe uma porta livre para o servidor
+    O Main.py só aceita portas abaixo de 32720, então não é possível usar a porta efêmera escolhida pelo sistema
+    """
+    
+    while True:
+        port = random.randint(20000, 32000)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            try:
+                probe.bind(("127.0.0.1", port))
+            except OSError:
+                continue
+        return port
+
+class ServerProcess():
+    """
+    Classe que representa um processo do servidor iniciado para um benchmark
+    O servidor usa uma cópia do config.toml (com as alterações pedidas) e escreve seus logs em uma pasta temporária
+    
+    Atributos da Classe:
+        [int]  port:      Porta onde o servidor está escutando
+        [str]  unixPath:  Socket Unix onde o servidor também está escutando, None caso unix seja False
+        [dict] overrides: Alterações feitas no config.toml, "Tabela.chave" -> valor
+    """
+    
+    def __init__(self, overrides:"list[str]", configPath:Optional[str]=None, unix:bool=False) -> None:
+        self.port    = free_port()
+        self.tempDir = tempfile.TemporaryDirectory(prefix="tiny-bench-")
+        self.unixPath: Optional[str] = None
+        
+        with open(configPath or os.path.join(serverDir, "config.toml"), "rb") as fp:
+            config = tomllib.load(fp)
+        
+        # Os logs do servidor não devem se misturar com os logs da pasta do servidor
+        config.setdefault("Logging", {})["file"]   = os.path.join(self.tempDir.name, "server.log")
+        config.setdefault("AccessLog", {})["file"] = os.path.join(self.tempDir.name, "access.log")
+        
+        # A socket TCP continua existindo, é por ela que o início do servidor é detectado
+        if unix:
+            self.unixPath = os.path.join(self.tempDir.name, "http.sock")
+            config["Listeners"] = [{"type": "tcp"}, {"type": "unix", "path": self.unixPath, "mode": 0o600}]
+        
+        self.overrides: "dict[str, Any]" = dict()
+        for override in overrides:
+            table, key, value = parse_override(override)
+            if table is None:
+                config[key] = value
+            else:
+                config.setdefault(table, {})[key] = value
+            self.overrides[f"{table}.{key}" if table else key] = value
+        
+        self.configPath = os.path.join(self.tempDir.name, "config.toml")
+        with open(self.configPath, "w", encoding="utf-8") as fp:
+            fp.write(dump_toml(config))
+        
+        self.process: Optional[subprocess.Popen] = None
+    
+    def __enter__(self) -> "ServerProcess":
+        self.start()
+        return self
+    
+    def __exit__(self, *args:Any) -> None:
+        self.stop()
+    
+    def start(self, timeout:float=10.0) -> None:
+        """
+        Método que inicia o servidor e espera até ele aceitar conexões
+        """
+        
+        self.process = subprocess.Popen(
+            [sys.executable, "Main.py", str(self.port), self.configPath],
+            cwd=serverDir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"O servidor encerrou durante a inicialização (código {self.process.returncode})")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return
+            except OSError:
+                time.sleep(0.05)
+        
+        self.stop()
+        raise RuntimeError(f"O servidor não aceitou conexões em {timeout} segundos")
+    
+    def stop(self) -> None:
+        """
+        Método que encerra o servidor (SIGTERM) e remove a pasta temporária
+        """
+        
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        
+        self.tempDir.cleanup()
+    
+    def resource_usage(self) -> "dict[str, Optional[float]]":
+        """
+        Método que retorna o tempo de CPU e a memória usados pelo processo do servidor até o momento
+        Os valores são lidos do /proc, então são None em sistemas que não tem /proc
+        
+        Retorna:
+            Um dict com cpu_seconds, rss_bytes e peak_rss_bytes
+        """
+        
+        usage: "dict[str, Optional[float]]" = {"cpu_seconds": None, "rss_bytes": None, "peak_rss_bytes": None}
+        if self.process is None:
+            return usage
+        
+        try:
+            with open(f"/proc/{self.process.pid}/stat") as fp:
+                # O nome do processo (2º campo) pode ter espaços, então os campos são contados a partir do ")"
+                fields = fp.read().rpartition(")")[2].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            usage["cpu_seconds"] = (int(fields[11]) + int(fields[12])) / ticks
+            
+            with open(f"/proc/{self.process.pid}/status") as fp:
+                for line in fp:
+                    if line.startswith("VmRSS:"):
+                        usage["rss_bytes"] = int(line.split()[1]) * 1024
+                    elif line.startswith("VmHWM:"):
+                        usage["peak_rss_bytes"] = int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        
+        return usage
+
+def connect(host:str, port:int, timeout:float, unixPath:Optional[str]=None) -> socket.socket:
+    """
+    Função que abre uma conexão com o servidor, pela socket Unix caso unixPath seja informado e por TCP caso contrário
+    """
+    
+    if unixPath is None:
+        return socket.create_connection((host, port), timeout=timeout)
+    
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(unixPath)
+    except OSError:
+        connection.close()
+        raise
+    
+    return connection
+
+def fetch(host:str, port:int, method:str, path:str, gzip:bool, timeout:float, userAgent:str="tiny-benchmark",
+          unixPath:Optional[str]=None) -> "tuple[int, int]":
+    """
+    Função que faz uma requisição ao servidor e lê a resposta inteira
+    Cada requisição usa uma conexão nova, já que o servidor fecha a conexão depois de cada resposta
+    Com unixPath, a conexão é feita pela socket Unix do servidor ao invés de TCP
+    
+    Retorna:
+        Uma tupla com o código de resposta (0 caso a resposta não possa ser interpretada) e o número de bytes recebidos
+    """
+    
+    request = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {userAgent}\r\n"
+    if gzip:
+        request += "Accept-Encoding: gzip\r\n"
+    request += "\r\n"
+    
+    received = 0
+    head = b""
+    with connect(host, port, timeout, unixPath) as connection:
+        connection.sendall(request.encode("ascii"))
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            if len(head) < 16:
+                head += chunk[:16]
+            received += len(chunk)
+    
+    # Primeira linha: HTTP/1.1 200 OK
+    try:
+        status = int(head.split(b" ", 2)[1])
+    except (IndexError, ValueError):
+        status = 0
+    
+    return (status, received)
+
+def percentile(sortedValues:"list[float]", fraction:float) -> float:
+    """
+    Função que calcula um percentil (pelo método do posto mais próximo) de uma lista já ordenada
+    """
+    
+    if not sortedValues:
+        return 0.0
+    rank = max(int(round(fraction * len(sortedValues) + 0.5)) - 1, 0)
+    return sortedValues[min(rank, len(sortedValues) - 1)]
+
+def summarize(latencies:"list[float]") -> "dict[str, float]":
+    """
+    Função que resume uma lista de latências em segundos nos percentis usados nos relatórios (em milissegundos)
+    """
+    
+    ordered = sorted(latencies)
+    return {
+        "p50_ms":  percentile(ordered, 0.50) * 1000,
+        "p95_ms":  percentile(ordered, 0.95) * 1000,
+        "p99_ms":  percentile(ordered, 0.99) * 1000,
+        "max_ms":  (ordered[-1] if ordered else 0.0) * 1000,
+        "mean_ms": (sum(ordered) / len(ordered) if ordered else 0.0) * 1000,
+    }
+
+def git_commit() -> Optional[str]:
+    """
+    Função que retorna o commit atual do repositório, ou None caso não seja possível descobrir
+    """
+    
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=serverDir, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def save_results(kind:str, results:"dict[str, Any]", outputPath:Optional[str]=None) -> str:
+    """
+    Função que escreve os resultados de um benchmark em JSON, junto com o commit e informações da máquina
+    
+    Recebe:
+        [str] kind:        Tipo do benchmark, usado no nome padrão do arquivo
+        [dict] results:    Os resultados do benchmark
+        [str] outputPath:  Caminho do arquivo, por padrão Benchmarks/results/<kind>-<data>-<commit>.json
+    
+    Retorna:
+        O caminho do arquivo escrito
+    """
+    
+    commit = git_commit()
+    document = {
+        "kind":      kind,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit":    commit,
+        "python":    platform.python_version(),
+        "platform":  platform.platform(),
+        "cpus":      os.cpu_count(),
+        **results,
+    }
+    
+    if outputPath is None:
+        resultsDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+        os.makedirs(resultsDir, exist_ok=True)
+        outputPath = os.path.join(resultsDir, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nocommit'}.json")
+    
+    with open(outputPath, "w", encoding="utf-8") as fp:
+        json.dump(document, fp, indent=2, ensure_ascii=False)
+        fp.write("\n")
+    
+    return outputPath
@@ -0,0 +1,266 @@
+import argparse               # Argumentos de linha de comando
+import itertools              # Sequência de URLs de cada cliente
+import random                 # Ordem das URLs de cada cliente
+import threading              # Clientes concorrentes
+import time                   # Duração do teste e latências
+from typing import Any, Optional # Anotações de tipo
+import Harness                # Processo do servidor, estatísticas e resultados
+
+"""
+LoadTest.py
+Teste de carga do servidor usando o conteúdo da pasta Content/
+Inicia o Main.py em uma porta aleatória e mantém N clientes concorrentes fazendo requisições durante um tempo fixo
+Cada requisição usa uma conexão nova, já que o servidor fecha a conexão depois de cada resposta
+
+Reporta requisições por segundo, latências (p50/p95/p99), bytes por segundo, erros e uso de CPU/memória do servidor,
+    no total e por URL, e escreve os resultados em Benchmarks/results/ em JSON para comparar commits e configurações
+
+Uso (dentro de Tiny-Server/):
+    python Benchmarks/LoadTest.py [-c CONCORRENCIA] [-d SEGUNDOS] [--mix html=4,css=2,...] [--gzip] [--set Tabela.chave=valor ...]
+    
+    Exemplos:
+        python Benchmarks/LoadTest.py -c 16 -d 20
+        python Benchmarks/LoadTest.py --set Cache.enabled=false --label sem-cache
+        python Benchmarks/LoadTest.py --mix pdf=1 --gzip
+        python Benchmarks/LoadTest.py --url big=/assets/big.pdf --mix html=4,css=1 --background big=2 --set Transfer.quantum_bytes=0
+        python Benchmarks/LoadTest.py --transport both --mix html=1
+
+Com --background, clientes extras fazem apenas requisições de uma URL (ex: downloads grandes contínuos),
+    para medir a latência das URLs do --mix enquanto o servidor também atende essas requisições
+Com --transport unix, os clientes se conectam por uma socket Unix (como um proxy reverso na mesma máquina) ao invés do TCP do loopback,
+    e com --transport both o teste é executado nos dois, um depois do outro no mesmo servidor, para comparar as latências
+"""
+
+# URLs representativas do conteúdo, nome -> (caminho, código de resposta esperado)
+targets = {
+    "html":    ("/about/index.html", 200),
+    "css":     ("/assets/css/main.css", 200),
+    "favicon": ("/assets/favicon.ico", 200),
+    "pdf":     ("/assets/CV-EN.pdf", 200),
+    "404":     ("/nao-existe.html", 404),
+    "403":     ("/run_server.sh", 403),
+}
+
+defaultMix = "html=4,css=2,favicon=1,pdf=1,404=1,403=1"
+
+def add_target(definition:str) -> None:
+    """
+    Função que adiciona uma URL às URLs do teste, no formato nome=caminho ou nome=caminho:código esperado
+    """
+    
+    name, _, target = definition.partition("=")
+    path, _, status = target.rpartition(":") if target.rpartition(":")[2].isdigit() else (target, "", "200")
+    if not name.strip() or not path.startswith("/"):
+        raise SystemExit(f"URL inválida \"{definition}\", o formato é nome=/caminho[:código]")
+    targets[name.strip()] = (path, int(status))
+
+def parse_mix(mix:str) -> "list[str]":
+    """
+    Função que interpreta a proporção das URLs (nome=peso,...) e retorna a lista de nomes repetidos de acordo com o peso
+    """
+    
+    names = []
+    for entry in mix.split(","):
+        name, _, weight = entry.partition("=")
+        name = name.strip()
+        if name not in targets:
+            raise SystemExit(f"URL desconhecida \"{name}\", as URLs disponíveis são: {', '.join(targets)}")
+        names.extend([name] * int(weight or 1))
+    
+    return names
+
+class Client(threading.Thread):
+    """
+    Classe que representa um cliente do teste de carga, que faz requisições em sequência até o fim do teste
+    Os resultados só são registrados depois do aquecimento (recordAfter)
+    """
+    
+    def __init__(self, port:int, names:"list[str]", gzip:bool, timeout:float, recordAfter:float, stopAt:float, unixPath:Optional[str]=None) -> None:
+        super().__init__(daemon=True)
+        
+        self.port        = port
+        self.unixPath    = unixPath
+        self.gzip        = gzip
+        self.timeout     = timeout
+        self.recordAfter = recordAfter
+        self.stopAt      = stopAt
+        
+        # Cada cliente percorre as URLs em uma ordem diferente, para não sincronizar os clientes na mesma URL
+        shuffled = names[:]
+        random.shuffle(shuffled)
+        self.names = itertools.cycle(shuffled)
+        
+        # Resultados por URL
+        self.latencies: "dict[str, list[float]]" = {name: [] for name in targets}
+        self.bytes:     "dict[str, int]"         = {name: 0 for name in targets}
+        self.errors:    "dict[str, int]"         = {name: 0 for name in targets}
+    
+    def run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            if start >= self.stopAt:
+                return
+            
+            name = next(self.names)
+            path, expected = targets[name]
+            try:
+                status, received = Harness.fetch("127.0.0.1", self.port, "GET", path, self.gzip, self.timeout, unixPath=self.unixPath)
+                failed = status != expected
+            except OSError:
+                received, failed = 0, True
+            elapsed = time.perf_counter() - start
+            
+            if start < self.recordAfter:
+                continue
+            
+            self.latencies[name].append(elapsed)
+            self.bytes[name] += received
+            if failed:
+                self.errors[name] += 1
+
+def run_load(port:int, concurrency:int, duration:float, warmup:float, names:"list[str]", gzip:bool, timeout:float,
+             background:"list[str]"=[], unixPath:Optional[str]=None) -> "dict[str, Any]":
+    """
+    Função que executa o teste de carga contra um servidor já iniciado
+    Além dos clientes que seguem a proporção das URLs, cada nome em background é um cliente que só requisita aquela URL
+    Com unixPath, os clientes se conectam pela socket Unix do servidor
+    
+    Retorna:
+        Os resultados agregados, no total e por URL
+    """
+    
+    now         = time.perf_counter()
+    recordAfter = now + warmup
+    stopAt      = recordAfter + duration
+    
+    clients  = [Client(port, names, gzip, timeout, recordAfter, stopAt, unixPath) for _ in range(concurrency)]
+    clients += [Client(port, [name], gzip, timeout, recordAfter, stopAt, unixPath) for name in background]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    
+    perUrl: "dict[str, Any]" = dict()
+    allLatencies: "list[float]" = []
+    totalBytes  = 0
+    totalErrors = 0
+    for name in sorted(set(names) | set(background)):
+        latencies = [latency for client in clients for latency in client.latencies[name]]
+        sent      = sum(client.bytes[name] for client in clients)
+        errors    = sum(client.errors[name] for client in clients)
+        
+        perUrl[name] = {
+            "path":     targets[name][0],
+            "requests": len(latencies),
+            "errors":   errors,
+            "rps":      len(latencies) / duration,
+            "bytes_per_second": sent / duration,
+            **Harness.summarize(latencies),
+        }
+        
+        allLatencies.extend(latencies)
+        totalBytes  += sent
+        totalErrors += errors
+    
+    return {
+        "requests": len(allLatencies),
+        "errors":   totalErrors,
+        "rps":      len(allLatencies) / duration,
+        "bytes_per_second": totalBytes / duration,
+        **Harness.summarize(allLatencies),
+        "urls":     perUrl,
+    }
+
+def print_report(results:"dict[str, Any]") -> None:
+    """
+    Função que imprime os resultados do teste de carga em uma tabela
+    """
+    
+    header = f"{'URL':<10}{'req':>8}{'err':>6}{'rps':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KB/s':>11}"
+    print(header)
+    print("-" * len(header))
+    
+    rows = list(results["urls"].items()) + [("total", results)]
+    for name, row in rows:
+        print(f"{name:<10}{row['requests']:>8}{row['errors']:>6}{row['rps']:>10.1f}{row['p50_ms']:>9.2f}"
+              f"{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['bytes_per_second'] / 1024:>11.1f}")
+
+def main() -> None:
+    """
+    Função principal, que processa os argumentos, inicia o servidor, executa o teste e escreve os resultados
+    """
+    
+    parser = argparse.ArgumentParser(description="Teste de carga do migs' HTTP Server")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Número de clientes concorrentes")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="Duração do teste em segundos")
+    parser.add_argument("-w", "--warmup", type=float, default=1.0, help="Aquecimento em segundos, não entra nos resultados")
+    parser.add_argument("--mix", default=defaultMix, help=f"Proporção das URLs, padrão {defaultMix}")
+    parser.add_argument("--background", default="", help="Clientes extras por URL (nome=clientes,...) que só requisitam essa URL")
+    parser.add_argument("--url", action="append", default=[], metavar="NOME=/CAMINHO[:CÓDIGO]", help="Adiciona uma URL que pode ser usada no --mix")
+    parser.add_argument("--gzip", action="store_true", help="Envia Accept-Encoding: gzip nas requisições")
+    parser.add_argument("--transport", choices=["tcp", "unix", "both"], default="tcp", help="Como os clientes se conectam ao servidor")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Tempo máximo de cada requisição em segundos")
+    parser.add_argument("--config", help="Arquivo de configurações base, padrão config.toml")
+    parser.add_argument("--set", action="append", default=[], metavar="TABELA.CHAVE=VALOR", help="Altera uma configuração do servidor")
+    parser.add_argument("--label", default="", help="Nome da execução, guardado nos resultados")
+    parser.add_argument("-o", "--output", help="Arquivo JSON de resultados, padrão Benchmarks/results/")
+    args = parser.parse_args()
+    
+    for definition in args.url:
+        add_target(definition)
+    names      = parse_mix(args.mix)
+    background = parse_mix(args.background) if args.background else []
+    
+    transports = ["tcp", "unix"] if args.transport == "both" else [args.transport]
+    
+    runs: "dict[str, dict[str, Any]]" = dict()
+    with Harness.ServerProcess(args.set, args.config, unix="unix" in transports) as server:
+        print(f"Servidor iniciado na porta {server.port}, {args.concurrency} clientes (+{len(background)} em background) por {args.duration}s")
+        
+        for transport in transports:
+            unixPath = server.unixPath if transport == "unix" else None
+    
+            before  = server.resource_usage()
+            results = run_load(server.port, args.concurrency, args.duration, args.warmup, names, args.gzip, args.timeout, background, unixPath)
+            after   = server.resource_usage()
+    
+            if before["cpu_seconds"] is not None and after["cpu_seconds"] is not None:
+                cpuSeconds = after["cpu_seconds"] - before["cpu_seconds"]
+                results["server"] = {
+                    "cpu_seconds":    cpuSeconds,
+                    # Inclui o aquecimento, então é uma estimativa um pouco acima do uso real durante o teste
+                    "cpu_percent":    100 * cpuSeconds / (args.duration + args.warmup),
+                    "rss_bytes":      after["rss_bytes"],
+                    "peak_rss_bytes": after["peak_rss_bytes"],
+                }
+            runs[transport] = results
+    
+    for transport, results in runs.items():
+        if len(runs) > 1:
+            print(f"\n[{transport}]")
+        print_report(results)
+        if "server" in results:
+            print(f"\nServidor: {results['server']['cpu_percent']:.1f}% CPU, RSS {(results['server']['rss_bytes'] or 0) / 2**20:.1f} MiB")
+    
+    if len(runs) > 1:
+        tcp, unix = runs["tcp"], runs["unix"]
+        print(f"\nunix/tcp: p50 {unix['p50_ms'] / tcp['p50_ms']:.2f}x, p99 {unix['p99_ms'] / tcp['p99_ms']:.2f}x, rps {unix['rps'] / tcp['rps']:.2f}x")
+    
+    outputPath = Harness.save_results("loadtest", {
+        "label":       args.label,
+        "concurrency": args.concurrency,
+        "duration":    args.duration,
+        "warmup":      args.warmup,
+        "mix":         args.mix,
+        "background":  args.background,
+        "extra_urls":  args.url,
+        "gzip":        args.gzip,
+        "overrides":   server.overrides,
+        "transport":   args.transport,
+        # Com --transport both, os resultados de cada transporte
+        "results":     runs if len(runs) > 1 else runs[transports[0]],
+    }, args.output)
+    print(f"Resultados escritos em {outputPath}")
+
+if __name__ == "__main__":
+    main()
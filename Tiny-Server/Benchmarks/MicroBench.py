@@ -0,0 +1,330 @@
+import argparse               # Argumentos de linha de comando
+import gc                     # Coleta de lixo desligada durante as medições
+import json                   # Leitura de resultados anteriores para comparação
+import logging                # Para silenciar os logs do servidor
+import os                     # Pasta do servidor e descarte de páginas do cache do sistema
+import statistics             # Mediana e quartis
+import sys                    # Caminho de importação dos módulos do servidor
+import time                   # perf_counter_ns
+import tracemalloc            # Memória alocada por chamada
+from typing import Any, Callable, Optional # Anotações de tipo
+import Harness                # Pasta do servidor e escrita dos resultados
+
+"""
+MicroBench.py
+Micro-benchmarks das funções do caminho crítico de uma requisição, medidas isoladamente:
+    Construtor de Request com cabeçalhos reais de um navegador
+    Escolha da rota na tabela de rotas (Router.py)
+    Interpretação do alvo das requisições (Target.py), sem e com decodificação e query
+    Conta do balde de fichas de um cliente (RateLimit.py)
+    Response.createResponse + prepareResponse para cada método
+    formatResponse de corpos texto e binários
+    ContentHandler.get_resource com o cache quente, com o cache de conteúdo frio e com o cache de páginas do sistema frio
+    Geração de respostas de erro, incluindo as respostas de sobrecarga (503 e 429)
+
+Cada caso é aquecido e medido várias vezes (repetições), o resultado de cada repetição é o tempo médio por chamada
+Os relatórios usam a mediana e o intervalo interquartil (IQR) das repetições, que são menos sensíveis a ruído que a média
+A coleta de lixo é desligada durante as medições
+Com --memory, também mede com tracemalloc a memória alocada por chamada (pico durante a chamada e memória retida pelo resultado)
+
+Uso (dentro de Tiny-Server/):
+    python Benchmarks/MicroBench.py [-r REPETICOES] [-n CHAMADAS] [-k FILTRO] [--memory] [--compare resultados-anteriores.json]
+"""
+
+# Os módulos do servidor usam caminhos relativos à pasta do servidor (json/, config.toml, ../Content)
+os.chdir(Harness.serverDir)
+sys.path.insert(0, Harness.serverDir)
+
+import Configuration                                  # Configurações do Servidor
+import ContentHandler                                 # Índice e cache de conteúdo
+import Exceptions                                     # Exceções HTTP das respostas de erro
+import RateLimit                                      # Baldes de fichas dos clientes
+import ResponseHandler                                # Pré-renderização das respostas de erro
+import Router                                         # Tabela de rotas
+import Server                                         # Códigos de resposta e tipos MIME
+import Target                                         # Interpretação do alvo das requisições
+from RequestHandler import Request                    # Módulo de Requisições HTTP
+from ResponseHandler import Response, ErrorResponse   # Módulo de Respostas HTTP
+
+# Cabeçalhos enviados pelo Chrome ao abrir uma página
+browserHeaders = (
+    b"Host: localhost:9999\r\n"
+    b"Connection: keep-alive\r\n"
+    b"sec-ch-ua: \"Chromium\";v=\"124\", \"Google Chrome\";v=\"124\", \"Not-A.Brand\";v=\"99\"\r\n"
+    b"sec-ch-ua-mobile: ?0\r\n"
+    b"sec-ch-ua-platform: \"Linux\"\r\n"
+    b"Upgrade-Insecure-Requests: 1\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36\r\n"
+    b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8\r\n"
+    b"Sec-Fetch-Site: none\r\n"
+    b"Sec-Fetch-Mode: navigate\r\n"
+    b"Sec-Fetch-User: ?1\r\n"
+    b"Sec-Fetch-Dest: document\r\n"
+    b"Accept-Encoding: gzip, deflate, br, zstd\r\n"
+    b"Accept-Language: pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7\r\n"
+    b"\r\n"
+)
+
+class Case():
+    """
+    Classe que representa um caso de micro-benchmark
+    
+    Atributos da Classe:
+        [str]      name:  Nome do caso
+        [Callable] func:  Função medida
+        [Callable] setup: Preparação executada antes de cada chamada, fora da medição (None para medir as chamadas em lote)
+    """
+    
+    def __init__(self, name:str, func:Callable[[], Any], setup:Optional[Callable[[], Any]]=None) -> None:
+        self.name  = name
+        self.func  = func
+        self.setup = setup
+    
+    def run_once(self, number:int) -> float:
+        """
+        Método que executa uma repetição do caso
+        
+        Retorna:
+            O tempo médio por chamada em nanossegundos
+        """
+        
+        func = self.func
+        if self.setup is None:
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                func()
+            return (time.perf_counter_ns() - start) / number
+        
+        # Com preparação, cada chamada é medida individualmente para deixar a preparação fora da medição
+        total = 0
+        for _ in range(number):
+            self.setup()
+            start = time.perf_counter_ns()
+            func()
+            total += time.perf_counter_ns() - start
+        return total / number
+    
+    def measure(self, repeat:int, number:int, warmup:int) -> "dict[str, float]":
+        """
+        Método que aquece e mede o caso
+        
+        Retorna:
+            As estatísticas das repetições, em nanossegundos por chamada
+        """
+        
+        for _ in range(warmup):
+            self.run_once(number)
+        
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            samples = [self.run_once(number) for _ in range(repeat)]
+        finally:
+            if gcEnabled:
+                gc.enable()
+        
+        q1, median, q3 = statistics.quantiles(samples, n=4, method="inclusive")
+        return {
+            "median_ns": median,
+            "iqr_ns":    q3 - q1,
+            "min_ns":    min(samples),
+            "max_ns":    max(samples),
+            "ops_per_second": 1e9 / median if median > 0 else 0.0,
+            "repeat":    repeat,
+            "number":    number,
+        }
+
+    def measure_memory(self, number:int) -> "dict[str, float]":
+        """
+        Método que mede com tracemalloc a memória alocada por chamada
+        O pico é a maior quantidade de memória alocada durante uma chamada, a memória retida é o tamanho do resultado
+            da chamada (ex: os objetos de requisição e resposta), medida mantendo os resultados de várias chamadas
+        A memória retida não é medida em casos com preparação, pois a preparação libera memória (ex: entradas do cache)
+        
+        Retorna:
+            A mediana do pico e a média da memória retida, em bytes por chamada
+        """
+        
+        func = self.func
+        retained = None
+        
+        tracemalloc.start()
+        try:
+            peaks = []
+            for _ in range(number):
+                if self.setup is not None:
+                    self.setup()
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                func()
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            
+            if self.setup is None:
+                results = [None] * number # Alocada antes da medição, para não entrar na memória retida
+                before  = tracemalloc.get_traced_memory()[0]
+                for index in range(number):
+                    results[index] = func()
+                retained = (tracemalloc.get_traced_memory()[0] - before) / number
+                del results
+        finally:
+            tracemalloc.stop()
+        
+        return {"alloc_peak_bytes": statistics.median(peaks), "alloc_retained_bytes": retained}
+
+def evict_page_cache(path:str) -> None:
+    """
+    Função que pede ao sistema para descartar as páginas de um arquivo do cache de páginas
+    Só tem efeito em sistemas com posix_fadvise, e apenas se as páginas não estiverem sujas
+    """
+    
+    if not hasattr(os, "posix_fadvise"):
+        return
+    
+    for candidate in (path, path + ".gz"):
+        try:
+            fd = os.open(candidate, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def build_cases() -> "list[Case]":
+    """
+    Função que inicializa o servidor (configurações, índice e cache de conteúdo, respostas de erro) e monta os casos
+    """
+    
+    serverConfig = Configuration.ServerConfig()
+    responses, types = Server.load_json_data()
+    Router.init_router(serverConfig)
+    
+    # O índice e o cache são usados, mas o observador não precisa ficar executando
+    watcher = ContentHandler.init_content(serverConfig)
+    if watcher is not None:
+        watcher.stop()
+    ResponseHandler.prerender_errors(serverConfig, responses, types)
+    
+    contentRoot = serverConfig.configValue["contentRoot"]
+    
+    def request(startLine:str) -> Request:
+        return Request(startLine, browserHeaders, b"", serverConfig, 0)
+    
+    def respond(startLine:str) -> Any:
+        response = Response.createResponse(request(startLine), serverConfig, responses, types, 0)
+        response.prepareResponse(serverConfig)
+        return response
+    
+    def error(exception:Exceptions.HTTPException) -> bytes:
+        response = ErrorResponse(exception, serverConfig, responses, types, 0)
+        response.prepareResponse(serverConfig)
+        return response.formatResponse()
+    
+    # Respostas já preparadas, para medir apenas a formatação
+    htmlResponse    = respond("GET /about/index.html HTTP/1.1")
+    faviconResponse = respond("GET /assets/favicon.ico HTTP/1.1")
+    pdfResponse     = respond("GET /assets/CV-EN.pdf HTTP/1.1")
+    
+    # Taxa alta o suficiente para que o cliente nunca passe do limite
+    buckets = RateLimit.TokenBucketTable(1e9, 1e9, 10000, 60.0, 32, 128)
+    
+    cssPath = contentRoot + "/assets/css/main.css"
+    pdfPath = contentRoot + "/assets/CV-EN.pdf"
+    
+    def drop_cache(path:str, pageCache:bool) -> Callable[[], None]:
+        def setup() -> None:
+            if ContentHandler.contentCache is not None:
+                ContentHandler.contentCache.invalidate([path])
+            if pageCache:
+                evict_page_cache(path)
+        return setup
+    
+    return [
+        Case("request.init.html",    lambda: request("GET /about/index.html HTTP/1.1")),
+        Case("request.init.css",     lambda: request("GET /assets/css/main.css HTTP/1.1")),
+        Case("route.resolve.css",    lambda: Router.routeTable.resolve("GET", "/assets/css/main.css")),
+        Case("target.parse.plain",   lambda: Target.parse_target("/assets/css/main.css", contentRoot)),
+        Case("target.parse.query",   lambda: Target.parse_target("/about/%69ndex.html?utm_source=feed", contentRoot)),
+        Case("ratelimit.take",       lambda: buckets.take("127.0.0.1", time.monotonic())),
+        Case("response.get.html",    lambda: respond("GET /about/index.html HTTP/1.1")),
+        Case("response.get.pdf",     lambda: respond("GET /assets/CV-EN.pdf HTTP/1.1")),
+        Case("response.head.html",   lambda: respond("HEAD /about/index.html HTTP/1.1")),
+        Case("response.options",     lambda: respond("OPTIONS / HTTP/1.1")),
+        Case("format.text.html",     htmlResponse.formatResponse),
+        Case("format.binary.ico",    faviconResponse.formatResponse),
+        Case("format.binary.pdf",    pdfResponse.formatResponse),
+        Case("content.css.warm",     lambda: ContentHandler.get_resource(cssPath, serverConfig, True)),
+        Case("content.css.cold",     lambda: ContentHandler.get_resource(cssPath, serverConfig, True), drop_cache(cssPath, False)),
+        Case("content.css.coldpage", lambda: ContentHandler.get_resource(cssPath, serverConfig, True), drop_cache(cssPath, True)),
+        Case("content.pdf.warm",     lambda: ContentHandler.get_resource(pdfPath, serverConfig, True)),
+        Case("content.pdf.cold",     lambda: ContentHandler.get_resource(pdfPath, serverConfig, True), drop_cache(pdfPath, False)),
+        Case("content.pdf.coldpage", lambda: ContentHandler.get_resource(pdfPath, serverConfig, True), drop_cache(pdfPath, True)),
+        Case("error.404.page",       lambda: error(Exceptions.NotFound("Recurso Não Encontrado!", "/nao-existe.html"))),
+        Case("error.400.nopage",     lambda: error(Exceptions.BadRequest("Requisição Mal Formada!", "BAD"))),
+        Case("error.503.overload",   lambda: error(Exceptions.ServiceUnavailable("Servidor Sobrecarregado!", "lag", 1))),
+        Case("error.429.overload",   lambda: error(Exceptions.TooManyRequests("Limite de Requisições Atingido!", "127.0.0.1", 1))),
+    ]
+
+def print_report(results:"dict[str, dict[str, float]]", baseline:"dict[str, dict[str, float]]") -> None:
+    """
+    Função que imprime os resultados, comparando com uma execução anterior caso ela tenha sido informada
+    """
+    
+    memory = any("alloc_peak_bytes" in stats for stats in results.values())
+    
+    header  = f"{'caso':<24}{'mediana':>12}{'IQR':>10}{'ops/s':>12}" + (f"{'antes':>12}{'razão':>8}" if baseline else "")
+    header += f"{'pico':>10}{'retida':>10}" + (f"{'antes':>18}" if baseline else "") if memory else ""
+    print(header)
+    print("-" * len(header))
+    
+    for name, stats in results.items():
+        line = f"{name:<24}{stats['median_ns'] / 1000:>10.2f}us{stats['iqr_ns'] / 1000:>8.2f}us{stats['ops_per_second']:>12.0f}"
+        if name in baseline:
+            before = baseline[name]["median_ns"]
+            line += f"{before / 1000:>10.2f}us{stats['median_ns'] / before:>8.2f}"
+        elif baseline:
+            line += " " * 20
+        if memory:
+            line += f"{stats['alloc_peak_bytes']:>9.0f}B" + (f"{stats['alloc_retained_bytes']:>9.0f}B" if stats["alloc_retained_bytes"] is not None else f"{'-':>10}")
+            previous = baseline.get(name, {})
+            if "alloc_peak_bytes" in previous:
+                line += f"{previous['alloc_peak_bytes']:>8.0f}B/" + (f"{previous['alloc_retained_bytes']:.0f}B" if previous["alloc_retained_bytes"] is not None else "-")
+        print(line)
+
+def main() -> None:
+    """
+    Função principal, que processa os argumentos, executa os casos e escreve os resultados
+    """
+    
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do migs' HTTP Server")
+    parser.add_argument("-r", "--repeat", type=int, default=15, help="Número de repetições medidas de cada caso")
+    parser.add_argument("-n", "--number", type=int, default=200, help="Número de chamadas em cada repetição")
+    parser.add_argument("-w", "--warmup", type=int, default=2, help="Número de repetições de aquecimento")
+    parser.add_argument("-k", "--filter", default="", help="Executa apenas os casos cujo nome contém esse texto")
+    parser.add_argument("--memory", action="store_true", help="Mede também a memória alocada por chamada com tracemalloc")
+    parser.add_argument("--compare", help="Arquivo JSON de uma execução anterior, para comparar as medianas")
+    parser.add_argument("-o", "--output", help="Arquivo JSON de resultados, padrão Benchmarks/results/")
+    args = parser.parse_args()
+    
+    # Os casos de erro escreveriam mensagens no terminal a cada chamada
+    logging.disable(logging.CRITICAL)
+    
+    baseline: "dict[str, dict[str, float]]" = dict()
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fp:
+            baseline = json.load(fp)["results"]
+    
+    results: "dict[str, dict[str, float]]" = dict()
+    for case in build_cases():
+        if args.filter in case.name:
+            results[case.name] = case.measure(args.repeat, args.number, args.warmup)
+            if args.memory:
+                results[case.name].update(case.measure_memory(args.number))
+    
+    print_report(results, baseline)
+    
+    outputPath = Harness.save_results("microbench", {"results": results}, args.output)
+    print(f"Resultados escritos em {outputPath}")
+
+if __name__ == "__main__":
+    main()
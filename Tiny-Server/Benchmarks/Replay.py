@@ -0,0 +1,262 @@
+import argparse               # Argumentos de linha de comando
+import json                   # Leitura de resultados anteriores para comparação
+import queue                  # Fila entre o agendador e os clientes
+import re                     # Interpretação do Common Log Format
+import threading              # Clientes concorrentes
+import time                   # Agendamento das requisições e latências
+from datetime import datetime # Instantes do Common Log Format
+from typing import Any, Optional # Anotações de tipo
+import Harness                # Processo do servidor, requisições, estatísticas e resultados
+
+"""
+Replay.py
+Reproduz um log de acesso gravado contra uma instância local do servidor
+Aceita o log de acesso do próprio servidor (TSV, ver AccessLog.py) ou um log no Common Log Format (e no Combined Log Format)
+
+As requisições são disparadas respeitando os intervalos originais entre elas, que podem ser acelerados (--speed),
+    ou o mais rápido possível (--speed 0), por um número configurável de clientes concorrentes
+Reporta a distribuição de latências por classe de caminho (html, css, imagem, ...) e as diferenças para uma execução anterior
+
+Uso (dentro de Tiny-Server/):
+    python Benchmarks/Replay.py access.log [--speed 10] [-c 16] [--set Tabela.chave=valor ...] [--compare anterior.json]
+    python Benchmarks/Replay.py access.log --target localhost:9999   (usa um servidor já em execução)
+"""
+
+# Métodos que o servidor implementa, outras linhas do log são ignoradas
+replayedMethods = ("GET", "HEAD", "OPTIONS")
+
+# Classes de caminho, extensão -> classe
+pathClasses = {
+    ".html": "html", ".css": "css", ".js": "js",
+    ".ico": "imagem", ".jpg": "imagem", ".png": "imagem",
+    ".pdf": "pdf",
+}
+
+# host ident user [10/Oct/2000:13:55:36 -0700] "GET /caminho HTTP/1.0" 200 2326 ...
+commonLogLine = re.compile(r'^\S+ \S+ \S+ \[([^\]]+)\] "(\S+) (\S+)[^"]*" (\d{3}) ')
+
+def parse_log(path:str) -> "list[tuple[float, str, str, int]]":
+    """
+    Função que lê um log de acesso, no formato do servidor ou no Common Log Format
+    
+    Recebe:
+        [str] path: Caminho do log
+    
+    Retorna:
+        Lista de tuplas (segundos desde a primeira requisição, método, caminho, código de resposta original), em ordem
+    """
+    
+    entries = []
+    with open(path, encoding="utf-8", errors="replace") as fp:
+        for line in fp:
+            if line.startswith("#") or not line.strip():
+                continue
+            
+            match = commonLogLine.match(line)
+            if match is not None:
+                timestamp = datetime.strptime(match.group(1), "%d/%b/%Y:%H:%M:%S %z").timestamp()
+                method, target, status = match.group(2), match.group(3), int(match.group(4))
+            else:
+                # Log do servidor: timestamp, cliente, método, caminho, código, ...
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 5:
+                    continue
+                try:
+                    timestamp, status = float(fields[0]), int(fields[4])
+                except ValueError:
+                    continue
+                method, target = fields[2], fields[3]
+            
+            if method in replayedMethods:
+                entries.append((timestamp, method, target, status))
+    
+    entries.sort(key=lambda entry: entry[0])
+    if not entries:
+        return []
+    
+    start = entries[0][0]
+    return [(timestamp - start, method, target, status) for timestamp, method, target, status in entries]
+
+def path_class(path:str, status:int) -> str:
+    """
+    Função que classifica uma requisição respondida pelo tipo do recurso, ou como erro caso a resposta seja 4xx/5xx
+    """
+    
+    if status >= 400 or status == 0:
+        return f"erro-{status // 100}xx" if status else "erro-conexao"
+    
+    resource = path.split("?", 1)[0]
+    if resource.endswith("/"):
+        return "html"
+    dot = resource.rfind(".")
+    return pathClasses.get(resource[dot:].lower(), "outro") if dot != -1 else "outro"
+
+class Replayer():
+    """
+    Classe que reproduz as requisições de um log com um agendador e um conjunto de clientes
+    O agendador coloca cada requisição na fila no seu instante (original dividido pela velocidade),
+        e os clientes tiram as requisições da fila e executam elas
+    Caso todos os clientes estejam ocupados, a requisição sai atrasada, o atraso também é reportado
+    """
+    
+    def __init__(self, host:str, port:int, concurrency:int, speed:float, gzip:bool, timeout:float) -> None:
+        self.host        = host
+        self.port        = port
+        self.concurrency = concurrency
+        self.speed       = speed
+        self.gzip        = gzip
+        self.timeout     = timeout
+        
+        self.jobs: "queue.Queue[Optional[tuple[float, str, str, int]]]" = queue.Queue()
+        self.lock    = threading.Lock()
+        self.samples: "list[tuple[str, float, float, int, int, int]]" = [] # (classe, latência, atraso, código, código original, bytes)
+    
+    def client(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            
+            scheduled, method, path, originalStatus = job
+            start = time.perf_counter()
+            try:
+                status, received = Harness.fetch(self.host, self.port, method, path, self.gzip, self.timeout, "tiny-replay")
+            except OSError:
+                status, received = 0, 0
+            latency = time.perf_counter() - start
+            
+            with self.lock:
+                self.samples.append((path_class(path, status), latency, max(start - scheduled, 0.0), status, originalStatus, received))
+    
+    def run(self, entries:"list[tuple[float, str, str, int]]") -> float:
+        """
+        Método que reproduz as requisições
+        
+        Retorna:
+            A duração da reprodução em segundos
+        """
+        
+        clients = [threading.Thread(target=self.client, daemon=True) for _ in range(self.concurrency)]
+        for thread in clients:
+            thread.start()
+        
+        begin = time.perf_counter()
+        for offset, method, path, status in entries:
+            scheduled = begin + (offset / self.speed if self.speed > 0 else 0.0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.jobs.put((scheduled, method, path, status))
+        
+        for _ in clients:
+            self.jobs.put(None)
+        for thread in clients:
+            thread.join()
+        
+        return time.perf_counter() - begin
+    
+    def results(self, elapsed:float) -> "dict[str, Any]":
+        """
+        Método que agrega as latências medidas, no total e por classe de caminho
+        """
+        
+        classes: "dict[str, list[float]]" = dict()
+        for pathClass, latency, _, _, _, _ in self.samples:
+            classes.setdefault(pathClass, []).append(latency)
+        
+        lags = [lag for _, _, lag, _, _, _ in self.samples]
+        return {
+            "requests":   len(self.samples),
+            "duration":   elapsed,
+            "rps":        len(self.samples) / elapsed if elapsed > 0 else 0.0,
+            "bytes":      sum(sample[5] for sample in self.samples),
+            "status_mismatches": sum(1 for sample in self.samples if sample[3] != sample[4]),
+            "lag":        Harness.summarize(lags),
+            **Harness.summarize([sample[1] for sample in self.samples]),
+            "classes":    {name: {"requests": len(values), **Harness.summarize(values)} for name, values in sorted(classes.items())},
+        }
+
+def print_report(results:"dict[str, Any]", baseline:Optional["dict[str, Any]"]) -> None:
+    """
+    Função que imprime as latências por classe de caminho, e a razão em relação a uma execução anterior caso informada
+    """
+    
+    header = f"{'classe':<14}{'req':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}" + (f"{'Δp50':>8}{'Δp95':>8}{'Δp99':>8}" if baseline else "")
+    print(header)
+    print("-" * len(header))
+    
+    rows = list(results["classes"].items()) + [("total", results)]
+    previous = dict(baseline["classes"], total=baseline) if baseline else {}
+    for name, row in rows:
+        line = f"{name:<14}{row['requests']:>8}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+        if name in previous:
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                before = previous[name][key]
+                line += f"{row[key] / before:>8.2f}" if before > 0 else f"{'-':>8}"
+        print(line)
+    
+    print(f"\n{results['rps']:.1f} req/s em {results['duration']:.1f}s, "
+          f"atraso p99 {results['lag']['p99_ms']:.2f} ms, {results['status_mismatches']} respostas com código diferente do log")
+
+def main() -> None:
+    """
+    Função principal, que processa os argumentos, reproduz o log e escreve os resultados
+    """
+    
+    parser = argparse.ArgumentParser(description="Reprodução de logs de acesso contra o migs' HTTP Server")
+    parser.add_argument("log", help="Log de acesso do servidor (TSV) ou no Common Log Format")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Número de clientes concorrentes")
+    parser.add_argument("--speed", type=float, default=1.0, help="Fator de aceleração dos intervalos originais, 0 para não esperar")
+    parser.add_argument("--limit", type=int, default=0, help="Reproduz apenas as primeiras N requisições")
+    parser.add_argument("--gzip", action="store_true", help="Envia Accept-Encoding: gzip nas requisições")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Tempo máximo de cada requisição em segundos")
+    parser.add_argument("--target", help="host:porta de um servidor já em execução, por padrão inicia um servidor local")
+    parser.add_argument("--config", help="Arquivo de configurações base do servidor local, padrão config.toml")
+    parser.add_argument("--set", action="append", default=[], metavar="TABELA.CHAVE=VALOR", help="Altera uma configuração do servidor local")
+    parser.add_argument("--label", default="", help="Nome da execução, guardado nos resultados")
+    parser.add_argument("--compare", help="Arquivo JSON de uma execução anterior, para comparar as latências")
+    parser.add_argument("-o", "--output", help="Arquivo JSON de resultados, padrão Benchmarks/results/")
+    args = parser.parse_args()
+    
+    entries = parse_log(args.log)
+    if args.limit > 0:
+        entries = entries[:args.limit]
+    if not entries:
+        raise SystemExit(f"Nenhuma requisição para reproduzir em {args.log}")
+    
+    span = entries[-1][0] / args.speed if args.speed > 0 else 0.0
+    print(f"Reproduzindo {len(entries)} requisições ({span:.1f}s de log) com {args.concurrency} clientes")
+    
+    if args.target:
+        host, _, port = args.target.rpartition(":")
+        replayer = Replayer(host or "127.0.0.1", int(port), args.concurrency, args.speed, args.gzip, args.timeout)
+        elapsed  = replayer.run(entries)
+        overrides: "dict[str, Any]" = dict()
+    else:
+        with Harness.ServerProcess(args.set, args.config) as server:
+            replayer = Replayer("127.0.0.1", server.port, args.concurrency, args.speed, args.gzip, args.timeout)
+            elapsed  = replayer.run(entries)
+        overrides = server.overrides
+    
+    results = replayer.results(elapsed)
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fp:
+            baseline = json.load(fp)["results"]
+    
+    print_report(results, baseline)
+    
+    outputPath = Harness.save_results("replay", {
+        "label":       args.label,
+        "log":         args.log,
+        "concurrency": args.concurrency,
+        "speed":       args.speed,
+        "gzip":        args.gzip,
+        "overrides":   overrides,
+        "results":     results,
+    }, args.output)
+    print(f"Resultados escritos em {outputPath}")
+
+if __name__ == "__main__":
+    main()
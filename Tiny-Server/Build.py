@@ -0,0 +1,209 @@
+import sys                  # Para ter acesso ao argv
+import os                   # Para percorrer a pasta de conteúdo
+import re                   # Expressões regulares usadas na minificação
+import gzip                 # Para gerar os arquivos pré-comprimidos
+import shutil               # Para copiar arquivos que não são minificados
+import logging              # Biblioteca de criação de logs
+from typing import Optional # Anotações de tipo
+import Configuration        # Configurações do Servidor
+
+"""
+Build.py
+Etapa de build offline do conteúdo servido pelo servidor
+Percorre a pasta raiz de conteúdo (content_root) e, para cada arquivo permitido:
+    Minifica arquivos HTML/CSS/JS (remove comentários e espaços em branco desnecessários)
+    Gera um arquivo .gz ao lado do arquivo, comprimido com o nível máximo de compressão
+O ContentHandler usa esses arquivos .gz no lugar de comprimir os arquivos durante as requisições
+
+Uso:
+    python Build.py [config.toml] [pasta-destino]
+    
+    Sem pasta de destino, apenas gera os arquivos .gz (do conteúdo minificado) ao lado dos arquivos originais, sem alterar eles
+    Com pasta de destino, gera uma cópia minificada de toda a pasta de conteúdo (e os arquivos .gz) dentro dela
+"""
+
+log = logging.getLogger("Main.Build")
+
+# Blocos HTML cujo conteúdo não pode ter os espaços em branco alterados
+preservedBlocks = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.S | re.I)
+# Comentários HTML, exceto comentários condicionais (<!--[if IE]>)
+htmlComments    = re.compile(r"<!--(?!\[if).*?-->", re.S)
+cssComments     = re.compile(r"/\*.*?\*/", re.S)
+whitespace      = re.compile(r"\s+")
+cssSeparators   = re.compile(r"\s*([{};,>])\s*")
+
+def minify_css(contents:str) -> str:
+    """
+    Função que minifica um arquivo CSS
+    Remove comentários, junta espaços em branco e remove espaços em volta dos separadores
+    
+    Recebe:
+        [str] contents: O conteúdo do arquivo CSS
+    
+    Retorna:
+        O conteúdo minificado
+    """
+    
+    contents = cssComments.sub("", contents)
+    contents = whitespace.sub(" ", contents)
+    contents = cssSeparators.sub(r"\1", contents)
+    
+    # O último ";" de um bloco é desnecessário
+    return contents.replace(";}", "}").strip()
+
+def minify_js(contents:str) -> str:
+    """
+    Função que minifica um arquivo JS
+    Como não tenho um parser de JS, a minificação é conservadora: remove apenas linhas vazias e espaços no final das linhas
+    
+    Recebe:
+        [str] contents: O conteúdo do arquivo JS
+    
+    Retorna:
+        O conteúdo minificado
+    """
+    
+    return "\n".join(line.rstrip() for line in contents.splitlines() if line.strip() != "")
+
+def minify_html(contents:str) -> str:
+    """
+    Função que minifica um arquivo HTML
+    Remove comentários e junta sequências de espaços em branco em um único espaço (que é como o navegador renderiza eles)
+    O conteúdo de <pre> e <textarea> é mantido como está, o de <script> e <style> é minificado como JS e CSS
+    
+    Recebe:
+        [str] contents: O conteúdo do arquivo HTML
+    
+    Retorna:
+        O conteúdo minificado
+    """
+    
+    minified = []
+    
+    # Como a regex tem dois grupos, o split retorna [texto, bloco, tag, texto, bloco, tag, ..., texto]
+    parts = preservedBlocks.split(contents)
+    for i in range(0, len(parts), 3):
+        text = htmlComments.sub("", parts[i])
+        minified.append(whitespace.sub(" ", text))
+        
+        if i + 1 < len(parts):
+            block, tag = parts[i + 1], parts[i + 2].lower()
+            if tag == "style":
+                block = minify_css(block)
+            elif tag == "script":
+                block = minify_js(block)
+            minified.append(block)
+    
+    return "".join(minified).strip()
+
+minifiers = {".html": minify_html, ".css": minify_css, ".js": minify_js}
+
+def build_file(sourcePath:str, destinationPath:Optional[str], serverConfig:Configuration.ServerConfig) -> "tuple[int, int]":
+    """
+    Função que processa um único arquivo da pasta de conteúdo
+    Minifica ele (se for do tipo que é minificado) e gera o arquivo .gz correspondente
+    
+    Recebe:
+        [str] sourcePath:            Caminho do arquivo original
+        [str] destinationPath:       Caminho onde a versão minificada deve ser escrita, None para não escrever ela
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Uma tupla com o tamanho original do arquivo e o tamanho do arquivo .gz gerado
+    """
+    
+    with open(sourcePath, "rb") as fp:
+        contents = fp.read()
+    
+    fileExt = os.path.splitext(sourcePath)[1]
+    if fileExt in serverConfig.configValue["minifiedFiles"] and fileExt in minifiers:
+        minified = minifiers[fileExt](contents.decode("utf-8")).encode("utf-8")
+    else:
+        minified = contents
+    
+    outputPath = sourcePath
+    if destinationPath is not None:
+        os.makedirs(os.path.dirname(destinationPath), exist_ok=True)
+        if minified is contents:
+            shutil.copy2(sourcePath, destinationPath)
+        else:
+            with open(destinationPath, "wb") as fp:
+                fp.write(minified)
+        outputPath = destinationPath
+    
+    # mtime=0 deixa o arquivo .gz reprodutível entre builds
+    # O arquivo .gz é escrito por último, logo sempre é mais recente que o arquivo que ele comprime
+    compressed = gzip.compress(minified, compresslevel=serverConfig.configValue["compressLevel"], mtime=0)
+    with open(outputPath + ".gz", "wb") as fp:
+        fp.write(compressed)
+    
+    return (len(contents), len(compressed))
+
+def build(serverConfig:Configuration.ServerConfig, destinationRoot:Optional[str]=None) -> None:
+    """
+    Função que percorre a pasta raiz de conteúdo e processa todos os arquivos permitidos nela
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+        [str] destinationRoot:       Pasta onde a cópia minificada do conteúdo é escrita, None para não gerar uma cópia
+    
+    Retorna:
+        Nada
+    """
+    
+    contentRoot  = serverConfig.configValue["contentRoot"]
+    allowedFiles = tuple(serverConfig.configValue["allowedFiles"])
+    
+    totalOriginal   = 0
+    totalCompressed = 0
+    
+    for directory, _, files in os.walk(contentRoot):
+        for file in files:
+            # Arquivos .gz são gerados por esse script, então não são processados
+            if not file.endswith(allowedFiles):
+                continue
+            
+            sourcePath      = os.path.join(directory, file)
+            destinationPath = None
+            if destinationRoot is not None:
+                destinationPath = os.path.join(destinationRoot, os.path.relpath(sourcePath, contentRoot))
+            
+            try:
+                originalSize, compressedSize = build_file(sourcePath, destinationPath, serverConfig)
+            except (OSError, UnicodeDecodeError) as err:
+                log.error(f"Erro ao processar {sourcePath}: {repr(err)}")
+                print(f"Erro ao processar {sourcePath}!")
+                continue
+            
+            totalOriginal   += originalSize
+            totalCompressed += compressedSize
+            print(f"\t{sourcePath}: {originalSize} -> {compressedSize} bytes")
+    
+    print(f"Total: {totalOriginal} -> {totalCompressed} bytes")
+
+def main() -> None:
+    """
+    Função principal, que processa os argumentos de linha de comando e executa o build
+    
+    Recebe:
+        Nada
+    
+    Retorna:
+        Nada
+    """
+    
+    print("migs' HTTP Server - Build")
+    
+    cfg         = None
+    destination = None
+    for arg in sys.argv[1:]:
+        if arg.endswith(".toml"):
+            cfg = arg
+        else:
+            destination = arg
+    
+    serverConfig = Configuration.ServerConfig(cfg)
+    build(serverConfig, destination)
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,83 @@ Configuration.py
 Módulo que vai carregar as configurações do servidor
 Lê as configurações de um arquivo .toml (config.toml por padrão, outro nome pode ser fornecido quando inicializa o servidor) e carrega elas em um dicionário, atributo da classe ServerConfig
 Caso algum valor de configuração que era esperado não foi encontrado, printa um erro no terminal e adiciona um aviso no log
-
-TODO: Adicionar uma configuração para fazer shutdown graciosamente (algo tipo receber requisição "GET GRACIOUSLYSHUTDOWN/PRETTYPLEASE")
+As configurações podem ser recarregadas com o servidor em execução enviando SIGHUP ao processo (ver Server.py)
 """
 
 log = logging.getLogger("Main.Configuration")
 
 criticalConfig = ["implemented_methods", "http_version", "port", "host", "server_name", "content_root"]
 
+# Configurações que normalmente não estão no arquivo (ex: sem [[Listeners]] o servidor escuta apenas em host:port),
+#     quando ausentes usam o valor padrão sem aviso
+optionalConfig = ["Listeners"]
+
+# Valores padrão das configurações opcionais, usados quando elas não estão no arquivo de configurações
+defaultConfig: "dict[str,Any]" = {
+    "useSidecars":       True,
+    "compressLevel":     9,
+    "minifiedFiles":     [".html", ".css", ".js"],
+    "watcherEnabled":    True,
+    "watcherInterval":   2.0,
+    "watcherBatchDelay": 0.5,
+    "cacheEnabled":      True,
+    "cacheMaxBytes":     32 * 1024 * 1024,
+    "drainTimeout":      10.0,
+    "negativeCacheEnabled":    True,
+    "negativeCacheMaxEntries": 4096,
+    "negativeCacheTTL":        5.0,
+    "logFile":           "server.log",
+    "logLevel":          "INFO",
+    "logMaxBytes":       10 * 1024 * 1024,
+    "logBackupCount":    5,
+    "logRotateInterval": 86400.0,
+    "logFlushInterval":  1.0,
+    "logFlushRecords":   256,
+    "verbose":           False,
+    "accessLogEnabled":       True,
+    "accessLogFile":          "access.log",
+    "accessLogFlushInterval": 1.0,
+    "metricsEnabled":         False,
+    "metricsPath":            "/__metrics",
+    "serverTimingEnabled":    False,
+    "serverTimingHeader":     "X-Server-Timing",
+    "serverTimingToken":      "",
+    "profilerEnabled":        False,
+    "profilerPath":           "/__profile",
+    "profilerRequests":       1000,
+    "profilerSeconds":        30.0,
+    "profilerSampleInterval": 0.005,
+    "profilerOutputDir":      "profiles",
+    "watchdogEnabled":        True,
+    "watchdogThreshold":      0.5,
+    "warmupEnabled":          False,
+    "warmupSource":           "access_log",
+    "warmupFile":             "popular.txt",
+    "warmupMaxEntries":       100,
+    "warmupMaxFileBytes":     262144,
+    "warmupThreads":          4,
+    "warmupTimeBudget":       5.0,
+    "streamingEnabled":       True,
+    "streamingMinBytes":      1024 * 1024,
+    "streamingChunkBytes":    64 * 1024,
+    "healthEnabled":          False,
+    "healthPath":             "/__health",
+    "transferQuantum":        64 * 1024,
+    "admissionMaxConnections": 0,
+    "admissionMaxPending":     0,
+    "admissionMaxLag":         0.0,
+    "admissionRetryAfter":     1,
+    "admissionReadTimeout":    10.0,
+    "rateLimitEnabled":        False,
+    "rateLimitRate":           20.0,
+    "rateLimitBurst":          40,
+    "rateLimitMaxClients":     10000,
+    "rateLimitIdleTimeout":    60.0,
+    "rateLimitIPv4Prefix":     32,
+    "rateLimitIPv6Prefix":     64,
+    "listeners":               [],
+}
+
 def load_data(configs:"dict[str,Any]", configName:str, fileContents:"dict[str,Any]", key1:str, key2:Optional[str]=None) -> None:
     """
     Função que carrega as configurações lidas de um arquivo .toml em um dicinário
@@ -23,6 +92,7 @@ def load_data(configs:"dict[str,Any]", configName:str, fileContents:"dict[str,An
         os conteúdos do arquivo .toml em um dict e duas chaves para esse dict, a segunda sendo opcional
     Copia os conteúdos de fileContents[key1] (ou fileContents[key1][key2]) para configs[configName]
     Caso ocorra um erro ao ler fileContents[key1] (ou fileContents[key1][key2]) anota no log e printa uma mensagem de aviso no terminal
+    Se a configuração ausente tiver um valor padrão em defaultConfig, usa esse valor, sem aviso caso ela esteja em optionalConfig
     
     Recebe:
         [dict] configs:      Um dicionário contendo as configurações a serem populadas
@@ -39,6 +109,8 @@ def load_data(configs:"dict[str,Any]", configName:str, fileContents:"dict[str,An
             configs[configName] = fileContents[key1][key2]
         except KeyError:
             log.warning(f"Configuração necessária \"{key1}\"/\"{key2}\" ausente do arquivo de configurações")
+            if configName in defaultConfig:
+                configs[configName] = defaultConfig[configName]
     else:
         try:
             configs[configName] = fileContents[key1]
@@ -47,8 +119,15 @@ def load_data(configs:"dict[str,Any]", configName:str, fileContents:"dict[str,An
                 log.critical(f"Configuração crítica \"{key1}\" ausente do arquivo de configurações")
                 print(f"Configuração crítica \"{key1}\" ausente do arquivo de configurações!\nEncerrando execução!")
                 sys.exit()
+            
+            # Configurações opcionais só geram aviso caso não tenham um valor padrão
+            if key1 in optionalConfig and configName in defaultConfig:
+                configs[configName] = defaultConfig[configName]
+                return
                 
             log.warning(f"Configuração necessária \"{key1}\" ausente do arquivo de configurações")
+            if configName in defaultConfig:
+                configs[configName] = defaultConfig[configName]
                 
     
 
@@ -72,15 +151,57 @@ class ServerConfig():
         if cfgName is None:
             cfgName = "config.toml"
         
+        # Guardando o nome do arquivo para poder recarregar as configurações depois
+        self.cfgName = cfgName
+        
         self.configValue = dict()
         
         keys   = [
             "implemmentedMethods", "httpVersion", "port", "host", "serverName", "errorPath", "contentRoot",
-            "forbiddenPaths", "forbiddenFiles", "allowedPaths", "allowedFiles"
+            "forbiddenPaths", "forbiddenFiles", "allowedPaths", "allowedFiles",
+            "useSidecars", "compressLevel", "minifiedFiles",
+            "watcherEnabled", "watcherInterval", "watcherBatchDelay", "cacheEnabled", "cacheMaxBytes",
+            "drainTimeout",
+            "negativeCacheEnabled", "negativeCacheMaxEntries", "negativeCacheTTL",
+            "logFile", "logLevel", "logMaxBytes", "logBackupCount", "logRotateInterval", "logFlushInterval", "logFlushRecords", "verbose",
+            "accessLogEnabled", "accessLogFile", "accessLogFlushInterval",
+            "metricsEnabled", "metricsPath",
+            "serverTimingEnabled", "serverTimingHeader", "serverTimingToken",
+            "profilerEnabled", "profilerPath", "profilerRequests", "profilerSeconds", "profilerSampleInterval", "profilerOutputDir",
+            "watchdogEnabled", "watchdogThreshold",
+            "warmupEnabled", "warmupSource", "warmupFile", "warmupMaxEntries", "warmupMaxFileBytes", "warmupThreads", "warmupTimeBudget",
+            "streamingEnabled", "streamingMinBytes", "streamingChunkBytes",
+            "healthEnabled", "healthPath",
+            "transferQuantum",
+            "admissionMaxConnections", "admissionMaxPending", "admissionMaxLag", "admissionRetryAfter", "admissionReadTimeout",
+            "rateLimitEnabled", "rateLimitRate", "rateLimitBurst", "rateLimitMaxClients", "rateLimitIdleTimeout", "rateLimitIPv4Prefix", "rateLimitIPv6Prefix",
+            "listeners"
         ]
         values = [
             "implemented_methods", "http_version", "port", "host", "server_name", "error_path", "content_root",
-            ("Forbidden", "paths"), ("Forbidden", "files"), ("Allowed", "paths"), ("Allowed", "files")
+            ("Forbidden", "paths"), ("Forbidden", "files"), ("Allowed", "paths"), ("Allowed", "files"),
+            ("Build", "use_sidecars"), ("Build", "compress_level"), ("Build", "minified_files"),
+            ("Watcher", "enabled"), ("Watcher", "interval"), ("Watcher", "batch_delay"), ("Cache", "enabled"), ("Cache", "max_bytes"),
+            ("Shutdown", "drain_timeout"),
+            ("NegativeCache", "enabled"), ("NegativeCache", "max_entries"), ("NegativeCache", "ttl"),
+            ("Logging", "file"), ("Logging", "level"), ("Logging", "max_bytes"), ("Logging", "backup_count"),
+            ("Logging", "rotate_interval"), ("Logging", "flush_interval"), ("Logging", "flush_records"), ("Logging", "verbose"),
+            ("AccessLog", "enabled"), ("AccessLog", "file"), ("AccessLog", "flush_interval"),
+            ("Metrics", "enabled"), ("Metrics", "path"),
+            ("ServerTiming", "enabled"), ("ServerTiming", "header"), ("ServerTiming", "token"),
+            ("Profiler", "enabled"), ("Profiler", "path"), ("Profiler", "requests"), ("Profiler", "seconds"),
+            ("Profiler", "sample_interval"), ("Profiler", "output_dir"),
+            ("Watchdog", "enabled"), ("Watchdog", "threshold"),
+            ("Warmup", "enabled"), ("Warmup", "source"), ("Warmup", "file"), ("Warmup", "max_entries"),
+            ("Warmup", "max_file_bytes"), ("Warmup", "threads"), ("Warmup", "time_budget"),
+            ("Streaming", "enabled"), ("Streaming", "min_bytes"), ("Streaming", "chunk_bytes"),
+            ("Health", "enabled"), ("Health", "path"),
+            ("Transfer", "quantum_bytes"),
+            ("Admission", "max_connections"), ("Admission", "max_pending"), ("Admission", "max_loop_lag"), ("Admission", "retry_after"),
+            ("Admission", "read_timeout"),
+            ("RateLimit", "enabled"), ("RateLimit", "rate"), ("RateLimit", "burst"), ("RateLimit", "max_clients"),
+            ("RateLimit", "idle_timeout"), ("RateLimit", "ipv4_prefix"), ("RateLimit", "ipv6_prefix"),
+            "Listeners"
         ]
         
         # Abrindo o arquivo e recuperando as configurações
@@ -93,4 +214,8 @@ class ServerConfig():
                     load_data(self.configValue, key, rawConfig, value[0], value[1])
                 else:
                     load_data(self.configValue, key, rawConfig, value)
-                
\ No newline at end of file
+        
+        # Pré-computando as regras de arquivos proibidos/permitidos em tuplas, que o str.endswith aceita diretamente
+        self.forbiddenFileRule = tuple(self.configValue["forbiddenFiles"])
+        self.allowedFileRule   = tuple(self.configValue["allowedFiles"])
+        
\ No newline at end of file
@@ -0,0 +1,193 @@
+import logging                         # Biblioteca de criação de logs
+import threading                       # Para proteger o cache de acessos concorrentes
+import time                            # Tempo de vida das entradas do cache de caminhos inexistentes
+from collections import OrderedDict    # Para manter a ordem de uso das entradas (LRU)
+from typing import Any, Optional       # Anotações de tipo
+
+"""
+ContentCache.py
+Módulo que define o cache em memória dos recursos enviados pelo servidor
+Guarda o conteúdo dos arquivos (e suas versões comprimidas) para evitar ler e comprimir eles do disco em toda requisição
+O cache tem um tamanho máximo em bytes, quando ele é atingido as entradas usadas a mais tempo são removidas (LRU)
+Entradas são invalidadas pelo ContentWatcher (módulo Watcher) quando o arquivo correspondente muda
+Também define o cache de caminhos que não existem, que evita acessar o disco para caminhos requisitados repetidamente que resultam em 404
+"""
+
+log = logging.getLogger("Main.Server.Cache")
+
+class ContentCache():
+    """
+    Classe que representa o cache de conteúdo
+    As chaves do cache são tuplas (caminho do arquivo, variante), onde a variante indica se o conteúdo está comprimido
+    
+    Para que uma requisição que leu um arquivo antes dele ser modificado não coloque o conteúdo antigo no cache
+        depois da invalidação, o cache tem uma geração que é incrementada a cada invalidação
+    Quem vai inserir algo no cache lê a geração antes de ler o arquivo, e a inserção é ignorada se a geração mudou
+    
+    Atributos da Classe:
+        [int] maxBytes:   Tamanho máximo do cache em bytes
+        [int] size:       Tamanho atual do cache em bytes
+        [int] generation: Geração atual do cache
+        [int] hits, misses, evictions: Contadores de uso do cache
+    """
+    
+    def __init__(self, maxBytes:int) -> None:
+        self.maxBytes   = maxBytes
+        self.size       = 0
+        self.generation = 0
+        self.entries: OrderedDict[Any, Any] = OrderedDict()
+        self.lock       = threading.Lock()
+        
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+    
+    def get(self, key:Any) -> Optional[Any]:
+        """
+        Método que recupera uma entrada do cache
+        
+        Recebe:
+            [Any] key: A chave da entrada
+        
+        Retorna:
+            O valor guardado no cache, ou None caso a chave não esteja no cache
+        """
+        
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key:Any, value:Any, generation:int) -> None:
+        """
+        Método que insere uma entrada no cache, removendo as entradas menos usadas caso necessário
+        
+        Recebe:
+            [Any] key:        A chave da entrada
+            [Any] value:      O valor a ser guardado (qualquer objeto com len, ex: ContentHandler.Content)
+            [int] generation: A geração do cache lida antes do valor ser gerado
+        
+        Retorna:
+            Nada
+        """
+        
+        valueSize = len(value)
+        if valueSize > self.maxBytes:
+            return
+        
+        with self.lock:
+            # O arquivo mudou enquanto o valor era gerado, então ele pode estar desatualizado
+            if generation != self.generation:
+                return
+            
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            
+            while self.size + valueSize > self.maxBytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+            
+            self.entries[key] = value
+            self.size += valueSize
+    
+    def invalidate(self, paths:"list[str]") -> int:
+        """
+        Método que remove do cache todas as variantes dos arquivos informados
+        
+        Recebe:
+            [list(str)] paths: Caminhos dos arquivos que mudaram
+        
+        Retorna:
+            O número de entradas removidas
+        """
+        
+        changed = set(paths)
+        
+        with self.lock:
+            self.generation += 1
+            
+            stale = [key for key in self.entries if key[0] in changed]
+            for key in stale:
+                self.size -= len(self.entries.pop(key))
+        
+        return len(stale)
+
+class NegativeCache():
+    """
+    Classe que representa o cache de caminhos que não existem
+    Usado apenas quando o índice de conteúdo está desabilitado, pois com ele a existência de um caminho já é verificada sem acessar o disco
+    Robôs que procuram por caminhos como /wp-login.php geram muitas requisições para caminhos que não existem,
+        com esse cache apenas a primeira delas (dentro do tempo de vida da entrada) chega a fazer um stat() no disco
+    
+    Quando um caminho não existe, também é guardada a pasta mais alta do caminho que não existe
+    Assim, qualquer outro caminho dentro dessa pasta (/wp-admin/a.php, /wp-admin/b.php, ...) também é resolvido pelo cache
+    
+    Atributos da Classe:
+        [int] maxEntries: Número máximo de caminhos guardados
+        [float] ttl:      Tempo de vida de cada entrada em segundos
+        [int] hits, misses: Contadores de uso do cache
+    """
+    
+    def __init__(self, maxEntries:int, ttl:float) -> None:
+        self.maxEntries = maxEntries
+        self.ttl        = ttl
+        self.entries: OrderedDict[str, float] = OrderedDict() # caminho -> instante em que a entrada expira
+        self.lock       = threading.Lock()
+        
+        self.hits   = 0
+        self.misses = 0
+    
+    def is_missing(self, path:str) -> bool:
+        """
+        Método que verifica se um caminho, ou alguma pasta que o contém, foi guardado recentemente como inexistente
+        
+        Recebe:
+            [str] path: O caminho a ser verificado
+        
+        Retorna:
+            True caso o caminho certamente não exista, False caso seja necessário verificar no disco
+        """
+        
+        now = time.monotonic()
+        
+        with self.lock:
+            # Verificando o próprio caminho e cada uma das pastas que o contém, sem acessar o disco
+            candidate = path.rstrip("/")
+            while candidate:
+                expires = self.entries.get(candidate)
+                if expires is not None:
+                    if expires > now:
+                        self.hits += 1
+                        return True
+                    del self.entries[candidate]
+                candidate = candidate.rpartition("/")[0]
+            
+            self.misses += 1
+            return False
+    
+    def add(self, path:str, missingRoot:Optional[str]=None) -> None:
+        """
+        Método que guarda um caminho como inexistente
+        
+        Recebe:
+            [str] path:        O caminho que não existe
+            [str] missingRoot: A pasta mais alta do caminho que também não existe, caso tenha sido encontrada
+        
+        Retorna:
+            Nada
+        """
+        
+        key = (missingRoot if missingRoot is not None else path).rstrip("/")
+        
+        with self.lock:
+            self.entries[key] = time.monotonic() + self.ttl
+            self.entries.move_to_end(key)
+            
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
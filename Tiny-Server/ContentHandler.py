@@ -1,18 +1,28 @@
 import logging                         # Biblioteca de criação de logs
 import os                              # Para acessar arquivos do sistema
 import gzip                            # Para compactar arquivos binários sendo transferidos
+import zlib                            # Para compactar arquivos binários enviados em partes
+import threading                       # Resultado da última busca no cache de cada thread
 from Configuration import ServerConfig # Configurações do Servidor
-from typing import Union               # Anotações de Tipo
+from typing import Iterator, Optional, Union, BinaryIO # Anotações de Tipo
+from ContentIndex import ContentIndex  # Índice da pasta de conteúdo
+from ContentCache import ContentCache, NegativeCache # Cache de conteúdo e de caminhos inexistentes
+from Watcher import ContentWatcher     # Observador da pasta de conteúdo
 
 """
 ContentHandler.py
 Módulo que vai recuperar o conteúdo requisitado pelo cliente
 Todo o conteúdo disponível para ser requisitado estará dentro da pasta definida no arquivo de configurações como raiz dos conteúdos
 Apesar de verificar no módulo RequestHandler se os recursos requisitados existem, faço essas verificações aqui novamente por garantia
-Recursos que são retornados ao cliente são de dois tipo, texto ou binário
-Recursos de tipo texto são retornados dentro de uma string
-Recursos de tipo binário são retornados dentro de um tipo bytes
+Recursos que são retornados ao cliente são de dois tipo, texto ou binário, ambos lidos do disco e enviados como bytes
+A diferença entre eles fica nos metadados do conteúdo (ver a classe Content): recursos binários sempre são comprimidos com gzip,
+    e recursos texto são enviados sem alteração, com o charset utf-8 indicado no Content-Type
 Para determinar se um arquivo é texto ou binário, verifico qual é sua extensão
+Caso exista um arquivo .gz pré-comprimido (gerado pelo Build.py) mais recente que o recurso, ele é retornado no lugar do recurso
+Arquivos maiores que [Streaming] min_bytes não são lidos inteiros: o corpo do conteúdo é um gerador que lê (e comprime) o arquivo
+    em partes enquanto a resposta é enviada, e o conteúdo não passa pelo cache
+Quando o observador de conteúdo está habilitado, a existência e o tamanho dos recursos vêm do índice de conteúdo
+    e o conteúdo dos recursos fica guardado no cache de conteúdo, ambos atualizados pelo observador quando os arquivos mudam
 """
 
 log = logging.getLogger("Main.Server.Response.Content")
@@ -20,6 +30,117 @@ log = logging.getLogger("Main.Server.Response.Content")
 # Função anônima que verifica se um arquivo é um arquivo texto, se não for é um binário
 isTextFile = lambda f: any([f.endswith(ext) for ext in [".html", ".css", ".scss", ".js", ".txt", ".json", ".csv", ".xml"]])
 
+# Charset dos arquivos texto servidos, os arquivos não são decodificados, então o charset só é informado ao cliente
+textCharset = "utf-8"
+
+# Resultado da última busca no cache de conteúdo feita por cada thread (True, False ou None caso o cache esteja desabilitado)
+# Usado pelas respostas para informar no log de acesso se o recurso veio do cache
+lastLookup = threading.local()
+
+# Índice e caches de conteúdo, inicializados pela função init_content
+contentIndex:  Optional[ContentIndex]  = None
+contentCache:  Optional[ContentCache]  = None
+negativeCache: Optional[NegativeCache] = None
+
+# Envio em partes, também inicializado pela função init_content (streamMinBytes None desabilita o envio em partes)
+streamMinBytes:   Optional[int] = None
+streamChunkBytes: int = 64 * 1024
+compressLevel:    int = 9
+
+class Content():
+    """
+    Classe que representa o conteúdo de um recurso, pronto para ser enviado ao cliente
+    O corpo é sempre bytes, ou um iterador de partes em bytes para arquivos enviados em partes
+    A codificação, o charset e o tamanho são metadados usados nos headers da resposta
+    
+    Atributos da Classe:
+        [bytes] body:     O conteúdo do recurso, exatamente como é enviado (ou um iterador das partes dele)
+        [str]   encoding: "gzip" caso o corpo esteja comprimido, None caso contrário
+        [str]   charset:  Charset dos recursos texto, None para recursos binários
+        [int]   length:   Tamanho do corpo em bytes, None caso ele só seja conhecido depois do envio (compressão em partes)
+    """
+    
+    __slots__ = ("body", "encoding", "charset", "length")
+    
+    def __init__(self, body:Union[bytes, Iterator[bytes]], encoding:Optional[str], charset:Optional[str], length:Optional[int]=None) -> None:
+        self.body     = body
+        self.encoding = encoding
+        self.charset  = charset
+        self.length   = len(body) if isinstance(body, bytes) else length
+    
+    def __len__(self) -> int:
+        # Usado pelo cache de conteúdo para calcular seu tamanho, conteúdos enviados em partes nunca entram no cache
+        return self.length or 0
+
+def init_content(serverConfig:ServerConfig) -> Optional[ContentWatcher]:
+    """
+    Função que inicializa o índice, o cache e o observador da pasta de conteúdo, de acordo com as configurações
+    O cache depende do observador, pois sem ele não há como saber quando uma entrada do cache ficou desatualizada
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        O observador da pasta de conteúdo, já executando, ou None caso ele esteja desabilitado
+    """
+    
+    global contentIndex, contentCache, negativeCache, streamMinBytes, streamChunkBytes, compressLevel
+    
+    streamMinBytes   = serverConfig.configValue["streamingMinBytes"] if serverConfig.configValue["streamingEnabled"] else None
+    streamChunkBytes = serverConfig.configValue["streamingChunkBytes"]
+    compressLevel    = serverConfig.configValue["compressLevel"]
+    
+    if not serverConfig.configValue["watcherEnabled"]:
+        log.info("Observador de conteúdo desabilitado, índice e cache de conteúdo não serão usados")
+        # Sem o índice, a existência dos recursos é verificada no disco, então guardo os caminhos que não existem
+        if serverConfig.configValue["negativeCacheEnabled"]:
+            negativeCache = NegativeCache(serverConfig.configValue["negativeCacheMaxEntries"], serverConfig.configValue["negativeCacheTTL"])
+        return None
+    
+    contentIndex = ContentIndex(serverConfig.configValue["contentRoot"])
+    if serverConfig.configValue["cacheEnabled"]:
+        contentCache = ContentCache(serverConfig.configValue["cacheMaxBytes"])
+    
+    watcher = ContentWatcher(contentIndex, contentCache, serverConfig.configValue["watcherInterval"], serverConfig.configValue["watcherBatchDelay"])
+    watcher.start()
+    
+    return watcher
+
+def resource_exists(path:str) -> bool:
+    """
+    Função que verifica se um recurso existe, usando o índice de conteúdo caso ele exista
+    Sem o índice, verifica no disco, guardando os caminhos que não existem no cache de caminhos inexistentes
+    
+    Recebe:
+        [str] path: Caminho para um recurso, incluindo a raiz de conteúdo
+    
+    Retorna:
+        True caso o recurso exista, False caso contrário
+    """
+    
+    if contentIndex is not None:
+        return contentIndex.exists(path)
+    
+    if negativeCache is None:
+        return os.path.exists(path)
+    
+    if negativeCache.is_missing(path):
+        return False
+    
+    if os.path.exists(path):
+        return True
+    
+    # Procurando a pasta mais alta do caminho que também não existe, para que outros caminhos dentro dela não precisem acessar o disco
+    missingRoot = None
+    parent = os.path.dirname(path.rstrip("/"))
+    while parent and not os.path.isdir(parent):
+        missingRoot = parent
+        parent = os.path.dirname(parent)
+    
+    negativeCache.add(path, missingRoot)
+    
+    return False
+
 def get_directory_content(path:str, serverConfig:ServerConfig) -> list[str]:
     """
     Função que vai abrir a pasta indicada pelo caminho path e retornar todos os arquivos dentro dela
@@ -55,6 +176,49 @@ def get_directory_content(path:str, serverConfig:ServerConfig) -> list[str]:
 
     return files
 
+def get_sidecar_path(filePath:str) -> Optional[str]:
+    """
+    Função que retorna o caminho do arquivo pré-comprimido (filePath + ".gz") gerado pelo Build.py, caso ele exista e esteja atualizado
+    O arquivo pré-comprimido só é usado se for mais recente que o arquivo original, caso contrário ele está desatualizado
+    """
+    
+    sidecarPath = filePath + ".gz"
+    
+    try:
+        if os.stat(sidecarPath).st_mtime_ns < os.stat(filePath).st_mtime_ns:
+            log.warning("Arquivo pré-comprimido %s está desatualizado, ignorando ele", sidecarPath)
+            return None
+    except OSError:
+        # Não ter um arquivo pré-comprimido não é um erro, apenas comprimo o arquivo normalmente
+        return None
+    
+    return sidecarPath
+
+def get_sidecar_contents(filePath:str) -> Optional[bytes]:
+    """
+    Função que procura pelo arquivo pré-comprimido (filePath + ".gz") gerado pelo Build.py
+    O arquivo pré-comprimido só é usado se for mais recente que o arquivo original, caso contrário ele está desatualizado
+    
+    Recebe:
+        [str] filePath: Caminho para um arquivo na pasta Content/
+    
+    Retorna:
+        Bytes com o conteúdo já comprimido com gzip
+        OU
+        None caso não exista um arquivo pré-comprimido válido
+    """
+    
+    sidecarPath = get_sidecar_path(filePath)
+    if sidecarPath is None:
+        return None
+    
+    try:
+        with open(sidecarPath, "rb") as fp:
+            return fp.read()
+    except OSError:
+        # O arquivo pode ter sido removido depois de ser encontrado, nesse caso comprimo o arquivo normalmente
+        return None
+
 def get_binary_file_contents(filePath:str) -> bytes:
     """
     Função que vai receber um caminho para um arquivo dentro da pasta Content/ e vai retornar o 
@@ -69,46 +233,159 @@ def get_binary_file_contents(filePath:str) -> bytes:
         # Não vou lidar com erros aqui, vou delegar isso para a função chamadora
         raise err
 
-def get_text_file_contents(filePath:str) -> str:
+def get_text_file_contents(filePath:str) -> bytes:
     """
     Função que vai receber um caminho para um arquivo dentro da pasta Content/ e vai retornar o 
-        conteúdo desse arquivo em uma string
+        conteúdo desse arquivo, sem decodificar ele
     """
     try:
-        with open(filePath) as fp:
+        with open(filePath, "rb") as fp:
             fileContents = fp.read()
         return fileContents
     except(OSError, FileNotFoundError) as err:
         # Não vou lidar com erros aqui, vou delegar isso para a função chamadora
         raise err
 
-def get_file_contents(filePath:str) -> Union[str, bytes]:
+def read_chunks(fp:BinaryIO) -> Iterator[bytes]:
+    """
+    Gerador que lê um arquivo já aberto em partes de streamChunkBytes, fechando o arquivo no final
+    """
+    
+    with fp:
+        while chunk := fp.read(streamChunkBytes):
+            yield chunk
+
+def compress_chunks(fp:BinaryIO) -> Iterator[bytes]:
+    """
+    Gerador que lê um arquivo já aberto em partes e comprime cada parte com gzip, fechando o arquivo no final
+    A compressão de uma parte acontece enquanto a parte anterior ainda está sendo enviada ao cliente
+    """
+    
+    # wbits = 31 gera o formato gzip (cabeçalho e CRC), igual ao gzip.compress
+    compressor = zlib.compressobj(compressLevel, zlib.DEFLATED, 31)
+    with fp:
+        while chunk := fp.read(streamChunkBytes):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+    yield compressor.flush()
+
+def is_streamed(filePath:str) -> bool:
+    """
+    Função que verifica se um arquivo é grande o suficiente para ser enviado em partes
+    """
+    
+    if streamMinBytes is None:
+        return False
+    
+    size = contentIndex.size(filePath) if contentIndex is not None else None
+    if size is None:
+        try:
+            size = os.path.getsize(filePath)
+        except OSError:
+            return False
+    
+    return size >= streamMinBytes
+
+def stream_file_contents(filePath:str, compressed:bool, useSidecars:bool) -> Content:
+    """
+    Função que abre um arquivo para ser enviado em partes, sem passar pelo cache de conteúdo
+    O arquivo é aberto aqui, para que erros ao abrir ele ainda possam ser respondidos com uma resposta de erro
+    
+    Recebe:
+        [str] filePath:     Caminho para um arquivo na pasta Content/
+        [bool] compressed:  Se o conteúdo deve ser enviado comprimido
+        [bool] useSidecars: Se arquivos .gz pré-comprimidos devem ser usados quando existirem
+    
+    Retorna:
+        O conteúdo do arquivo, cujo corpo é um gerador das partes do arquivo
+    """
+    
+    charset = textCharset if isTextFile(filePath) else None
+    
+    sidecarPath = get_sidecar_path(filePath) if compressed and useSidecars else None
+    if sidecarPath is not None:
+        log.debug("Enviando em partes o arquivo pré-comprimido %s", sidecarPath)
+        fp = open(sidecarPath, "rb")
+        return Content(read_chunks(fp), "gzip", charset, os.fstat(fp.fileno()).st_size)
+    
+    fp = open(filePath, "rb")
+    if charset is not None:
+        log.debug("Enviando em partes o arquivo texto %s", filePath)
+        return Content(read_chunks(fp), None, charset, os.fstat(fp.fileno()).st_size)
+    
+    log.debug("Enviando em partes e comprimindo o arquivo binário %s", filePath)
+    return Content(compress_chunks(fp), "gzip", None)
+
+def get_file_contents(filePath:str, acceptsGzip:bool=False, useSidecars:bool=False) -> Content:
     """
     Função que vai receber um caminho para um arquivo dentro da pasta Content/ e vai retornar o 
-        conteúdo desse arquivo: 
-            Em uma string caso seja um arquivo texto
-            Em bytes caso ele seja um arquivo binário
-    Essa função deve ser usada apenas para recuperar arquivos são arquivos texto
+        conteúdo desse arquivo, comprimido com gzip caso seja um arquivo binário ou um arquivo texto pré-comprimido
+    Arquivos grandes são enviados em partes (ver stream_file_contents)
     
     Recebe:
-        [str] filePath: Caminho para um arquivo na pasta Content/
+        [str] filePath:     Caminho para um arquivo na pasta Content/
+        [bool] acceptsGzip: Se o cliente aceita conteúdo comprimido com gzip
+        [bool] useSidecars: Se arquivos .gz pré-comprimidos devem ser usados quando existirem
     
     Retorna:
-        String com o conteúdo do arquivo em filePath
-        OU
-        Bytes com o conteúdo do arquivo em filePath
+        O conteúdo do arquivo em filePath e seus metadados
     """
     
     # Se chamou essa função, estou supondo que filePath é um caminho válido para um arquivo
     # Mais ainda, vou supor que o caminho inclui a raiz da pasta de conteúdo
     # Logo, não farei validações (além do try-except dentro das funções)
     
-    if isTextFile(filePath):
-        log.info(f"Procurando arquivo texto {filePath}")
-        return get_text_file_contents(filePath)
+    # Arquivos binários sempre são enviados comprimidos, arquivos texto apenas se o cliente aceitar
+    compressed = not isTextFile(filePath) or (acceptsGzip and useSidecars)
+    
+    lastLookup.cacheHit = None
+    
+    if is_streamed(filePath):
+        return stream_file_contents(filePath, compressed, useSidecars)
+    
+    if contentCache is not None:
+        cached = contentCache.get((filePath, compressed))
+        lastLookup.cacheHit = cached is not None
+        if cached is not None:
+            return cached
+        # A geração é lida antes do arquivo, para não guardar no cache um arquivo que mudou durante a leitura
+        generation = contentCache.generation
+    
+    fileContents = read_file_contents(filePath, compressed, useSidecars)
+    
+    if contentCache is not None:
+        contentCache.put((filePath, compressed), fileContents, generation)
+    
+    return fileContents
+
+def read_file_contents(filePath:str, compressed:bool, useSidecars:bool) -> Content:
+    """
+    Função que lê do disco o conteúdo de um arquivo, sem passar pelo cache de conteúdo
+    
+    Recebe:
+        [str] filePath:     Caminho para um arquivo na pasta Content/
+        [bool] compressed:  Se o conteúdo deve ser retornado comprimido
+        [bool] useSidecars: Se arquivos .gz pré-comprimidos devem ser usados quando existirem
+    
+    Retorna:
+        O conteúdo do arquivo em filePath e seus metadados
+    """
+    
+    charset = textCharset if isTextFile(filePath) else None
+    
+    if compressed and useSidecars:
+        sidecar = get_sidecar_contents(filePath)
+        if sidecar is not None:
+            log.debug("Usando arquivo pré-comprimido %s.gz", filePath)
+            return Content(sidecar, "gzip", charset)
+    
+    if charset is not None:
+        log.debug("Procurando arquivo texto %s", filePath)
+        return Content(get_text_file_contents(filePath), None, charset)
     else:
-        log.info(f"Procurando arquivo binário {filePath}")
-        return get_binary_file_contents(filePath)
+        log.debug("Procurando arquivo binário %s", filePath)
+        return Content(get_binary_file_contents(filePath), "gzip", None)
 
 def get_sizeof_resource(resourcePath:str, serverConfig:ServerConfig) -> int:
     """
@@ -128,7 +405,12 @@ def get_sizeof_resource(resourcePath:str, serverConfig:ServerConfig) -> int:
     
     # Primeiro verifico se o caminho é uma pasta
     if not resourcePath.endswith("/"):
-        # Se não, pego o tamanho desse arquivo
+        # Se não, pego o tamanho desse arquivo, do índice caso ele exista
+        if contentIndex is not None:
+            size = contentIndex.size(resourcePath)
+            if size is None:
+                raise FileNotFoundError(resourcePath)
+            return size
         return os.path.getsize(resourcePath)
     
     # Se sim, recupero os conteúdos dessa pasta numa lista
@@ -147,10 +429,10 @@ def get_sizeof_resource(resourcePath:str, serverConfig:ServerConfig) -> int:
             return os.path.getsize(files[files.index("index.html")])
     
     # Caso não tenha um index.html, retorna o tamanho do primeiro arquivo da lista
-    log.warning(f"A pasta {resourcePath} contém múltiplos arquivos, nenhum dos quais se chama index.html, estou recuperando o primeiro arquivo encontrado.")
+    log.warning("A pasta %s contém múltiplos arquivos, nenhum dos quais se chama index.html, estou recuperando o primeiro arquivo encontrado.", resourcePath)
     return os.path.getsize(files[0])
 
-def get_resource(resourcePath:str, serverConfig:ServerConfig) -> Union[str, bytes]:
+def get_resource(resourcePath:str, serverConfig:ServerConfig, acceptsGzip:bool=False) -> Content:
     """
     Função que vai receber um caminho para um recurso dentro da pasta Content/ e vai retornar o 
         conteúdo desse recurso
@@ -159,19 +441,20 @@ def get_resource(resourcePath:str, serverConfig:ServerConfig) -> Union[str, byte
     Recebe:
         [str] resourcePath: Caminho para um arquivo na pasta Content/
         [ServerConfig] serverConfig: Dados de configuração do servidor
+        [bool] acceptsGzip: Se o cliente aceita conteúdo comprimido com gzip
     
     Retorna:
-        String contendo o conteúdo do arquivo em resourcePath
-        OU
-        Bytes contendo o conteúdo do arquivo binário em resourcePath
+        O conteúdo do arquivo em resourcePath e seus metadados
     """
     
-    log.info(f"Procurando o recurso {resourcePath}")
+    log.debug("Procurando o recurso %s", resourcePath)
+    
+    useSidecars = serverConfig.configValue["useSidecars"]
     
     # Primeiro verifico se o caminho é uma pasta
     if not resourcePath.endswith("/"):
         # Se não, verifico que tipo de arquivo ele é e leio ele
-        return get_file_contents(resourcePath)
+        return get_file_contents(resourcePath, acceptsGzip, useSidecars)
     
     # Se sim, recupero os conteúdos dessa pasta numa lista
     try:
@@ -181,13 +464,13 @@ def get_resource(resourcePath:str, serverConfig:ServerConfig) -> Union[str, byte
     
     if len(files) == 1:
         # Caso tenha apenas um arquivo recupero o conteúdo dele e retorno isso
-        return get_file_contents(resourcePath + files[0])
+        return get_file_contents(resourcePath + files[0], acceptsGzip, useSidecars)
     
     for file in files:
         # Caso tenha múltiplos arquivos, verifico se tem um arquivo chamado "index.html" e retorno seu conteúdo
         if "index.html" in file:
-            return get_file_contents(resourcePath + files[files.index("index.html")])
+            return get_file_contents(resourcePath + files[files.index("index.html")], acceptsGzip, useSidecars)
     
     # Caso não tenha um index.html, retorna o primeiro arquivo da lista
-    log.warning(f"A pasta {resourcePath} contém múltiplos arquivos, nenhum dos quais se chama index.html, estou recuperando o primeiro arquivo encontrado.")
-    return get_file_contents(resourcePath + files[0])
\ No newline at end of file
+    log.warning("A pasta %s contém múltiplos arquivos, nenhum dos quais se chama index.html, estou recuperando o primeiro arquivo encontrado.", resourcePath)
+    return get_file_contents(resourcePath + files[0], acceptsGzip, useSidecars)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import logging                         # Biblioteca de criação de logs
+import os                              # Para percorrer a pasta de conteúdo
+import threading                       # Para proteger as atualizações do índice
+from typing import Optional            # Anotações de tipo
+
+"""
+ContentIndex.py
+Módulo que define o índice dos arquivos dentro da pasta raiz de conteúdo
+O índice guarda, para cada arquivo, o instante da última modificação e o seu tamanho
+Com ele, é possível saber se um recurso existe (e qual seu tamanho) sem fazer um stat() no disco a cada requisição
+O índice é construído na inicialização do servidor e atualizado incrementalmente pelo ContentWatcher (módulo Watcher)
+"""
+
+log = logging.getLogger("Main.Server.Index")
+
+def scan(contentRoot:str) -> "tuple[dict[str, tuple[int, int]], set[str]]":
+    """
+    Função que percorre a pasta raiz de conteúdo e gera uma fotografia dos arquivos e pastas dentro dela
+    
+    Recebe:
+        [str] contentRoot: A pasta raiz de conteúdo
+    
+    Retorna:
+        Uma tupla com um dict (caminho do arquivo -> (mtime em ns, tamanho)) e um set com os caminhos das pastas
+    """
+    
+    files: dict[str, tuple[int, int]] = dict()
+    directories: set[str] = set()
+    
+    for directory, _, fileNames in os.walk(contentRoot):
+        directories.add(directory)
+        for fileName in fileNames:
+            path = os.path.join(directory, fileName)
+            try:
+                fileStat = os.stat(path)
+            except OSError:
+                # O arquivo pode ter sido removido entre o listdir e o stat
+                continue
+            files[path] = (fileStat.st_mtime_ns, fileStat.st_size)
+    
+    return (files, directories)
+
+class ContentIndex():
+    """
+    Classe que representa o índice da pasta raiz de conteúdo
+    As atualizações do índice trocam os dicts inteiros de uma vez, então uma requisição sendo processada
+        sempre enxerga uma versão consistente do índice (antes ou depois da atualização, nunca no meio dela)
+    
+    Atributos da Classe:
+        [str]                        contentRoot: A pasta raiz de conteúdo
+        [dict(str, tuple(int, int))] files:       Arquivos indexados, caminho -> (mtime em ns, tamanho)
+        [set(str)]                   directories: Pastas indexadas
+    """
+    
+    def __init__(self, contentRoot:str) -> None:
+        self.contentRoot = contentRoot
+        self.lock        = threading.Lock()
+        self.files, self.directories = scan(contentRoot)
+        
+        log.info(f"Índice construído com {len(self.files)} arquivos em {len(self.directories)} pastas")
+    
+    def exists(self, path:str) -> bool:
+        """
+        Método que verifica se um arquivo ou pasta existe no índice
+        
+        Recebe:
+            [str] path: Caminho de um arquivo ou pasta, incluindo a raiz de conteúdo
+        
+        Retorna:
+            True caso o caminho exista, False caso contrário
+        """
+        
+        return path in self.files or path.rstrip("/") in self.directories
+    
+    def size(self, path:str) -> Optional[int]:
+        """
+        Método que retorna o tamanho de um arquivo do índice
+        
+        Recebe:
+            [str] path: Caminho de um arquivo, incluindo a raiz de conteúdo
+        
+        Retorna:
+            O tamanho do arquivo em bytes, ou None caso ele não esteja no índice
+        """
+        
+        entry = self.files.get(path)
+        return None if entry is None else entry[1]
+    
+    def diff(self, files:"dict[str, tuple[int, int]]") -> "tuple[list[str], list[str], list[str]]":
+        """
+        Método que compara o índice atual com uma nova fotografia da pasta de conteúdo
+        
+        Recebe:
+            [dict] files: Nova fotografia dos arquivos, gerada pela função scan
+        
+        Retorna:
+            Uma tupla com as listas de arquivos adicionados, removidos e modificados
+        """
+        
+        current  = self.files
+        added    = [path for path in files if path not in current]
+        removed  = [path for path in current if path not in files]
+        modified = [path for path, entry in files.items() if path in current and current[path] != entry]
+        
+        return (added, removed, modified)
+    
+    def update(self, files:"dict[str, tuple[int, int]]", directories:"set[str]") -> None:
+        """
+        Método que substitui o conteúdo do índice por uma nova fotografia da pasta de conteúdo
+        
+        Recebe:
+            [dict] files:      Nova fotografia dos arquivos
+            [set] directories: Nova fotografia das pastas
+        
+        Retorna:
+            Nada
+        """
+        
+        with self.lock:
+            self.files       = files
+            self.directories = directories
@@ -42,6 +42,17 @@ class NotFound(HTTPException): # 404
     def __init__(self, message:str, requestedPath:str) -> None:
         super().__init__(message, 404, requestedPath)
 
+class MethodNotAllowed(HTTPException): # 405
+    """
+    Exceção que é lançada quando o método da requisição é implementado pelo servidor, mas não para o recurso requisitado
+    Guarda os métodos permitidos para o recurso, que são enviados no header Allow
+    """
+    
+    def __init__(self, message:str, method:str, allowed:"list[str]") -> None:
+        super().__init__(message, 405, method)
+        
+        self.allowed = allowed # Métodos permitidos para o recurso
+
 class ImTeapot(HTTPException): # 418
     """
     Exceção que é lançada quando não quero lidar com a requisição do cliente
@@ -50,6 +61,17 @@ class ImTeapot(HTTPException): # 418
     def __init__(self, message:str) -> None:
         super().__init__(message, 418, message)
         
+class TooManyRequests(HTTPException): # 429
+    """
+    Exceção que é lançada quando o cliente passou do limite de requisições (ver RateLimit.py)
+    Guarda em quantos segundos o cliente pode tentar novamente, que é enviado no header Retry-After
+    """
+    
+    def __init__(self, message:str, client:str, retryAfter:int) -> None:
+        super().__init__(message, 429, client)
+        
+        self.retryAfter = retryAfter # Segundos até o cliente poder tentar novamente
+        
 class InternalError(HTTPException): # 500
     """
     Exceção que é lançada quando ocorre um erro no servidor
@@ -66,6 +88,17 @@ class MethodNotImplemented(HTTPException): # 501
     def __init__(self, message:str, method:str) -> None:
         super().__init__(message, 501, message)
         
+class ServiceUnavailable(HTTPException): # 503
+    """
+    Exceção que é lançada quando o servidor está sobrecarregado e recusa a requisição (ver Admission.py)
+    O problema é o motivo da sobrecarga, e guarda em quantos segundos o cliente pode tentar novamente, que é enviado no header Retry-After
+    """
+    
+    def __init__(self, message:str, reason:str, retryAfter:int) -> None:
+        super().__init__(message, 503, reason)
+        
+        self.retryAfter = retryAfter # Segundos até o cliente poder tentar novamente
+        
 class VersionNotSupported(HTTPException): # 505
     """
     Exceção que é lançada quando a requisição pede uma versão HTTP que não é suportada
@@ -0,0 +1,153 @@
+import logging                         # Biblioteca de criação de logs
+import Exceptions                      # Módulo de Exceções específicas do Servidor
+from typing import Iterator, Optional, Union # Anotações de tipo
+
+"""
+Headers.py
+Módulo que define o mapa de cabeçalhos das requisições
+Os cabeçalhos ficam guardados nos bytes recebidos do cliente e só são interpretados no primeiro acesso,
+    então requisições que são respondidas sem olhar os cabeçalhos (ex: erros de validação, OPTIONS) nunca interpretam eles
+
+Os nomes dos cabeçalhos não diferenciam maiúsculas de minúsculas (RFC 9110), e um cabeçalho pode aparecer várias vezes na requisição
+Os valores são decodificados como ISO-8859-1 e não mantém os espaços antes e depois do valor
+"""
+
+log = logging.getLogger("Main.Server.Request.Headers")
+
+class HeaderMap():
+    """
+    Classe que representa os cabeçalhos de uma requisição
+    
+    Atributos da Classe:
+        [bytes] raw:    Os cabeçalhos como foram recebidos, uma linha "nome: valor" por cabeçalho, liberados depois de interpretados
+        [dict]  fields: Nome em minúsculas -> valor, ou lista de valores caso o cabeçalho se repita, None até o primeiro acesso
+    """
+    
+    __slots__ = ("raw", "fields")
+    
+    def __init__(self, raw:bytes) -> None:
+        self.raw = raw
+        self.fields: Optional[dict[str, Union[str, list[str]]]] = None
+    
+    def parse(self) -> "dict[str, Union[str, list[str]]]":
+        """
+        Método que interpreta os cabeçalhos, apenas no primeiro acesso
+        Levanta BadRequest caso uma linha não seja um cabeçalho válido
+        
+        Retorna:
+            O dicionário de nomes em minúsculas -> valores
+        """
+        
+        if self.fields is not None:
+            return self.fields
+        
+        # A maioria dos cabeçalhos aparece uma vez só, então uma lista só é criada quando um cabeçalho se repete
+        fields: dict[str, Union[str, list[str]]] = dict()
+        for line in self.raw.splitlines():
+            if not line: # Isso me deu muita dor de cabeça
+                continue
+            
+            name, separator, value = line.partition(b":")
+            # Espaços antes do ":" (ou linhas de continuação, que começam com espaço) não são permitidos
+            if not separator or not name or name != name.strip():
+                log.error("Erro ao interpretar cabeçalho:%r", line)
+                raise Exceptions.BadRequest("Requisição Mal Formatada!", line.decode("latin-1"))
+            
+            key      = name.decode("latin-1").lower()
+            decoded  = value.strip().decode("latin-1")
+            previous = fields.get(key)
+            if previous is None:
+                fields[key] = decoded
+            elif isinstance(previous, list):
+                previous.append(decoded)
+            else:
+                fields[key] = [previous, decoded]
+        
+        self.fields = fields
+        self.raw    = b""
+        return fields
+    
+    def get(self, name:str, default:Optional[str]=None) -> Optional[str]:
+        """
+        Método que retorna o valor de um cabeçalho
+        Caso o cabeçalho apareça várias vezes, os valores são combinados com ", " (RFC 9110, seção 5.3)
+        
+        Recebe:
+            [str] name:    Nome do cabeçalho, sem diferenciar maiúsculas de minúsculas
+            [str] default: Valor retornado caso o cabeçalho não exista
+        
+        Retorna:
+            O valor do cabeçalho, ou default
+        """
+        
+        value = self.parse().get(name.lower())
+        if value is None:
+            return default
+        return value if isinstance(value, str) else ", ".join(value)
+    
+    def get_all(self, name:str) -> "list[str]":
+        """
+        Método que retorna todos os valores de um cabeçalho, na ordem em que foram recebidos
+        """
+        
+        value = self.parse().get(name.lower())
+        if value is None:
+            return []
+        return [value] if isinstance(value, str) else list(value)
+    
+    def accepts_encoding(self, coding:str) -> bool:
+        """
+        Método que verifica se o cliente aceita uma codificação de conteúdo (ex: gzip) no cabeçalho Accept-Encoding (RFC 9110, seção 12.5.3)
+        Cada codificação pode ter um peso (q), peso 0 indica que ela não é aceita, e "*" vale para as codificações não listadas
+        
+        Recebe:
+            [str] coding: Nome da codificação, em minúsculas
+        
+        Retorna:
+            True caso o cliente aceite a codificação, False caso contrário
+        """
+        
+        wildcard = False
+        for value in self.get_all("Accept-Encoding"):
+            for token in value.split(","):
+                name, _, parameters = token.partition(";")
+                name = name.strip().lower()
+                
+                weight = 1.0
+                for parameter in parameters.split(";"):
+                    key, _, number = parameter.partition("=")
+                    if key.strip().lower() == "q":
+                        try:
+                            weight = float(number)
+                        except ValueError:
+                            weight = 0.0
+                
+                if name == coding:
+                    return weight > 0
+                if name == "*":
+                    wildcard = weight > 0
+        
+        return wildcard
+    
+    def items(self) -> Iterator["tuple[str, str]"]:
+        """
+        Método que itera pelos pares (nome em minúsculas, valor), um par para cada valor
+        """
+        
+        for name, value in self.parse().items():
+            if isinstance(value, str):
+                yield (name, value)
+            else:
+                for item in value:
+                    yield (name, item)
+    
+    def __str__(self) -> str:
+        if self.fields is None:
+            return self.raw.decode("latin-1").replace("\r", "")
+        return "".join(f"{name}: {value}\n" for name, value in self.items())
+    
+    def __contains__(self, name:object) -> bool:
+        return isinstance(name, str) and name.lower() in self.parse()
+    
+    def __len__(self) -> int:
+        return sum(1 if isinstance(value, str) else len(value) for value in self.parse().values())
@@ -0,0 +1,299 @@
+import logging                         # Biblioteca de criação de logs
+import os                              # Permissões da socket Unix e variáveis de ambiente
+import socket                          # Sockets que recebem as conexões
+import ssl                             # Contexto TLS dos listeners do tipo tls
+import stat                            # Verificação de sockets Unix abandonadas
+import TLS                             # Contextos TLS e handshakes das conexões HTTPS
+from typing import Any, Optional       # Anotações de tipo
+from Configuration import ServerConfig # Configurações do Servidor
+
+"""
+Listeners.py
+Módulo que cria as sockets que recebem as conexões do servidor (listeners)
+O servidor pode escutar em várias sockets ao mesmo tempo, todas atendidas pelo mesmo loop principal,
+    configuradas como uma lista de tabelas [[Listeners]] no config.toml, com um dos tipos:
+    tcp:  TCP em host:port (por padrão as configurações host e port, ou a porta passada na linha de comando)
+    tls:  TCP em host:port como o tcp, com as conexões em HTTPS usando o certificado cert e a chave key (ver TLS.py)
+    unix: socket Unix em path, com as permissões mode e opcionalmente o grupo group,
+          para servir um proxy reverso na mesma máquina sem passar pelo TCP do loopback
+    fd:   socket já aberta e escutando, passada por um supervisor (socket activation)
+          com fd, o descritor informado; sem fd, os descritores passados pelo systemd (LISTEN_FDS, a partir do 3)
+Sem [[Listeners]], o servidor escuta apenas em TCP em host:port
+
+Ao reiniciar o servidor (SIGUSR2), as sockets são passadas para o novo processo na variável de ambiente listenFdVariable,
+    como pares índice da configuração:descritor separados por vírgulas, então nenhuma conexão é recusada durante a troca
+O arquivo de uma socket Unix só é removido quando ela é fechada pelo último processo que a usa
+"""
+
+log = logging.getLogger("Main.Server.Listeners")
+
+listenFdVariable = "TINY_SERVER_LISTEN_FD" # Variável de ambiente que passa as sockets do servidor para o novo processo
+backlog = 10 # Número máximo de conexões esperando para serem aceitas em cada socket
+firstSystemdFd = 3 # Primeiro descritor passado pelo systemd (SD_LISTEN_FDS_START)
+
+class Listener():
+    """
+    Classe que representa uma socket que recebe conexões
+    
+    Atributos da Classe:
+        [socket] socket: A socket, já escutando
+        [str]    kind:   Tipo da socket ("tcp", "tls", "unix" ou "fd")
+        [str]    name:   Nome legível, usado nos logs (ex: 127.0.0.1:9999, unix:/run/tiny.sock)
+        [int]    index:  Índice da configuração que criou a socket, passado ao novo processo em um reinício
+        [str]    path:   Arquivo da socket Unix criada por esse servidor, None nos outros casos
+        [SSLContext] context: Contexto TLS das conexões aceitas, None caso as conexões não usem TLS
+    """
+    
+    __slots__ = ("socket", "kind", "name", "index", "path", "context")
+    
+    def __init__(self, sock:socket.socket, kind:str, name:str, index:int, path:Optional[str]=None,
+                 context:Optional[ssl.SSLContext]=None) -> None:
+        self.socket  = sock
+        self.kind    = kind
+        self.name    = name
+        self.index   = index
+        self.path    = path
+        self.context = context
+
+def socket_name(sock:socket.socket) -> str:
+    """
+    Função que retorna o nome legível de uma socket a partir do seu endereço local
+    """
+    
+    if sock.family == getattr(socket, "AF_UNIX", None):
+        return f"unix:{sock.getsockname()}"
+    
+    address = sock.getsockname()
+    return f"[{address[0]}]:{address[1]}" if sock.family == socket.AF_INET6 else f"{address[0]}:{address[1]}"
+
+def create_tcp(spec:"dict[str, Any]", serverConfig:ServerConfig, port:int) -> socket.socket:
+    """
+    Função que cria uma socket TCP escutando em host:port, IPv6 caso o host seja um endereço IPv6
+    """
+    
+    host = spec.get("host", serverConfig.configValue["host"])
+    
+    serverSocket = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    # Permite reiniciar o servidor imediatamente, sem esperar as conexões antigas saírem do TIME_WAIT
+    serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    serverSocket.bind((host, spec.get("port", port)))
+    serverSocket.listen(backlog)
+    
+    return serverSocket
+
+def remove_stale_socket(path:str) -> None:
+    """
+    Função que remove o arquivo de uma socket Unix abandonada (ex: de um servidor que foi morto)
+    Levanta OSError caso o arquivo não seja uma socket ou caso outro processo ainda esteja escutando nela
+    """
+    
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path} já existe e não é uma socket")
+    
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            log.info("Removendo socket Unix abandonada %s", path)
+            os.unlink(path)
+            return
+    
+    raise OSError(f"Outro processo já está escutando em {path}")
+
+def create_unix(spec:"dict[str, Any]") -> socket.socket:
+    """
+    Função que cria uma socket Unix em path, com as permissões mode (padrão 0o660) e o grupo group
+    As permissões já valem no momento em que o arquivo é criado, então não existe um instante em que a socket fica aberta para todos
+    """
+    
+    path = spec["path"]
+    mode = spec.get("mode", 0o660)
+    
+    remove_stale_socket(path)
+    
+    serverSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    oldUmask = os.umask(0o777 & ~mode)
+    try:
+        serverSocket.bind(path)
+    except OSError:
+        serverSocket.close()
+        raise
+    finally:
+        os.umask(oldUmask)
+    
+    if "group" in spec:
+        import grp # Apenas em sistemas Unix
+        os.chown(path, -1, grp.getgrnam(spec["group"]).gr_gid)
+    
+    serverSocket.listen(backlog)
+    
+    return serverSocket
+
+def adopt_fd(fd:int) -> socket.socket:
+    """
+    Função que usa uma socket já aberta, verificando se ela está escutando
+    """
+    
+    serverSocket = socket.socket(fileno=fd)
+    if not serverSocket.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN):
+        serverSocket.detach()
+        raise OSError(f"O descritor {fd} não é uma socket escutando")
+    
+    return serverSocket
+
+def systemd_fds() -> "list[int]":
+    """
+    Função que retorna os descritores passados pelo systemd, caso eles sejam destinados a esse processo
+    """
+    
+    if os.environ.get("LISTEN_PID") != str(os.getpid()):
+        return []
+    
+    try:
+        count = int(os.environ.get("LISTEN_FDS", "0"))
+    except ValueError:
+        return []
+    
+    return list(range(firstSystemdFd, firstSystemdFd + count))
+
+def create_listeners(spec:"dict[str, Any]", index:int, serverConfig:ServerConfig, port:int) -> "list[Listener]":
+    """
+    Função que cria as sockets de uma configuração de [[Listeners]]
+    Uma configuração do tipo fd sem descritor pode gerar várias sockets (uma para cada descritor do systemd)
+    
+    Recebe:
+        [dict] spec:                 A configuração
+        [int] index:                 O índice da configuração na lista
+        [ServerConfig] serverConfig: Configurações do servidor
+        [int] port:                  A porta padrão das sockets TCP
+    
+    Retorna:
+        As sockets criadas
+    """
+    
+    kind = spec.get("type", "tcp")
+    
+    if kind == "tcp":
+        tcpSocket = create_tcp(spec, serverConfig, port)
+        return [Listener(tcpSocket, kind, socket_name(tcpSocket), index)]
+    
+    if kind == "tls":
+        # O contexto é criado antes da socket, então um certificado inválido não deixa uma socket aberta
+        context   = TLS.server_context(spec)
+        tlsSocket = create_tcp(spec, serverConfig, port)
+        return [Listener(tlsSocket, kind, f"tls:{socket_name(tlsSocket)}", index, context=context)]
+    
+    if kind == "unix":
+        return [Listener(create_unix(spec), kind, f"unix:{spec['path']}", index, spec["path"])]
+    
+    if kind == "fd":
+        fds = [spec["fd"]] if "fd" in spec else systemd_fds()
+        if not fds:
+            log.warning("Nenhum descritor recebido do systemd (LISTEN_FDS) para o listener %d", index)
+        adopted = [adopt_fd(fd) for fd in fds]
+        return [Listener(fdSocket, kind, f"fd:{fdSocket.fileno()} ({socket_name(fdSocket)})", index) for fdSocket in adopted]
+    
+    raise ValueError(f"Tipo de listener desconhecido: {kind}")
+
+class ListenerSet():
+    """
+    Classe que representa as sockets do servidor, usada com with para que todas sejam fechadas quando o servidor encerra
+    
+    Atributos da Classe:
+        [list] listeners:  As sockets
+        [bool] handedOver: Se as sockets foram passadas para um novo processo (reinício), nesse caso os arquivos
+                           das sockets Unix não são removidos ao fechar
+    """
+    
+    def __init__(self, listeners:"list[Listener]") -> None:
+        self.listeners  = listeners
+        self.handedOver = False
+    
+    def __enter__(self) -> "ListenerSet":
+        return self
+    
+    def __exit__(self, *args:Any) -> None:
+        self.close()
+    
+    def __iter__(self) -> Any:
+        return iter(self.listeners)
+    
+    def inheritance(self) -> str:
+        """
+        Método que retorna o valor de listenFdVariable que passa as sockets para um novo processo
+        """
+        
+        return ",".join(f"{listener.index}:{listener.socket.fileno()}" for listener in self.listeners)
+    
+    def close(self) -> None:
+        """
+        Método que fecha as sockets, removendo os arquivos das sockets Unix caso elas não tenham sido passadas para um novo processo
+        """
+        
+        for listener in self.listeners:
+            listener.socket.close()
+            if listener.path is not None and not self.handedOver:
+                try:
+                    os.unlink(listener.path)
+                except OSError:
+                    pass
+
+def inherited_listeners(inherited:str, specs:"list[dict[str, Any]]") -> "list[Listener]":
+    """
+    Função que recupera as sockets passadas pelo processo anterior do servidor em um reinício
+    """
+    
+    listeners = []
+    for pair in inherited.split(","):
+        index, _, fd = pair.partition(":")
+        spec = specs[int(index)] if int(index) < len(specs) else {}
+        
+        inheritedSocket = socket.socket(fileno=int(fd))
+        kind = spec.get("type", "unix" if inheritedSocket.family == getattr(socket, "AF_UNIX", None) else "tcp")
+        path = inheritedSocket.getsockname() if inheritedSocket.family == getattr(socket, "AF_UNIX", None) else None
+        # O contexto TLS não passa para o novo processo, ele é criado novamente a partir da configuração
+        context = TLS.server_context(spec) if kind == "tls" else None
+        name = f"tls:{socket_name(inheritedSocket)}" if kind == "tls" else socket_name(inheritedSocket)
+        listeners.append(Listener(inheritedSocket, kind, name, int(index), path or None, context))
+    
+    return listeners
+
+def open_listeners(serverConfig:ServerConfig, port:int) -> ListenerSet:
+    """
+    Função que cria as sockets que recebem as conexões do servidor, de acordo com [[Listeners]]
+    Caso o servidor tenha sido iniciado por outro processo do servidor (reinício com SIGUSR2), reaproveita as sockets herdadas
+        e cria apenas as que não existiam no processo anterior
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+        [int] port:                  A porta das sockets TCP que não informam uma porta
+    
+    Retorna:
+        As sockets do servidor, já escutando
+    """
+    
+    specs = serverConfig.configValue["listeners"] or [{"type": "tcp"}]
+    
+    listeners: list[Listener] = []
+    
+    inherited = os.environ.pop(listenFdVariable, None)
+    if inherited:
+        log.info(f"Usando as sockets herdadas do processo anterior ({inherited})")
+        listeners = inherited_listeners(inherited, specs)
+    
+    # Sockets configuradas que não foram herdadas (ex: adicionadas antes do reinício) são criadas
+    inheritedIndexes = {listener.index for listener in listeners}
+    try:
+        for index, spec in enumerate(specs):
+            if index not in inheritedIndexes:
+                listeners.extend(create_listeners(spec, index, serverConfig, port))
+    except Exception:
+        ListenerSet(listeners).close()
+        raise
+    
+    return ListenerSet(listeners)
@@ -0,0 +1,221 @@
+import atexit                          # Escrita das mensagens da fila caso o servidor encerre antes do log começar
+import logging                         # Biblioteca de criação de logs
+import logging.handlers                # QueueHandler, QueueListener e RotatingFileHandler
+import os                              # Tamanho do arquivo de log existente
+import queue                           # Fila entre o loop do servidor e a thread que escreve o log
+import threading                       # Thread que esvazia periodicamente o buffer do arquivo de log
+import time                            # Controle dos intervalos de escrita e de rotação
+from typing import Optional            # Anotações de tipo
+from Configuration import ServerConfig, defaultConfig # Configurações do Servidor e o arquivo de log padrão
+
+"""
+LogHandler.py
+Módulo que configura o sistema de logging do servidor
+Para não fazer escrita em disco no loop principal do servidor, as mensagens de log são colocadas em uma fila (QueueHandler)
+Uma thread separada (QueueListener) retira as mensagens da fila e escreve elas no arquivo de log
+As escritas no arquivo são feitas em lotes: as mensagens ficam num buffer que é escrito no disco a cada N mensagens ou T segundos
+O arquivo de log é rotacionado quando atinge um tamanho máximo ou depois de um intervalo de tempo
+
+Uso:
+    init_logging() é chamada assim que o servidor inicia, antes das configurações serem lidas
+        Mensagens geradas antes de start_logging ficam guardadas na fila e são escritas quando o log começa
+    start_logging(serverConfig) começa a escrever o log, de acordo com as configurações
+    stop_logging() escreve as mensagens pendentes e encerra a thread do log
+    Caso o processo encerre antes de start_logging (ex: configuração crítica ausente), as mensagens da fila
+        são escritas no arquivo de log padrão ao sair (ver flush_startup_log), para que o motivo não se perca
+"""
+
+# Fila que recebe as mensagens de log de todas as threads do servidor
+logQueue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+# Thread que escreve as mensagens no arquivo, inicializada por start_logging
+listener: Optional[logging.handlers.QueueListener] = None
+
+# Formato das mensagens no arquivo de log
+logFormatter = logging.Formatter("(%(asctime)s) [%(levelname)s] %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Classe que escreve as mensagens de log em um arquivo, em lotes, rotacionando o arquivo por tamanho ou por tempo
+    Diferente do RotatingFileHandler, não faz flush() (nem seek()/tell() no arquivo) a cada mensagem
+    
+    Atributos da Classe:
+        [float] rotateInterval: Intervalo em segundos entre rotações do arquivo, 0 para rotacionar apenas por tamanho
+        [float] flushInterval:  Tempo máximo em segundos que uma mensagem fica no buffer antes de ser escrita
+        [int]   flushRecords:   Número de mensagens no buffer que força a escrita do buffer
+    """
+    
+    def __init__(self, filename:str, maxBytes:int, backupCount:int, rotateInterval:float, flushInterval:float, flushRecords:int) -> None:
+        self.rotateInterval = rotateInterval
+        self.flushInterval  = flushInterval
+        self.flushRecords   = flushRecords
+        self.pendingRecords = 0
+        self.lastFlush      = time.monotonic()
+        self.rolloverAt     = time.time() + rotateInterval
+        
+        # O arquivo é aberto em modo "a" para não apagar o log de execuções anteriores (ou do processo anterior num reinício)
+        super().__init__(filename, mode="a", maxBytes=maxBytes, backupCount=backupCount, encoding="utf-8")
+        
+        self.bytesWritten = os.path.getsize(filename) if os.path.exists(filename) else 0
+        
+        # Thread que escreve o buffer no disco mesmo quando não chegam novas mensagens
+        self.stopEvent = threading.Event()
+        self.flusher   = threading.Thread(target=self.flush_periodically, name="LogFlusher", daemon=True)
+        self.flusher.start()
+    
+    def _open(self):
+        # Buffer grande para juntar várias mensagens em uma única escrita no disco
+        return open(self.baseFilename, self.mode, buffering=64 * 1024, encoding=self.encoding)
+    
+    def emit(self, record:logging.LogRecord) -> None:
+        """
+        Método que escreve uma mensagem no buffer do arquivo de log, rotacionando o arquivo caso necessário
+        É chamado pela thread do QueueListener, nunca pelo loop principal do servidor
+        """
+        
+        try:
+            message = self.format(record) + self.terminator
+            # O tamanho é contado em bytes codificados, o log tem muitos caracteres acentuados que ocupam mais de um byte
+            size    = len(message.encode(self.encoding)) if self.maxBytes > 0 else 0
+            
+            sizeExceeded = self.maxBytes > 0 and self.bytesWritten + size >= self.maxBytes
+            timeExceeded = self.rotateInterval > 0 and time.time() >= self.rolloverAt
+            if sizeExceeded or timeExceeded:
+                self.doRollover()
+                self.bytesWritten = 0
+                self.rolloverAt   = time.time() + self.rotateInterval
+            
+            self.stream.write(message)
+            self.bytesWritten   += size
+            self.pendingRecords += 1
+            
+            if self.pendingRecords >= self.flushRecords or time.monotonic() - self.lastFlush >= self.flushInterval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self) -> None:
+        """
+        Método que escreve no disco as mensagens que estão no buffer
+        """
+        
+        self.pendingRecords = 0
+        self.lastFlush      = time.monotonic()
+        super().flush()
+    
+    def flush_periodically(self) -> None:
+        """
+        Loop da thread que escreve o buffer no disco a cada flushInterval segundos, caso tenha mensagens pendentes
+        """
+        
+        while not self.stopEvent.wait(self.flushInterval):
+            self.acquire()
+            try:
+                if self.pendingRecords > 0:
+                    self.flush()
+            finally:
+                self.release()
+    
+    def close(self) -> None:
+        self.stopEvent.set()
+        super().close()
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Classe que coloca as mensagens de log na fila sem formatar elas
+    O QueueHandler padrão formata a mensagem (junta a mensagem com seus argumentos) antes de colocar ela na fila,
+        ou seja, na thread que gerou a mensagem, que no caso do servidor é o loop principal
+    Como o servidor roda em um único processo, a mensagem pode ir para a fila como está e ser formatada pela thread do log
+    """
+    
+    def prepare(self, record:logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def init_logging() -> None:
+    """
+    Função que direciona todas as mensagens de log para a fila de log
+    Enquanto start_logging não for chamada, as mensagens apenas se acumulam na fila
+    
+    Recebe:
+        Nada
+    
+    Retorna:
+        Nada
+    """
+    
+    root = logging.getLogger()
+    root.addHandler(DeferredQueueHandler(logQueue))
+    root.setLevel(logging.DEBUG)
+
+    atexit.register(flush_startup_log)
+
+def flush_startup_log() -> None:
+    """
+    Função executada ao sair do processo, que escreve no arquivo de log padrão as mensagens que ficaram na fila
+        caso o log nunca tenha começado (ex: sys.exit() por uma configuração crítica ausente)
+    Depois de start_logging, não faz nada, as mensagens são escritas pela thread do log
+    
+    Recebe:
+        Nada
+    
+    Retorna:
+        Nada
+    """
+    
+    if listener is not None or logQueue.empty():
+        return
+    
+    fileHandler = logging.FileHandler(defaultConfig["logFile"], mode="a", encoding="utf-8")
+    fileHandler.setFormatter(logFormatter)
+    while True:
+        try:
+            fileHandler.handle(logQueue.get_nowait())
+        except queue.Empty:
+            break
+    fileHandler.close()
+
+def start_logging(serverConfig:ServerConfig) -> None:
+    """
+    Função que inicia a thread que escreve as mensagens da fila no arquivo de log
+    O nível do log é aplicado nos loggers, assim mensagens abaixo do nível configurado nem chegam a ser formatadas
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Nada
+    """
+    
+    global listener
+    
+    fileHandler = BufferedRotatingFileHandler(
+        serverConfig.configValue["logFile"],
+        serverConfig.configValue["logMaxBytes"],
+        serverConfig.configValue["logBackupCount"],
+        serverConfig.configValue["logRotateInterval"],
+        serverConfig.configValue["logFlushInterval"],
+        serverConfig.configValue["logFlushRecords"],
+    )
+    fileHandler.setFormatter(logFormatter)
+    
+    logging.getLogger().setLevel(serverConfig.configValue["logLevel"])
+    
+    listener = logging.handlers.QueueListener(logQueue, fileHandler, respect_handler_level=True)
+    listener.start()
+
+def stop_logging() -> None:
+    """
+    Função que escreve as mensagens pendentes no arquivo de log e encerra a thread do log
+    
+    Recebe:
+        Nada
+    
+    Retorna:
+        Nada
+    """
+    
+    if listener is not None:
+        # stop() espera a fila ser esvaziada antes de retornar
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
@@ -3,6 +3,7 @@ import logging              # Biblioteca de criação de logs
 from typing import Optional # Anotações de tipo
 import Server               # Minha implementação do servidor
 import Configuration        # Configurações do Servidor
+import LogHandler           # Configuração do sistema de logging
 
 """
 **** migs' Minimal HTTP Server ****
@@ -12,16 +13,18 @@ Um mini servidor HTTP estático que processa requisições GET, HEAD e OPTIONS n
 Retorna o conteúdo da pasta Content/ (por padrão as páginas do meu blog pessoal (miguelanunes.github.io)) para as requisições GET
 Retorna apenas o cabeçalho das requisições GET para as requisições HEAD
 Retorna {"accepted_methods": ["GET", "HEAD", "OPTIONS"]} para as requisições OPTIONS
-"""
 
-# TODO: Implementar uma requisição que desliga o servidor graciosamente
-# TODO: Implementar decorators em algumas validações e verificações
+Sinais aceitos pelo processo do servidor:
+    SIGTERM: encerra graciosamente, respondendo as conexões abertas antes de sair
+    SIGHUP:  recarrega o arquivo de configurações
+    SIGUSR2: inicia um novo processo do servidor com a mesma socket e encerra este graciosamente
+    SIGUSR1: inicia ou encerra uma sessão de profiling (ver Profiler.py)
+"""
 
 # Configurando o sistema de logging da biblioteca logging
+# As mensagens ficam numa fila até as configurações serem lidas e o arquivo de log ser aberto (ver LogHandler.py)
 log = logging.getLogger("Main")
-logging.basicConfig(filename="server.log", level=logging.DEBUG, filemode="w")
-logging.Formatter("(%(asctime)s) [%(levelname)s]: %(message)s", "%Y-%m-%d %H:%M:%S")
-# TODO: Arrumar formatação das msgs de log
+LogHandler.init_logging()
 
 def get_port() -> Optional[int]:
     """
@@ -116,6 +119,9 @@ def main() -> None:
     cfg = get_cfg()
     serverConfig = Configuration.ServerConfig(cfg)
     
+    # Com as configurações lidas, começo a escrever o log
+    LogHandler.start_logging(serverConfig)
+    
     try:
         # Rodando o servidor com a porta fornecida
         Server.server(serverConfig, port)
@@ -124,6 +130,7 @@ def main() -> None:
         print("\nExecução Interrompida! Tentando encerrar graciosamente!")
     
     # Fechando o logger depois de fechar o servidor
+    LogHandler.stop_logging()
     logging.shutdown()
 
 if __name__ == "__main__":
@@ -0,0 +1,270 @@
+import os                              # Memória em uso pelo processo
+import resource                        # Pico de memória do processo, caso /proc não exista
+import time                            # Taxa de conexões aceitas
+from bisect import bisect_left         # Para encontrar o bucket de um histograma
+import ContentHandler                  # Contadores dos caches de conteúdo
+import RateLimit                       # Tabela de baldes de fichas dos clientes
+import TLS                             # Caches de sessões dos contextos TLS
+
+"""
+Metrics.py
+Módulo que guarda as métricas internas do servidor e gera a página de métricas (no formato texto do Prometheus)
+A página é servida no caminho configurado em [Metrics] path, apenas quando [Metrics] enabled = true
+
+Os contadores são atualizados apenas pela thread do loop principal (Server.handle_request), então não precisam de locks
+Atualizar um contador custa apenas uma soma em um atributo ou dict, os valores só são formatados quando a página é requisitada
+"""
+
+# Limites superiores (em segundos) dos buckets dos histogramas de latência
+latencyBuckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Fases do processamento de uma requisição que tem a latência medida, na ordem em que acontecem
+#   read:     leitura da requisição da socket
+#   validate: interpretação e validação da requisição (construtor de Request)
+#   create:   escolha da resposta (Response.createResponse)
+#   prepare:  geração do conteúdo da resposta (busca do recurso e compressão)
+#   error:    geração da resposta de erro, quando alguma fase anterior levantou uma exceção
+#   format:   conversão da resposta para bytes
+#   send:     envio da resposta ao cliente
+#   total:    do início da leitura até o fim do envio
+phases = ("read", "validate", "create", "prepare", "error", "format", "send", "total")
+
+class PhaseTimer():
+    """
+    Classe que mede a duração de cada fase do processamento de uma requisição com perf_counter_ns
+    Cada chamada de mark() encerra a fase atual, que começou no mark() anterior (ou na criação do objeto)
+    
+    Atributos da Classe:
+        [int]  start:  Instante em que a requisição começou a ser processada
+        [list] phases: Fases encerradas, lista de tuplas (nome da fase, duração em nanossegundos)
+    """
+    
+    __slots__ = ("start", "last", "phases")
+    
+    def __init__(self) -> None:
+        self.start = self.last = time.perf_counter_ns()
+        self.phases: "list[tuple[str, int]]" = []
+    
+    def mark(self, phase:str) -> None:
+        """
+        Método que encerra a fase atual, registrando a sua duração
+        """
+        
+        now = time.perf_counter_ns()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+    
+    def total(self) -> int:
+        """
+        Método que retorna o tempo em nanossegundos entre a criação do objeto e a última fase encerrada
+        """
+        
+        return self.last - self.start
+    
+    def server_timing(self) -> str:
+        """
+        Método que formata as fases encerradas até o momento como o valor de um cabeçalho Server-Timing
+        As durações do cabeçalho são em milissegundos
+        """
+        
+        return ", ".join(f"{phase};dur={duration / 1e6:.3f}" for phase, duration in self.phases)
+
+class Histogram():
+    """
+    Classe que representa um histograma com buckets fixos
+    Os valores são observados em nanossegundos e convertidos para segundos apenas quando o histograma é formatado
+    
+    Atributos da Classe:
+        [tuple(int)] bounds: Limites superiores dos buckets em nanossegundos
+        [list(int)]  counts: Número de observações em cada bucket (o último é o bucket +Inf)
+        [int]        total:  Soma das observações em nanossegundos
+        [int]        count:  Número de observações
+    """
+    
+    def __init__(self, buckets:"tuple[float, ...]") -> None:
+        self.bounds = tuple(int(bucket * 1e9) for bucket in buckets)
+        self.counts = [0] * (len(buckets) + 1)
+        self.total  = 0
+        self.count  = 0
+    
+    def observe(self, valueNs:int) -> None:
+        """
+        Método que registra uma observação no histograma
+        """
+        
+        self.counts[bisect_left(self.bounds, valueNs)] += 1
+        self.total += valueNs
+        self.count += 1
+    
+    def format(self, name:str, labels:str) -> "list[str]":
+        """
+        Método que formata o histograma no formato texto do Prometheus
+        
+        Recebe:
+            [str] name:   Nome da métrica
+            [str] labels: Labels da métrica já formatados (ex: 'phase="read"')
+        
+        Retorna:
+            As linhas do histograma, com os buckets acumulados
+        """
+        
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound / 1e9:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total / 1e9:.9f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        
+        return lines
+
+# Requisições respondidas, (método, código de resposta) -> quantidade
+requests: "dict[tuple[str, int], int]" = dict()
+bytesSent = 0
+
+# Conexões aceitas, fechadas e sendo processadas no momento
+connectionsAccepted = 0
+connectionsClosed   = 0
+connectionsActive   = 0
+
+# Iterações do loop principal que passaram do tempo limite do watchdog (ver Watchdog.py)
+loopStalls = 0
+
+# Requisições recusadas com 503 por sobrecarga, motivo -> quantidade (ver Admission.py)
+shedRequests = {"connections": 0, "pending": 0, "lag": 0}
+
+# Conexões fechadas por não enviarem a requisição (ou não terminarem o handshake TLS) a tempo (ver Admission.expired)
+readTimeouts = 0
+
+# Requisições recusadas com 429 porque o cliente passou do limite de requisições (ver RateLimit.py)
+rateLimited = 0
+
+# Handshakes TLS terminados, com sessão nova ("full") ou retomada ("resumed"), e os que falharam (ver TLS.py)
+tlsHandshakes = {"full": 0, "resumed": 0}
+tlsHandshakeFailures = 0
+
+# Latência de cada fase do processamento das requisições
+latency = {phase: Histogram(latencyBuckets) for phase in phases}
+
+# Último instante em que a página de métricas foi gerada, para calcular a taxa de conexões aceitas
+lastScrape = (time.monotonic(), 0)
+
+def record_response(method:str, status:int, sentBytes:int, timer:PhaseTimer) -> None:
+    """
+    Função que registra uma resposta enviada
+    
+    Recebe:
+        [str] method:        Método da requisição
+        [int] status:        Código da resposta
+        [int] sentBytes:     Número de bytes enviados
+        [PhaseTimer] timer:  Duração das fases do processamento da requisição
+    
+    Retorna:
+        Nada
+    """
+    
+    global bytesSent
+    
+    key = (method, status)
+    requests[key] = requests.get(key, 0) + 1
+    bytesSent += sentBytes
+    
+    for phase, duration in timer.phases:
+        latency[phase].observe(duration)
+    latency["total"].observe(timer.total())
+
+def memory_in_use() -> int:
+    """
+    Função que retorna a memória residente do processo em bytes
+    Usa /proc/self/statm quando disponível, caso contrário retorna o pico de memória do processo
+    """
+    
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss é em kilobytes no Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def render() -> str:
+    """
+    Função que gera a página de métricas no formato texto do Prometheus
+    
+    Recebe:
+        Nada
+    
+    Retorna:
+        A página de métricas
+    """
+    
+    global lastScrape
+    
+    lines = []
+    
+    def metric(name:str, kind:str, help:str, samples:"list[str]") -> None:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    
+    metric("tiny_requests_total", "counter", "Requisições respondidas por método e código de resposta",
+        [f'tiny_requests_total{{method="{method}",status="{status}"}} {count}' for (method, status), count in sorted(requests.items())])
+    metric("tiny_sent_bytes_total", "counter", "Bytes enviados aos clientes", [f"tiny_sent_bytes_total {bytesSent}"])
+    
+    openConnections = connectionsAccepted - connectionsClosed
+    metric("tiny_connections_accepted_total", "counter", "Conexões aceitas", [f"tiny_connections_accepted_total {connectionsAccepted}"])
+    metric("tiny_connections", "gauge", "Conexões abertas, sendo processadas (active) ou esperando dados (idle)", [
+        f'tiny_connections{{state="active"}} {connectionsActive}',
+        f'tiny_connections{{state="idle"}} {openConnections - connectionsActive}',
+    ])
+    
+    # Taxa calculada entre a geração anterior da página e a atual
+    now = time.monotonic()
+    elapsed = now - lastScrape[0]
+    acceptRate = (connectionsAccepted - lastScrape[1]) / elapsed if elapsed > 0 else 0.0
+    lastScrape = (now, connectionsAccepted)
+    metric("tiny_accept_rate", "gauge", "Conexões aceitas por segundo desde a última leitura das métricas", [f"tiny_accept_rate {acceptRate:.3f}"])
+    
+    cache = ContentHandler.contentCache
+    if cache is not None:
+        metric("tiny_cache_hits_total", "counter", "Acertos do cache de conteúdo", [f"tiny_cache_hits_total {cache.hits}"])
+        metric("tiny_cache_misses_total", "counter", "Faltas do cache de conteúdo", [f"tiny_cache_misses_total {cache.misses}"])
+        metric("tiny_cache_evictions_total", "counter", "Entradas removidas do cache de conteúdo por falta de espaço", [f"tiny_cache_evictions_total {cache.evictions}"])
+        metric("tiny_cache_bytes", "gauge", "Tamanho atual do cache de conteúdo", [f"tiny_cache_bytes {cache.size}"])
+    
+    negativeCache = ContentHandler.negativeCache
+    if negativeCache is not None:
+        metric("tiny_negative_cache_hits_total", "counter", "Acertos do cache de caminhos inexistentes", [f"tiny_negative_cache_hits_total {negativeCache.hits}"])
+        metric("tiny_negative_cache_misses_total", "counter", "Faltas do cache de caminhos inexistentes", [f"tiny_negative_cache_misses_total {negativeCache.misses}"])
+    
+    metric("tiny_loop_stalls_total", "counter", "Iterações do loop principal que passaram do tempo limite do watchdog", [f"tiny_loop_stalls_total {loopStalls}"])
+    metric("tiny_shed_requests_total", "counter", "Requisições recusadas com 503 por sobrecarga, por motivo",
+        [f'tiny_shed_requests_total{{reason="{reason}"}} {count}' for reason, count in shedRequests.items()])
+    metric("tiny_read_timeouts_total", "counter", "Conexões fechadas por não enviarem a requisição a tempo", [f"tiny_read_timeouts_total {readTimeouts}"])
+    metric("tiny_rate_limited_total", "counter", "Requisições recusadas com 429 por passarem do limite do cliente", [f"tiny_rate_limited_total {rateLimited}"])
+    
+    limiter = RateLimit.limiter
+    if limiter is not None:
+        metric("tiny_rate_limit_clients", "gauge", "Clientes com balde de fichas na tabela", [f"tiny_rate_limit_clients {len(limiter.buckets)}"])
+        metric("tiny_rate_limit_evictions_total", "counter", "Baldes removidos da tabela por falta de espaço ou ociosidade",
+            [f"tiny_rate_limit_evictions_total {limiter.evictions}"])
+    
+    if TLS.contexts:
+        metric("tiny_tls_handshakes_total", "counter", "Handshakes TLS terminados, por tipo de sessão",
+            [f'tiny_tls_handshakes_total{{session="{session}"}} {count}' for session, count in tlsHandshakes.items()])
+        metric("tiny_tls_handshake_failures_total", "counter", "Handshakes TLS que falharam", [f"tiny_tls_handshake_failures_total {tlsHandshakeFailures}"])
+        # Contadores do cache de sessões do OpenSSL, somados entre os contextos
+        stats = [context.session_stats() for context in TLS.contexts.values()]
+        metric("tiny_tls_session_cache_hits_total", "counter", "Sessões TLS retomadas pelo cache de sessões ou por tickets",
+            [f"tiny_tls_session_cache_hits_total {sum(stat['hits'] for stat in stats)}"])
+        metric("tiny_tls_session_cache_size", "gauge", "Sessões TLS no cache de sessões do servidor",
+            [f"tiny_tls_session_cache_size {sum(stat['number'] for stat in stats)}"])
+    
+    metric("process_resident_memory_bytes", "gauge", "Memória residente do processo", [f"process_resident_memory_bytes {memory_in_use()}"])
+    
+    samples = []
+    for phase in phases:
+        samples.extend(latency[phase].format("tiny_request_duration_seconds", f'phase="{phase}"'))
+    metric("tiny_request_duration_seconds", "histogram", "Latência de cada fase do processamento das requisições", samples)
+    
+    return "\n".join(lines) + "\n"
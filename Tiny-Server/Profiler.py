@@ -0,0 +1,216 @@
+import cProfile                        # Profiler determinístico, gera as estatísticas por função
+import io                              # Para gerar o relatório em texto do pstats
+import logging                         # Biblioteca de criação de logs
+import os                              # Pasta de saída dos perfis
+import pstats                          # Estatísticas do cProfile
+import sys                             # Pilhas das threads (sys._current_frames)
+import threading                       # Thread que amostra as pilhas do loop principal
+import time                            # Duração das sessões de profiling
+from collections import Counter        # Contagem das pilhas amostradas
+from typing import Optional            # Anotações de tipo
+import Metrics                         # Número de requisições respondidas
+from Configuration import ServerConfig # Configurações do Servidor
+
+"""
+Profiler.py
+Módulo que permite fazer o profiling do servidor em execução, sem precisar reiniciar ele sob o cProfile
+Uma sessão de profiling é pedida pelo sinal SIGUSR1 ou pela página interna [Profiler] path, e dura as próximas N requisições ou T segundos
+Durante a sessão:
+    O cProfile mede o loop principal, gerando as estatísticas por função (arquivos .pstats e .txt)
+    Uma thread amostra periodicamente a pilha do loop principal, gerando as pilhas no formato "collapsed" (arquivo .collapsed),
+        que pode ser convertido em um flamegraph (ex: flamegraph.pl profile.collapsed > profile.svg)
+
+As sessões são iniciadas e encerradas pelo loop principal (função poll), entre uma requisição e outra
+Fora de uma sessão nenhum profiler está instalado, então o custo para o servidor é nulo
+"""
+
+log = logging.getLogger("Main.Server.Profiler")
+
+class ProfilingSession():
+    """
+    Classe que representa uma sessão de profiling em andamento
+    
+    Atributos da Classe:
+        [int]   maxRequests:    Número de requisições respondidas que encerra a sessão
+        [float] deadline:       Instante (time.monotonic) que encerra a sessão
+        [float] sampleInterval: Intervalo em segundos entre amostras da pilha do loop principal
+        [Counter] stacks:       Pilhas amostradas, pilha no formato collapsed -> número de amostras
+    """
+    
+    def __init__(self, maxRequests:int, seconds:float, sampleInterval:float) -> None:
+        self.maxRequests    = maxRequests
+        self.deadline       = time.monotonic() + seconds
+        self.sampleInterval = sampleInterval
+        self.startRequests  = Metrics.latency["total"].count
+        self.stacks: Counter[str] = Counter()
+        
+        # A sessão sempre é criada pelo loop principal, que é a thread amostrada
+        self.threadId  = threading.get_ident()
+        self.stopEvent = threading.Event()
+        self.sampler   = threading.Thread(target=self.sample, name="ProfilerSampler", daemon=True)
+        
+        self.profile = cProfile.Profile()
+    
+    def start(self) -> None:
+        """
+        Método que inicia o profiling da thread atual e a amostragem da pilha dela
+        """
+        
+        self.sampler.start()
+        self.profile.enable()
+    
+    def stop(self) -> None:
+        """
+        Método que encerra o profiling e a amostragem
+        """
+        
+        self.profile.disable()
+        self.stopEvent.set()
+        self.sampler.join()
+    
+    def finished(self) -> bool:
+        """
+        Método que verifica se a sessão já atingiu o número de requisições ou o tempo máximo
+        """
+        
+        handled = Metrics.latency["total"].count - self.startRequests
+        return handled >= self.maxRequests or time.monotonic() >= self.deadline
+    
+    def sample(self) -> None:
+        """
+        Loop da thread que amostra a pilha do loop principal a cada sampleInterval segundos
+        """
+        
+        while not self.stopEvent.wait(self.sampleInterval):
+            frame = sys._current_frames().get(self.threadId)
+            
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            
+            # No formato collapsed a pilha vai da raiz até a função executando, separada por ";"
+            self.stacks[";".join(reversed(frames))] += 1
+    
+    def dump(self, outputDir:str) -> str:
+        """
+        Método que escreve os resultados da sessão na pasta de saída
+        
+        Recebe:
+            [str] outputDir: Pasta onde os arquivos são escritos
+        
+        Retorna:
+            O caminho dos arquivos escritos, sem a extensão
+        """
+        
+        os.makedirs(outputDir, exist_ok=True)
+        basePath = os.path.join(outputDir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        
+        self.profile.dump_stats(basePath + ".pstats")
+        
+        report = io.StringIO()
+        pstats.Stats(self.profile, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+        with open(basePath + ".txt", "w", encoding="utf-8") as fp:
+            fp.write(report.getvalue())
+        
+        with open(basePath + ".collapsed", "w", encoding="utf-8") as fp:
+            for stack, count in self.stacks.most_common():
+                fp.write(f"{stack} {count}\n")
+        
+        return basePath
+
+# Sessão em andamento e sessão pedida que ainda não começou, (requisições, segundos)
+session: Optional[ProfilingSession] = None
+pending: Optional["tuple[int, float]"] = None
+
+def request_session(serverConfig:ServerConfig, maxRequests:Optional[int]=None, seconds:Optional[float]=None) -> None:
+    """
+    Função que pede uma sessão de profiling, que começa na próxima iteração do loop principal
+    Valores não informados usam os valores das configurações
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+        [int] maxRequests:           Número de requisições profiladas
+        [float] seconds:             Duração máxima da sessão em segundos
+    
+    Retorna:
+        Nada
+    """
+    
+    global pending
+    
+    pending = (
+        maxRequests if maxRequests is not None else serverConfig.configValue["profilerRequests"],
+        seconds if seconds is not None else serverConfig.configValue["profilerSeconds"],
+    )
+
+def toggle(serverConfig:ServerConfig) -> None:
+    """
+    Função chamada ao receber SIGUSR1, encerra a sessão em andamento ou pede uma nova sessão
+    """
+    
+    if session is not None:
+        # Encerrada no próximo poll
+        session.maxRequests = 0
+    else:
+        request_session(serverConfig)
+
+def timeout() -> Optional[float]:
+    """
+    Função que retorna quanto tempo o loop principal pode ficar esperando por conexões sem atrasar o fim da sessão
+    
+    Retorna:
+        O tempo em segundos até o fim da sessão, ou None caso não tenha sessão em andamento
+    """
+    
+    if session is None:
+        return None
+    return max(session.deadline - time.monotonic(), 0.0)
+
+def poll(serverConfig:ServerConfig) -> None:
+    """
+    Função chamada pelo loop principal a cada iteração, inicia a sessão pedida e encerra a sessão em andamento
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Nada
+    """
+    
+    global session, pending
+    
+    if session is not None and session.finished():
+        finished, session = session, None
+        finished.stop()
+        
+        try:
+            basePath = finished.dump(serverConfig.configValue["profilerOutputDir"])
+        except OSError as err:
+            log.error("Erro ao escrever o resultado do profiling: %r", err)
+        else:
+            log.warning("Profiling encerrado, resultados em %s.{pstats,txt,collapsed}", basePath)
+            print(f"Profiling encerrado, resultados em {basePath}.{{pstats,txt,collapsed}}")
+    
+    if pending is not None and session is None:
+        maxRequests, seconds = pending
+        pending = None
+        
+        session = ProfilingSession(maxRequests, seconds, serverConfig.configValue["profilerSampleInterval"])
+        session.start()
+        
+        log.warning("Profiling iniciado para as próximas %d requisições ou %.1f segundos", maxRequests, seconds)
+        print(f"Profiling iniciado para as próximas {maxRequests} requisições ou {seconds:.1f} segundos")
+
+def stop(serverConfig:ServerConfig) -> None:
+    """
+    Função que encerra a sessão em andamento e escreve os seus resultados, usada quando o servidor é encerrado
+    """
+    
+    global pending
+    
+    pending = None
+    if session is not None:
+        session.maxRequests = 0
+        poll(serverConfig)
@@ -0,0 +1,191 @@
+import logging                         # Biblioteca de criação de logs
+import math                            # Arredondamento do Retry-After
+import socket                          # Conversão dos endereços em números, para agrupar por prefixo
+import time                            # Relógio dos baldes
+import Exceptions                      # Módulo de Exceções específicas do Servidor
+from collections import OrderedDict    # Tabela de baldes em ordem de uso
+from typing import Any, Optional, Union # Anotações de tipo
+from Configuration import ServerConfig # Configurações do Servidor
+
+"""
+RateLimit.py
+Módulo que limita a taxa de requisições de cada cliente com baldes de fichas (token buckets)
+Como o servidor atende tudo em uma única thread, um único cliente agressivo (ex: um crawler) consegue ocupar o servidor inteiro
+Cada cliente tem um balde com capacidade para burst fichas, que é reabastecido com rate fichas por segundo,
+    e cada requisição gasta uma ficha; sem fichas, a requisição recebe a resposta 429 pré-renderizada, com o header Retry-After
+    indicando em quantos segundos o cliente terá uma ficha novamente
+O cliente é identificado pelo endereço IP, ou pelo prefixo do endereço (ex: /24 no IPv4, /64 no IPv6) quando configurado
+    Endereços IPv4 recebidos por uma socket IPv6 (dual-stack, ex: host = "::") chegam como ::ffff:a.b.c.d, e são tratados como IPv4
+    O prefixo é calculado com uma máscara sobre o endereço como número, sem criar objetos do módulo ipaddress a cada requisição
+
+Os baldes ficam em uma tabela limitada, em ordem de uso (LRU): cada acesso move o balde para o fim da tabela,
+    e quando um cliente novo chega, os baldes do início da tabela que passaram do tempo ocioso são removidos,
+    assim como o mais antigo caso a tabela esteja cheia
+Tudo isso é O(1) por requisição, e um cliente que já tem balde não aloca nada além dos números da conta
+Os baldes guardam apenas as fichas e o instante da última conta, o reabastecimento é calculado no acesso
+"""
+
+log = logging.getLogger("Main.Server.RateLimit")
+
+# Bit que diferencia as redes IPv6 das IPv4 quando o cliente é identificado pelo prefixo
+ipv6Network = 1 << 128
+
+def prefix_mask(prefix:int, bits:int) -> int:
+    """
+    Função que retorna a máscara de um prefixo de rede, como número (ex: prefixo 24 de 32 bits -> 0xFFFFFF00)
+    """
+    
+    prefix = min(max(prefix, 0), bits)
+    return ((1 << prefix) - 1) << (bits - prefix)
+
+class TokenBucketTable():
+    """
+    Classe que representa a tabela de baldes de fichas dos clientes
+    
+    Atributos da Classe:
+        [float]       rate:        Fichas adicionadas por segundo em cada balde
+        [float]       burst:       Capacidade de cada balde
+        [int]         maxClients:  Número máximo de baldes na tabela
+        [float]       idleTimeout: Tempo em segundos sem requisições depois do qual o balde de um cliente pode ser removido
+        [int]         ipv4Prefix:  Tamanho do prefixo que identifica um cliente IPv4, 32 para um balde por endereço
+        [int]         ipv6Prefix:  Tamanho do prefixo que identifica um cliente IPv6, 128 para um balde por endereço
+        [int]         ipv4Mask:    Máscara do prefixo IPv4, aplicada ao endereço como número
+        [int]         ipv6Mask:    Máscara do prefixo IPv6, aplicada ao endereço como número
+        [OrderedDict] buckets:     Cliente -> [fichas, instante da última conta], do uso mais antigo para o mais recente
+        [int]         evictions:   Baldes removidos por falta de espaço ou por ociosidade
+    """
+    
+    __slots__ = ("rate", "burst", "maxClients", "idleTimeout", "ipv4Prefix", "ipv6Prefix", "ipv4Mask", "ipv6Mask", "buckets", "evictions")
+    
+    def __init__(self, rate:float, burst:float, maxClients:int, idleTimeout:float, ipv4Prefix:int, ipv6Prefix:int) -> None:
+        self.rate        = rate
+        self.burst       = burst
+        self.maxClients  = maxClients
+        self.idleTimeout = idleTimeout
+        self.ipv4Prefix  = ipv4Prefix
+        self.ipv6Prefix  = ipv6Prefix
+        self.ipv4Mask    = prefix_mask(ipv4Prefix, 32)
+        self.ipv6Mask    = prefix_mask(ipv6Prefix, 128)
+        self.buckets: OrderedDict[Union[str, int], list[float]] = OrderedDict()
+        self.evictions   = 0
+    
+    def client_key(self, ip:str) -> Union[str, int]:
+        """
+        Método que retorna o identificador do cliente de um endereço IP
+        O próprio endereço quando cada endereço tem seu balde (caso comum, sem nenhuma alocação),
+            ou a rede do prefixo configurado como número (redes IPv6 com o bit 128 ligado, para não se misturarem com as IPv4)
+        """
+        
+        # IPv4 recebido por uma socket IPv6 (dual-stack), a parte IPv4 é o endereço do cliente
+        if ip.startswith("::ffff:") and "." in ip:
+            ip = ip[7:]
+        
+        try:
+            if ":" not in ip:
+                if self.ipv4Prefix >= 32:
+                    return ip
+                return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big") & self.ipv4Mask
+            
+            if self.ipv6Prefix >= 128:
+                return ip
+            # Endereços link-local podem ter o índice da interface (fe80::1%eth0), que não faz parte do endereço
+            return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip.partition("%")[0]), "big") & self.ipv6Mask | ipv6Network
+        except OSError:
+            return ip
+    
+    def take(self, ip:str, now:float) -> float:
+        """
+        Método que tenta gastar uma ficha do balde de um cliente
+        
+        Recebe:
+            [str] ip:    Endereço IP do cliente
+            [float] now: Instante atual (time.monotonic)
+        
+        Retorna:
+            0.0 caso a requisição seja permitida, ou o tempo em segundos até o balde ter uma ficha novamente
+        """
+        
+        key    = self.client_key(ip)
+        bucket = self.buckets.get(key)
+        
+        if bucket is None:
+            # Cliente novo, o balde começa cheio
+            self.expire(now)
+            self.buckets[key] = [self.burst - 1.0, now]
+            return 0.0
+        
+        self.buckets.move_to_end(key)
+        
+        tokens = bucket[0] + (now - bucket[1]) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        bucket[1] = now
+        
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        
+        bucket[0] = tokens
+        return (1.0 - tokens) / self.rate
+    
+    def expire(self, now:float) -> None:
+        """
+        Método que remove do início da tabela os baldes ociosos, e o mais antigo caso a tabela esteja cheia
+        Como a tabela está em ordem de uso, para no primeiro balde que ainda não pode ser removido
+        """
+        
+        buckets = self.buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if len(buckets) < self.maxClients and now - oldest[1] < self.idleTimeout:
+                break
+            buckets.popitem(last=False)
+            self.evictions += 1
+
+# Tabela de baldes em uso, None caso a limitação esteja desabilitada
+limiter: Optional[TokenBucketTable] = None
+
+def init_rate_limit(serverConfig:ServerConfig) -> None:
+    """
+    Função que cria a tabela de baldes de acordo com as configurações
+    Chamada na inicialização e quando as configurações são recarregadas, nesse caso os baldes começam cheios novamente
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Nada
+    """
+    
+    global limiter
+    
+    config = serverConfig.configValue
+    if not config["rateLimitEnabled"] or config["rateLimitRate"] <= 0:
+        limiter = None
+        return
+    
+    limiter = TokenBucketTable(float(config["rateLimitRate"]), max(1.0, float(config["rateLimitBurst"])), max(1, config["rateLimitMaxClients"]),
+                               float(config["rateLimitIdleTimeout"]), config["rateLimitIPv4Prefix"], config["rateLimitIPv6Prefix"])
+    log.info("Limitação de requisições por cliente habilitada: %s requisições/s, até %s seguidas",
+             config["rateLimitRate"], config["rateLimitBurst"])
+
+def check(address:Any) -> Optional[Exceptions.TooManyRequests]:
+    """
+    Função que gasta uma ficha do cliente de uma conexão, antes da requisição ser lida
+    
+    Recebe:
+        [Any] address: Endereço do cliente, como retornado por accept()
+    
+    Retorna:
+        A exceção 429 caso o cliente tenha passado do limite, None caso a requisição possa ser atendida
+    """
+    
+    if limiter is None or not isinstance(address, tuple):
+        return None
+    
+    wait = limiter.take(address[0], time.monotonic())
+    if wait == 0.0:
+        return None
+    
+    log.debug("Cliente %s passou do limite de requisições", address[0])
+    return Exceptions.TooManyRequests("Limite de Requisições Atingido!", address[0], math.ceil(wait))
@@ -1,14 +1,19 @@
 import logging                         # Módulo de criação de logs
 import Exceptions                      # Módulo de Execessões do Servidor
-import os                              # Para verificar se o recurso requisitado existe
+import ContentHandler                  # Para verificar se o recurso requisitado existe
+import Router                          # Tabela de rotas, que escolhe a resposta de cada requisição
+import Target                          # Interpretação do alvo da requisição (caminho e query)
+from Headers import HeaderMap          # Cabeçalhos interpretados sob demanda
 from typing import Optional            # Anotações de tipo
 from Configuration import ServerConfig # Módulo de configurações do Servidor
 
 """
 RequestHandler.py
 Nesse módulo são definidas e processadas as requisições enviadas pelo cliente
-O construtor da classe recebe os componentes da requisião em formato string e verifica se a requisição é válida
-Também são feitas validações sobre o recurso requisitado
+O construtor da classe recebe os componentes da requisião e verifica se a requisição é válida
+Os cabeçalhos são guardados nos bytes recebidos e só são interpretados quando algum deles é acessado (ver Headers.py)
+O alvo da requisição é separado em caminho e query, e o caminho é decodificado e normalizado (ver Target.py)
+A rota da requisição é escolhida aqui (ver Router.py), e as requisições de conteúdo passam por validações sobre o recurso requisitado
 """
 
 log = logging.getLogger("Main.Server.Request")
@@ -17,30 +22,37 @@ class Request:
     
     """
     Classe que representa uma requisição HTTP
-    No seu construtor recebe os componentes da requisição -- primeira linha, cabeçalhos e corpo -- como strings
-    No caso do cabeçalho, uma string que pode conter várias substrings, cada uma delimitada por "\r\n" ou "\n"
+    No seu construtor recebe os componentes da requisição -- primeira linha como string, cabeçalhos e corpo como bytes
+    No caso do cabeçalho, bytes que podem conter várias linhas, cada uma delimitada por "\r\n" ou "\n"
+    Usa __slots__, já que um objeto dessa classe é criado para cada requisição
     
     O construtor dessa classe processa essas strings para obter as informações necessárias para responder a requisição,
         levantando exceções quando necessário
         
     Atributos da Classe:
         [str]            method:  O método HTTP na requisição
-        [str]            path:    Caminho do recurso requisitado
+        [str]            resource: Caminho do recurso requisitado, decodificado e normalizado, sem a query
+        [str]            query:    Query do alvo da requisição (o que vem depois do "?"), ainda codificada
+        [str]            filePath: Chave canônica do recurso, o caminho do arquivo correspondente dentro da pasta de conteúdo
         [str]            version: A versão do protocolo HTTP da requisição
-        [dict(str, str)] headers: Os cabeçalhos presentes na requisição
-        [str]            body:    O corpo da requisição
+        [HeaderMap]      headers: Os cabeçalhos presentes na requisição, sem diferenciar maiúsculas de minúsculas nos nomes
+        [bytes]          body:    O corpo da requisição
+        [Route]          route:   A rota que vai gerar a resposta (arquivos estáticos, métricas, profiler, ...)
         
     Métodos da Classe:
         __init__: Construtor da classe
+        validateResource: Verifica se o recurso requisitado pode ser enviado
         __str__: Retorna uma versão legível por humanos de um objeto dessa classe
     """
     
+    __slots__ = ("method", "resource", "query", "filePath", "version", "headers", "body", "route", "id")
+    
     # Uma requisição HTTP tem três componentes
         # A primeira linha, cujo formato é
             # <METODO> <CAMINHO-RECURSO> <VERSÃO-PROTOCOLO>
         # Uma lista de cabeçalhos
         # Um corpo (opcional)
-    def __init__(self, firstLine:str, headers:str, body:Optional[str], serverConfig: ServerConfig, id:int) -> None:
+    def __init__(self, firstLine:str, headers:bytes, body:Optional[bytes], serverConfig: ServerConfig, id:int) -> None:
         # Não lidarei com requisições que tem corpo aqui, então só copio para o objeto e é isso
         self.body = body
         
@@ -52,75 +64,79 @@ class Request:
         # Portanto é seguro fazer essa operação
         # De qualquer forma, irei fazer uma validação no input
         try:
-            self.method, self.resource, self.version = firstLine.split() # Aqui estou assumindo que o whitespace no final da primeira linha já foi removido
+            self.method, target, self.version = firstLine.split() # Aqui estou assumindo que o whitespace no final da primeira linha já foi removido
         except ValueError:
-            log.error(f"Erro ao interpretar primeira linha da requisição:{firstLine}")
+            log.error("Erro ao interpretar primeira linha da requisição:%s", firstLine)
             raise Exceptions.BadRequest("Requisição Mal Formada!" ,firstLine)
+        
+        # Separando o caminho da query, e calculando o arquivo correspondente ao caminho, que é a chave usada por todos os caches
+        self.resource, self.query, self.filePath = Target.parse_target(target, serverConfig.configValue["contentRoot"])
+
+        # Escolhendo a rota da requisição, o que também verifica se o método utilizado é suportado
+        self.route = Router.routeTable.resolve(self.method, self.resource)
 
-        # Verificando se o método utilizado é suportado
-        if self.method not in serverConfig.configValue["implemmentedMethods"]:
-            log.error(f"Erro, método requisitado não foi implementado:{self.method}")
-            raise Exceptions.MethodNotImplemented("Método Não Implementado!", self.method)
+        # Requisições para páginas internas (métricas, profiler) não são requisições de conteúdo, logo não passam pelas validações de recurso
+        if self.route.content:
+            self.validateResource(serverConfig)
 
+        # Verificando se a versão do HTTP passada na requisição é válida
+        if self.version != serverConfig.configValue["httpVersion"]:
+            log.error("Erro, versão do protocolo HTTP não suportada:%s", self.version)
+            raise Exceptions.VersionNotSupported("Versão do Protocolo HTTP Não Suportada", self.version)
+
+        # Os headers tem formato "header: value", um por linha
+        # Eles só são interpretados no primeiro acesso, e um header mal formatado levanta BadRequest nesse momento
+        self.headers = HeaderMap(headers)
+    
+    def validateResource(self, serverConfig:ServerConfig) -> None:
+        """
+        Método que verifica se o recurso requisitado pode ser acessado e se ele existe
+        Levanta a exceção HTTP correspondente caso o recurso não possa ser enviado
+        
+        Recebe:
+            [ServerConfig] serverConfig: Configurações do servidor
+        
+        Retorna:
+            Nada
+        """
+        
         # Verificando se o recurso requisitado não é proibido
         for path in serverConfig.configValue["forbiddenPaths"]:
             if path in self.resource:
-                log.error(f"Erro, requisitando recurso proibido:{self.resource}")
+                log.error("Erro, requisitando recurso proibido:%s", self.resource)
                 raise Exceptions.Forbidden("Recurso Proibido de ser Acessado!", self.resource)
         
         # Verificando se o recurso requisitado é permitido
-        if not any([path in serverConfig.configValue["contentRoot"] + self.resource for path in serverConfig.configValue["allowedPaths"]]):
-            log.error(f"Erro, requisitando recurso que não está na lista de recursos permitidos: {serverConfig.configValue['contentRoot'] + self.resource}")
-            raise Exceptions.Forbidden("Requisitando Recurso não Permitido!", serverConfig.configValue['contentRoot'] + self.resource)
+        if not any([path in self.filePath for path in serverConfig.configValue["allowedPaths"]]):
+            log.error("Erro, requisitando recurso que não está na lista de recursos permitidos: %s", self.filePath)
+            raise Exceptions.Forbidden("Requisitando Recurso não Permitido!", self.filePath)
         
         # Verificando se o recurso requisitado não é de um tipo proibido
         if not self.resource.endswith("/"):
-            for fileExt in serverConfig.configValue["forbiddenFiles"]:
-                if self.resource.endswith(fileExt):
-                    log.error(f"Erro, requisitando recurso proibido:{self.resource}")
-                    raise Exceptions.Forbidden("Recurso Proibido de ser Acessado!", self.resource)
+            if self.resource.endswith(serverConfig.forbiddenFileRule):
+                log.error("Erro, requisitando recurso proibido:%s", self.resource)
+                raise Exceptions.Forbidden("Recurso Proibido de ser Acessado!", self.resource)
 
         # Verificando se o tipo de recurso requisitado é permitido
         if not self.resource.endswith("/"):
-            if not any([self.resource.endswith(fileExt) for fileExt in serverConfig.configValue["allowedFiles"]]):
-                log.error(f"Erro, requisitando recurso que não está na lista de recursos permitidos: {self.resource}")
+            if not self.resource.endswith(serverConfig.allowedFileRule):
+                log.error("Erro, requisitando recurso que não está na lista de recursos permitidos: %s", self.resource)
                 raise Exceptions.Forbidden("Requisitando Recurso não Permitido!", self.resource)
 
         # Verificando se o recurso requisitado existe
-        if not os.path.exists(serverConfig.configValue['contentRoot'] + self.resource):
-            log.error(f"Erro, requisitando recurso que não existe:{serverConfig.configValue['contentRoot'] + self.resource}")
+        # Caminhos de pastas já foram convertidos no arquivo de índice dentro delas
+        if not ContentHandler.resource_exists(self.filePath):
+            log.error("Erro, requisitando recurso que não existe:%s", self.filePath)
             raise Exceptions.NotFound("Recurso Não Encontrado!", self.resource)
-
-        # Verificando se a versão do HTTP passada na requisição é válida
-        if self.version != serverConfig.configValue["httpVersion"]:
-            log.error(f"Erro, versão do protocolo HTTP não suportada:{self.version}")
-            raise Exceptions.VersionNotSupported("Versão do Protocolo HTTP Não Suportada", self.version)
-
-        # Recuperando os headers da requisição
-        # Os headers tem formato "header: value"
-        # Cada header está em uma única linha
-        # Portanto, basta iterar pelas linhas da string recebida no construtor e colocar cada par em um dict
-        self.headers = dict()
-        for header in headers.splitlines():
-            if header == "": # Isso me deu muita dor de cabeça
-                continue
-            try:
-                k, v = header.split(":", 1) # Separando a string em cada ":" e apenas uma vez, para evitar que argumentos que tenha ":" sejam separados tbm
-            except ValueError:
-                # sanity
-                log.error(f"Erro ao interpretar cabeçalho:{header}")
-                raise Exceptions.BadRequest("Requisição Mal Formatada!", header)
-            
-            self.headers[k] = v
     
     def __str__(self) -> str:
         ret = self.method + " " + self.resource + " " + self.version + "\n"
         
-        for header, value in self.headers.items():
-            ret += f"{header}: {value}\n"
+        # Caso ainda não tenham sido interpretados, os cabeçalhos são mostrados como foram recebidos
+        ret += str(self.headers)
         
-        if self.body is not None:
-            ret += self.body
+        if self.body:
+            ret += self.body.decode("utf-8", errors="replace")
         
         ret += f"ID: {self.id}\n"
         
@@ -1,8 +1,13 @@
 import logging              # Biblioteca de criação de logs
 import Exceptions
 import ContentHandler
+import Metrics
+import Profiler
+import Router
 import json
-from typing import Any, Union
+import time
+from typing import Any, Iterator, Optional, Union
+from urllib.parse import parse_qs
 from abc import ABC, abstractmethod # Implementação de métodos abstratos
 from email.utils import formatdate
 from RequestHandler import Request
@@ -14,19 +19,171 @@ ResponseHandler.py
 Nesse módulo são definidas e processadas as requisições que são respondidas para o cliente 
 O construtor da classe Response recebe uma requisição enviada pelo cliente e cónstroi uma resposta adequada para ela
 Como as principais validações são feitas no módulo RequestHandler, não tenho tantas validações para fazer aqui
+Respostas são enviadas em partes pelo método streamResponse, o corpo de uma resposta pode ser um iterador de partes em bytes
+    (ex: arquivos grandes), nesse caso o corpo só é lido enquanto é enviado, com Transfer-Encoding: chunked quando o tamanho não é conhecido
 As validações que são feitas são referentes ao recurso que o cliente quer acessar, isto é, se o recurso existe, se o cliente pode acessar esse recurso, etc.
 """
 
 log = logging.getLogger("Main.Server.Response")
 
+# Códigos de erro que tem uma página HTML associada dentro da pasta de erros
+errorPageCodes = [403, 404, 418, 500]
+
+# Códigos de erro de sobrecarga, que não tem página e são pré-renderizados com o corpo em JSON
+# O header Retry-After dessas respostas é inserido junto com o Date, já que o valor depende do cliente (ver RateLimit.py)
+overloadCodes = [503, 429]
+
+# Respostas de erro pré-renderizadas, código -> (primeira linha + headers antes do Date, headers depois do Date + corpo, tamanho do corpo)
+# Geradas pela função prerender_errors na inicialização do servidor e atualizadas quando uma página de erro muda
+errorResponses: dict[int, tuple[bytes, bytes, int]] = dict()
+
+# Último valor gerado para o header Date, recalculado no máximo uma vez por segundo
+lastDate: tuple[int, str] = (0, "")
+
+def http_date() -> str:
+    """
+    Função que retorna a data atual no formato do header Date
+    Como o header tem resolução de segundos, o valor é reaproveitado enquanto o segundo atual não muda
+    
+    Recebe:
+        Nada
+    
+    Retorna:
+        A data atual formatada para o header Date
+    """
+    
+    global lastDate
+    
+    now = int(time.time())
+    if lastDate[0] != now:
+        lastDate = (now, formatdate(timeval=now, localtime=False, usegmt=True))
+    
+    return lastDate[1]
+
+def error_page_path(code:int, serverConfig:ServerConfig) -> str:
+    """
+    Função que retorna o caminho da página de erro associada a um código de erro
+    A página de erro é chamada de {código-erro}.html e se encontra dentro da pasta de erros, que por sua vez está dentro da pasta raiz de conteúdo
+    """
+    
+    return serverConfig.configValue["contentRoot"] + serverConfig.configValue["errorPath"] + str(code) + ".html"
+
+def prerender_error(code:int, serverConfig:ServerConfig, responseCodes:dict[Any, Any], contentTypes:dict[Any, Any]) -> None:
+    """
+    Função que pré-renderiza a resposta completa de um código de erro que tem página associada
+    A resposta é dividida em duas partes, antes e depois do header Date, que é o único valor que muda entre respostas
+    
+    Recebe:
+        [int] code:                  O código de erro
+        [ServerConfig] serverConfig: Dados de configuração do servidor
+        [dict] responseCodes:        Os códigos de resposta HTTP
+        [dict] contentTypes:         Os tipos MIME
+    
+    Retorna:
+        Nada
+    """
+    
+    try:
+        body = ContentHandler.get_resource(error_page_path(code, serverConfig), serverConfig).body
+    except OSError as err:
+        # Sem a página, a resposta de erro volta a ser gerada a cada requisição
+        log.error("Erro ao pré-renderizar a página de erro %s: %r", code, err)
+        errorResponses.pop(code, None)
+        return
+    
+    message = responseCodes[str(code)]["message"]
+    head    = f"{serverConfig.configValue['httpVersion']} {code} {message}\r\n"
+    head   += f"Server: {serverConfig.configValue['serverName']}\r\n"
+    tail    = "Connection: close\r\n"
+    tail   += f"Content-Type: {contentTypes['html']}; charset=utf-8\r\n"
+    tail   += f"Content-Lenght: {len(body)}\r\n\r\n"
+    
+    errorResponses[code] = (head.encode("utf-8"), tail.encode("utf-8") + body + b"\r\n", len(body))
+
+def prerender_overload(code:int, serverConfig:ServerConfig, responseCodes:dict[Any, Any]) -> None:
+    """
+    Função que pré-renderiza a resposta completa de um código de erro de sobrecarga
+    Essas respostas são enviadas sem ler a requisição inteira, então não dependem de nada além do código e das configurações
+    O header Retry-After não faz parte da resposta pré-renderizada, ele é inserido por ErrorResponse.formatResponse
+    
+    Recebe:
+        [int] code:                  O código de erro
+        [ServerConfig] serverConfig: Dados de configuração do servidor
+        [dict] responseCodes:        Os códigos de resposta HTTP
+    
+    Retorna:
+        Nada
+    """
+    
+    message = responseCodes[str(code)]["message"]
+    body    = f"{{\"error\": {code}}}\n{{\"message\": {json.dumps(message)}}}".encode("utf-8")
+    
+    head    = f"{serverConfig.configValue['httpVersion']} {code} {message}\r\n"
+    head   += f"Server: {serverConfig.configValue['serverName']}\r\n"
+    tail    = "Connection: close\r\n"
+    tail   += "Content-Type: application/json\r\n"
+    tail   += f"Content-Lenght: {len(body)}\r\n\r\n"
+    
+    errorResponses[code] = (head.encode("utf-8"), tail.encode("utf-8") + body + b"\r\n", len(body))
+
+def prerender_errors(serverConfig:ServerConfig, responseCodes:dict[Any, Any], contentTypes:dict[Any, Any], changedPaths:Optional[list[str]]=None) -> None:
+    """
+    Função que pré-renderiza as respostas de erro que tem página associada
+    Pode ser usada como inscrita no observador de conteúdo, nesse caso apenas as páginas que mudaram são renderizadas novamente
+    
+    Recebe:
+        [ServerConfig] serverConfig: Dados de configuração do servidor
+        [dict] responseCodes:        Os códigos de resposta HTTP
+        [dict] contentTypes:         Os tipos MIME
+        [list] changedPaths:         Arquivos que mudaram, None para renderizar todas as páginas
+    
+    Retorna:
+        Nada
+    """
+    
+    for code in errorPageCodes:
+        if changedPaths is None or error_page_path(code, serverConfig) in changedPaths:
+            prerender_error(code, serverConfig, responseCodes, contentTypes)
+            log.info("Resposta de erro %s pré-renderizada", code)
+    
+    # As respostas de sobrecarga não dependem das páginas de erro, só das configurações
+    if changedPaths is None:
+        for code in overloadCodes:
+            prerender_overload(code, serverConfig, responseCodes)
+
+def format_head(version:str, code:Any, message:str, headers:dict[str, Any]) -> bytes:
+    """
+    Função que formata a primeira linha e os headers de uma resposta, incluindo a linha vazia que separa eles do corpo
+    Os headers são montados em uma única string, que é codificada uma única vez
+    
+    Recebe:
+        [str] version:  Versão do HTTP da resposta
+        [Any] code:     Código de resposta
+        [str] message:  Mensagem do código de resposta
+        [dict] headers: Headers da resposta
+    
+    Retorna:
+        A primeira linha e os headers codificados em bytes
+    """
+    
+    lines = [f"{version} {code} {message}"]
+    lines.extend(f"{header}: {value}" for header, value in headers.items())
+    lines.append("\r\n")
+    
+    return "\r\n".join(lines).encode("utf-8")
+
 class ErrorResponse():
     """
     Classe que representa respostas de erro HTTP
     Como eu não necessáriamente tenho uma requisição bem formatada para associar essa resposta, ela não herda da classe Response abaixo
     De qualquer forma, seus métodos tem mesmo nome para evitar confusão enquanto estou implementando
     Seu construtor recebe o erro que ocorreu durante processamento para poder determinar qual resposta enviar ao cliente
+    Erros que tem página associada usam a resposta pré-renderizada (ver prerender_errors), sem acessar o disco
     """
     
+    __slots__ = ("HTTPResponseCodes", "MIMEContentTypes", "responseCode", "problem", "responseMsg", "version", "cacheStatus",
+                 "headers", "body", "prerendered", "id")
+    
     def __init__(self, error:HTTPException, serverConfig: ServerConfig, responseCodes: dict[Any, Any], contentTypes: dict[Any, Any], id: int) -> None:
         """
         Construtor da classe de respostas de erro
@@ -42,17 +199,24 @@ class ErrorResponse():
         self.problem      = error.problem
         self.responseMsg  = self.HTTPResponseCodes[str(self.responseCode)]["message"]
         self.version      = serverConfig.configValue["httpVersion"]
+        self.cacheStatus  = "-" # Respostas de erro nunca passam pelo cache de conteúdo
         
         # Inicializando os headers da resposta
         self.headers                   = dict()
         self.headers["Server"]         = serverConfig.configValue["serverName"]
-        self.headers["Date"]           = formatdate(timeval=None, localtime=False, usegmt=True)
+        self.headers["Date"]           = http_date()
         self.headers["Connection"]     = "close" # Não é usual fechar a conexão depois de toda msg, mas o protocolo permite
         self.headers["Content-Type"]   = "text/plain; charset=utf-8" # Valor padrão, muda dependendo do que está sendo retornado
         self.headers["Content-Lenght"] = 0 # Valor padrão, será calculado quando o conteúdo da resposta for determinado
-        
-        # Inicializando o corpo da resposta
-        self.body: str
+        if isinstance(error, Exceptions.MethodNotAllowed):
+            self.headers["Allow"] = ", ".join(error.allowed)
+        if isinstance(error, (Exceptions.ServiceUnavailable, Exceptions.TooManyRequests)):
+            self.headers["Retry-After"] = error.retryAfter
+        
+        # Inicializando o corpo da resposta, já codificado
+        self.body: bytes
+        # Resposta pré-renderizada, caso exista uma para esse erro
+        self.prerendered: Optional[tuple[bytes, bytes, int]] = None
     
         # Identificando a resposta
         self.id = id
@@ -70,7 +234,7 @@ class ErrorResponse():
             Nada
         """
         
-        log.info(f"Processando resposta de erro {self.responseCode}")
+        log.debug("Processando resposta de erro %s", self.responseCode)
 
         # Apenas três dos erros que posso retornar tem uma página associada, então verifico se o erro que estou processando é um destes
         # Se sim, recupero a página
@@ -79,28 +243,41 @@ class ErrorResponse():
         # sanity
         #   ||
         #   \/
-        if int(self.responseCode) in [403, 404,418, 500]:
+        if int(self.responseCode) in errorResponses:
+            
+            log.debug("Usando resposta pré-renderizada do erro %s", self.responseCode)
+            
+            self.prerendered = errorResponses[int(self.responseCode)]
+            if int(self.responseCode) in overloadCodes:
+                self.headers["Content-Type"] = "application/json"
+            else:
+                self.headers["Content-Type"] = self.MIMEContentTypes["html"] + "; charset=utf-8"
+            self.headers["Content-Lenght"] = self.prerendered[2]
+            
+            return
+        
+        if int(self.responseCode) in errorPageCodes:
             
-            log.info(f"Recuperando página de erro associada ao erro {self.responseCode}")
+            log.debug("Recuperando página de erro associada ao erro %s", self.responseCode)
             
-            # A página de erro é chamada de {código-erro}.html e se encontra dentro da pasta de erros, que por sua vez está dentro da pasta raiz de conteúdo
-            errorPath = serverConfig.configValue["contentRoot"] + serverConfig.configValue["errorPath"] + str(self.responseCode) + ".html"
-            self.body = ContentHandler.get_resource(errorPath, serverConfig) #type: ignore Linter estava reclamando dos tipos pois get_resource pode retornar bytes, isso nunca vai ocorrer nessa caso
+            errorPath = error_page_path(int(self.responseCode), serverConfig)
+            self.body = ContentHandler.get_resource(errorPath, serverConfig).body
             
             # Como eu sei que sempre vou retornar uma página HTML, posso definir rigidamente esses valores
-            self.headers["Content-Lenght"] = len(self.body.encode("utf-8"))
+            self.headers["Content-Lenght"] = len(self.body)
             self.headers["Content-Type"]   = self.MIMEContentTypes["html"] + "; charset=utf-8"
             
             return 
         
-        log.info(f"Processando mensagem JSON associada ao erro {self.responseCode}")
+        log.debug("Processando mensagem JSON associada ao erro %s", self.responseCode)
         
-        self.body  = f"{{\"error\": {json.dumps(self.responseCode)}}}\n"
-        self.body += f"{{\"message\": {json.dumps(self.problem, ensure_ascii=False)}}}"
+        body  = f"{{\"error\": {json.dumps(self.responseCode)}}}\n"
+        body += f"{{\"message\": {json.dumps(self.problem, ensure_ascii=False)}}}"
+        self.body = body.encode("utf-8")
         
         # Arrumando headers
         self.headers["Content-Type"]   = "application/json"
-        self.headers["Content-Lenght"] = len(self.body.encode("utf-8"))
+        self.headers["Content-Lenght"] = len(self.body)
 
     def formatResponse(self) -> bytes:
         """
@@ -113,18 +290,21 @@ class ErrorResponse():
         Retorna:
             A resposta formatada codificada em bytes
         """
-        resposeFirstLine = f"{self.version} {self.responseCode} {self.responseMsg}\r\n".encode("utf-8")
-        
-        responseHeaders  = bytearray()
-        for header, value in self.headers.items():
-            responseHeaders += f"{header}: {value}\r\n".encode("utf-8")
-        
-        crlf = "\r\n".encode("utf-8")
-        responseBody = self.body.encode("utf-8") + "\r\n".encode("utf-8")
-
-        response = resposeFirstLine + responseHeaders + crlf + responseBody
+        if self.prerendered is not None:
+            # Apenas o header Date (e o Retry-After, nas respostas de sobrecarga) precisa ser inserido na resposta pré-renderizada
+            head = self.prerendered[0] + b"Date: " + self.headers["Date"].encode("utf-8") + b"\r\n"
+            if "Retry-After" in self.headers:
+                head += b"Retry-After: %d\r\n" % self.headers["Retry-After"]
+            return head + self.prerendered[1]
+        
+        return format_head(self.version, self.responseCode, self.responseMsg, self.headers) + self.body + b"\r\n"
+    
+    def streamResponse(self) -> Iterator[bytes]:
+        """
+        Método que retorna as partes da resposta a serem enviadas, respostas de erro são sempre enviadas em uma parte só
+        """
         
-        return response
+        yield self.formatResponse()
      
     def printHead(self) -> str:
         """
@@ -153,8 +333,12 @@ class Response(ABC):
         Cada subclasse tem uma implementação específica desse método
         Cada implementação prepara os headers e o corpo da mensagem dependo da requisição feita pelo cliente
     Tendo preparado a resposta, o método formatResponse irá formatar os dados da resposta numa string que pode ser enviada para o cliente
+    Usa __slots__ (também em cada subclasse), já que um objeto de resposta é criado para cada requisição
     """
     
+    __slots__ = ("method", "resource", "query", "filePath", "version", "requestHeaders", "responseCode", "responseMsg", "headers", "body",
+                 "chunked", "cacheStatus", "HTTPResponseCodes", "MIMEContentTypes", "id")
+    
     # Uma resposta HTTP tem os mesmos três componentes que uma requisição
         # O corpo e o cabeçalho operam da mesma maneira
         # O formato da primeira linha é diferente:
@@ -164,8 +348,13 @@ class Response(ABC):
         # Recuperando dados da requisição
         self.method   = clientRequest.method
         self.resource = clientRequest.resource
+        self.query    = clientRequest.query
+        self.filePath = clientRequest.filePath # Caminho do arquivo do recurso, com o index.html caso o recurso seja uma pasta
         self.version  = clientRequest.version
         
+        # Os cabeçalhos da requisição só são interpretados caso a resposta precise de algum deles
+        self.requestHeaders = clientRequest.headers
+        
         # Inicializando código e mensagem de resposta
         self.responseCode = 100
         self.responseMsg: str
@@ -173,15 +362,18 @@ class Response(ABC):
         # Inicializando os headers da resposta
         self.headers                   = dict()
         self.headers["Server"]         = serverConfig.configValue["serverName"]
-        self.headers["Date"]           = formatdate(timeval=None, localtime=False, usegmt=True)
+        self.headers["Date"]           = http_date()
         self.headers["Connection"]     = "close" # Não é usual fechar a conexão depois de toda msg, mas o protocolo permite
         self.headers["Content-Type"]   = "text/plain; charset=utf-8" # Valor padrão, muda dependendo do que está sendo retornado
         self.headers["Content-Lenght"] = 0 # Valor padrão, será calculado quando o conteúdo da resposta for determinado
         
-        # Inicializando o corpo da resposta
-        self.body: Union[str, bytes, None] # Preciso do None dentro do Union no caso da resposta de HEAD
-        # Parâmetro que indica se o corpo da mensagem é binário ou texto
-        self.contentIsBinary = False
+        # Inicializando o corpo da resposta, sempre em bytes (texto é codificado uma única vez, quando o corpo é gerado)
+        # Ou um iterador de partes em bytes, para corpos que são gerados enquanto são enviados
+        self.body: Union[bytes, Iterator[bytes], None] # Preciso do None no caso da resposta de HEAD
+        # Se o corpo é enviado com Transfer-Encoding: chunked (corpo em partes de tamanho desconhecido)
+        self.chunked = False
+        # Se o corpo veio do cache de conteúdo ("hit"/"miss"), "-" caso não tenha passado pelo cache
+        self.cacheStatus = "-"
         
         # Carregando alguns metadados
         self.HTTPResponseCodes = responseCodes
@@ -195,24 +387,10 @@ class Response(ABC):
         """
         Método fábrica que retorna as subclasses específicas para cada tipo de resposta que será enviada pelo servidor
         Esse método é estático, ou seja, pode ser chamado sem instanciar a classe, é carregado em tempo de compilação
-        TODO: Terminar de documentar você
+        A subclasse é a da rota escolhida quando a requisição foi validada (ver Router.py), cada subclasse se registra com o decorator Router.route
         TODO: Anotar tipo de retorno, ver https://stackoverflow.com/questions/46007544/python-3-type-hint-for-a-factory-method-on-a-base-class-returning-a-child-class
         """
-        # Switch case do Python 
-        match clientRequest.method:
-            
-            case "GET":
-                return GetResponse(clientRequest, serverConfig, responseCodes, contentTypes, id)
-            
-            case "HEAD":
-                return HeadResponse(clientRequest, serverConfig, responseCodes, contentTypes, id)
-            
-            case "OPTIONS":
-                return OptionsResponse(clientRequest, serverConfig, responseCodes, contentTypes, id)
-            
-            case _ :
-                log.error("Aconteceu algo de muito errado no método createResponse")
-                raise Exceptions.InternalError("Erro ao determinar qual resposta ser criada!")
+        return clientRequest.route.handler(clientRequest, serverConfig, responseCodes, contentTypes, id)
     
     @abstractmethod
     def prepareResponse(self, serverConfig:ServerConfig) -> None:
@@ -240,22 +418,61 @@ class Response(ABC):
         Retorna:
             A resposta formatada codificada em bytes
         """
-        resposeFirstLine = f"{self.version} {self.responseCode} {self.responseMsg}\r\n".encode("utf-8")
+        if self.body is None or isinstance(self.body, bytes):
+            return format_head(self.version, self.responseCode, self.responseMsg, self.headers) + (self.body or b"") + b"\r\n"
         
-        responseHeaders  = bytearray()
-        for header, value in self.headers.items():
-            responseHeaders += f"{header}: {value}\r\n".encode("utf-8")
+        # Corpo em partes, só deve acontecer fora do envio normal (ex: __str__), pois carrega o corpo inteiro na memória
+        return b"".join(self.streamResponse())
+    
+    def streamResponse(self) -> Iterator[bytes]:
+        """
+        Método que retorna as partes da resposta a serem enviadas, na ordem
+        Respostas com o corpo em bytes são enviadas em uma parte só, respostas com o corpo em partes enviam os headers
+            e depois cada parte do corpo assim que ela é gerada
         
-        crlf = "\r\n".encode("utf-8")
-        if self.contentIsBinary:
-            # Novamente linter reclamando que não consegue inferir tipos aqui
-            responseBody = self.body + "\r\n".encode("utf-8") #type: ignore
-        else:
-            responseBody = self.body.encode("utf-8") + "\r\n".encode("utf-8") #type: ignore
-
-        response = resposeFirstLine + responseHeaders + crlf + responseBody
+        Recebe:
+            Nada
+        
+        Retorna:
+            Um iterador das partes da resposta, em bytes
+        """
+        
+        if self.body is None or isinstance(self.body, bytes):
+            yield self.formatResponse()
+            return
+        
+        yield format_head(self.version, self.responseCode, self.responseMsg, self.headers)
         
-        return response
+        for chunk in self.body:
+            if not chunk:
+                # Uma parte vazia no formato chunked indicaria o fim do corpo
+                continue
+            yield b"%x\r\n%b\r\n" % (len(chunk), chunk) if self.chunked else chunk
+        
+        if self.chunked:
+            yield b"0\r\n\r\n"
+    
+    def setContentLength(self, length:Optional[int]) -> None:
+        """
+        Método que define o tamanho do corpo da resposta nos headers
+        Caso o tamanho não seja conhecido (corpo gerado enquanto é enviado), usa Transfer-Encoding: chunked
+        Clientes HTTP/1.0 não entendem chunked, para eles o fim do corpo é indicado pelo fechamento da conexão
+        
+        Recebe:
+            [int] length: Tamanho do corpo em bytes, ou None caso ele não seja conhecido
+        
+        Retorna:
+            Nada
+        """
+        
+        if length is not None:
+            self.headers["Content-Lenght"] = length
+            return
+        
+        del self.headers["Content-Lenght"]
+        if self.version != "HTTP/1.0":
+            self.headers["Transfer-Encoding"] = "chunked"
+            self.chunked = True
     
     def printHead(self) -> str:
         """
@@ -276,12 +493,15 @@ class Response(ABC):
         return resposeFirstLine + responseHeaders + f"ID: {self.id}\n"
     
     def __str__(self) -> str:
-        if self.contentIsBinary:
+        if "Content-Encoding" in self.headers or "charset" not in self.headers["Content-Type"]:
             log.warning("Chamando __str__ de requisição onde o conteúdo retornado são dados binários!")
-        return self.formatResponse().decode().replace("\r", "")
+        return self.formatResponse().decode(errors="replace").replace("\r", "")
 
+@Router.route("GET", prefix="/", content=True)
 class GetResponse(Response):
     
+    __slots__ = ()
+    
     def __init__(self, clientRequest: Request, serverConfig: ServerConfig, responseCodes: dict[Any, Any], contentTypes: dict[Any, Any], id: int) -> None:
         super().__init__(clientRequest, serverConfig, responseCodes, contentTypes, id)
 
@@ -298,41 +518,41 @@ class GetResponse(Response):
             Nada
         """
         
-        log.info("Processando requisição GET")
+        log.debug("Processando requisição GET")
+        
+        # O caminho do recurso a ser acessado já foi calculado pela requisição (ver Target.py)
+        path = self.filePath
         
-        # Calculando o caminho do recurso a ser acessado
-        path = serverConfig.configValue["contentRoot"] + self.resource
+        # Verificando se o cliente aceita receber conteúdo comprimido com gzip (gzip;q=0 recusa o gzip)
+        acceptsGzip = self.requestHeaders.accepts_encoding("gzip")
         
         try:
-            # Caso esteja procurando por uma pasta, concateno index.html no final do caminho
-            # para procurar o arquivo html nessa pasta
-            if path.endswith("/"):
-                path += "index.html"
-            
-            fileContents = ContentHandler.get_resource(path, serverConfig)
+            content = ContentHandler.get_resource(path, serverConfig, acceptsGzip)
         except FileNotFoundError:
-            log.error(f"Arquivo não encontrado {self.resource}")
+            log.error("Arquivo não encontrado %s", self.resource)
             raise Exceptions.NotFound("Arquivo não encontrado.", self.resource)
         except OSError:
-            log.error(f"Erro ao recuperar recurso {self.resource}")
+            log.error("Erro ao recuperar recurso %s", self.resource)
             raise Exceptions.InternalError(f"Erro ao recuperar recurso {self.resource}.")
         except Exception as e:
             # Caso qualquer outro problema tenho acontecido, levanto um 418
             # TODO: Pensar qual seria a melhor exceção para ser levantada aqui
-            log.critical(f"Exceção {type(e)} não capturada.")
+            log.critical("Exceção %s não capturada.", type(e))
             raise Exceptions.ImTeapot("Exceção Não Capturada.")
         
         # Tendo recuperado o conteúdo do arquivo, defino ele como o corpo da minha resposta
-        self.body = fileContents
-        self.contentIsBinary = type(self.body) == bytes
-        
-        # E arrumo os headers
-        if self.contentIsBinary:
-            self.headers["Content-Lenght"]   = len(self.body)
-            self.headers["Content-Encoding"] = "gzip"
-        else:
-            self.headers["Content-Lenght"] = len(self.body.encode("utf-8")) #type: ignore
-            # Linter estava reclamando do .encode pois não consegue inferir que o tipo de self.body sempre será str nessa branch
+        self.body = content.body
+        cacheHit  = getattr(ContentHandler.lastLookup, "cacheHit", None)
+        self.cacheStatus = "-" if cacheHit is None else ("hit" if cacheHit else "miss")
+        
+        # E arrumo os headers, o tamanho do corpo é desconhecido apenas para arquivos comprimidos enquanto são enviados
+        self.setContentLength(content.length)
+        if content.encoding is not None:
+            self.headers["Content-Encoding"] = content.encoding
+        # Arquivos texto com arquivos pré-comprimidos habilitados dependem do Accept-Encoding, mesmo quando são enviados sem compressão,
+        #   para que caches não entreguem a versão sem compressão a quem aceita gzip (ou o contrário)
+        if content.encoding is not None or (serverConfig.configValue["useSidecars"] and ContentHandler.isTextFile(path)):
+            self.headers["Vary"] = "Accept-Encoding"
         
         # Para arrumar o Content-Type, tenho que descobrir o tipo de arquivo que foi requisitado
         # Para isso, preciso pegar a extensão do recurso requisitado
@@ -341,8 +561,8 @@ class GetResponse(Response):
         fileExt       = requestedFile.split(".")[1]
         # Dada a única extensão, recupero qual o Content-Type associado a ela
         contentType   = self.MIMEContentTypes[fileExt]
-        # Caso esteja retornando um arquio texto, indico que ele é codificado com utf-8
-        contentType   = contentType if self.contentIsBinary else contentType + "; charset=utf-8"
+        # Caso esteja retornando um arquio texto (mesmo que pré-comprimido), indico seu charset
+        contentType   = f"{contentType}; charset={content.charset}" if content.charset is not None else contentType
         
         self.headers["Content-Type"] = contentType
         
@@ -350,20 +570,23 @@ class GetResponse(Response):
         self.responseCode = 200
         self.responseMsg  = self.HTTPResponseCodes[str(self.responseCode)]["message"]
 
-class HeadResponse(Response):
+@Router.route("HEAD", prefix="/", content=True)
+class HeadResponse(GetResponse):
+    
+    __slots__ = ()
     
     def __init__(self, clientRequest: Request, serverConfig: ServerConfig, responseCodes: dict[Any, Any], contentTypes: dict[Any, Any], id: int) -> None:
         super().__init__(clientRequest, serverConfig, responseCodes, contentTypes, id)
         
         # Respostas do método HEAD não tem corpo, logo o atributo corpo delas é sempre None nessa subclasse
-        self.body            = None
-        self.contentIsBinary = False # Não tenho conteúdo então ele não é binário
+        self.body = None
 
     def prepareResponse(self, serverConfig:ServerConfig) -> None:
         """
         Método que prepara a resposta para uma requisição HEAD
         Essa requisição retorna o que uma requisição GET retornaria, porém omitindo o corpo da mensagem, contendo apenas os headers
         Logo, para gerar essa resposta, gero a resposta de um GET e removo o corpo da mensagem
+        Assim os headers são exatamente os do GET, inclusive a escolha do arquivo pré-comprimido (Content-Encoding, Vary e Content-Lenght)
         
         Recebe 
             [ServerConfig] serverConfig: Dados de configuração do servidor
@@ -372,51 +595,15 @@ class HeadResponse(Response):
             Nada
         """
         
-        # TODO: Aqui eu só copiei praticamente todo o método de responder um GET, visto que um HEAD é um GET sem corpo de mensagem
-        # Certamente tem uma maneira melhor de fazer isso, contudo eu não consigo pensar numa agora
-        
-        log.info("Processando requisição HEAD")
+        log.debug("Processando requisição HEAD")
         
-        # Calculando o caminho do recurso a ser acessado
-        path = serverConfig.configValue["contentRoot"] + self.resource
+        super().prepareResponse(serverConfig)
         
-        try:
-            # Caso esteja procurando por uma pasta, concateno index.html no final do caminho
-            # para procurar o arquivo html nessa pasta
-            if path.endswith("/"):
-                path += "index.html"
-            
-            contentSize = ContentHandler.get_sizeof_resource(path, serverConfig)
-        except FileNotFoundError:
-            log.error(f"Arquivo não encontrado {self.resource}")
-            raise Exceptions.NotFound("Arquivo não encontrado.", self.resource)
-        except OSError:
-            log.error(f"Erro ao recuperar recurso {self.resource}")
-            raise Exceptions.InternalError(f"Erro ao recuperar recurso {self.resource}.")
-        except Exception as e:
-            # Caso qualquer outro problema tenho acontecido, levanto um 418 e mando o cliente tomar no cu
-            # TODO: Pensar qual seria a melhor exceção para ser levantada aqui
-            log.critical(f"Exceção {type(e)} não capturada.")
-            raise Exceptions.ImTeapot("Exceção Não Capturada.")
-        
-        # Definindo o tamanho do conteúdo
-        self.headers["Content-Lenght"] = contentSize
-        
-        # Para arrumar o Content-Type, tenho que descobrir o tipo de arquivo que foi requisitado
-        # Para isso, preciso pegar a extensão do recurso requisitado
-        requestedFile = path.split("/")[-1] # Retorna uma string
-        # Dada a string, separo ela no ponto (.split(".")) e pego o que está depois do ponto ([1])
-        fileExt       = requestedFile.split(".")[1]
-        # Dada a única extensão, recupero qual o Content-Type associado a ela
-        contentType   = self.MIMEContentTypes[fileExt]
-        # Caso esteja retornando um arquio texto, indico que ele é codificado com utf-8
-        contentType   = contentType if self.contentIsBinary else contentType + "; charset=utf-8"
-        
-        self.headers["Content-Type"] = contentType
-        
-        # Por fim, defino o código e msg de retorno
-        self.responseCode = 200
-        self.responseMsg  = self.HTTPResponseCodes[str(self.responseCode)]["message"]
+        # O corpo vem do cache de conteúdo, ou é um gerador que ainda não leu nada do arquivo (arquivos grandes)
+        close = getattr(self.body, "close", None)
+        if close is not None:
+            close()
+        self.body = None
     
     def formatResponse(self) -> bytes:
         """
@@ -429,20 +616,13 @@ class HeadResponse(Response):
         Retorna:
             A resposta formatada codificada em bytes
         """
-        resposeFirstLine = f"{self.version} {self.responseCode} {self.responseMsg}\r\n".encode("utf-8")
-        
-        responseHeaders  = bytearray()
-        for header, value in self.headers.items():
-            responseHeaders += f"{header}: {value}\r\n".encode("utf-8")
-        
-        crlf = "\r\n".encode("utf-8")
-
-        response = resposeFirstLine + responseHeaders + crlf
-        
-        return response
+        return format_head(self.version, self.responseCode, self.responseMsg, self.headers)
 
+@Router.route("OPTIONS", prefix="/", content=True)
 class OptionsResponse(Response):
     
+    __slots__ = ()
+    
     def __init__(self, clientRequest: Request, serverConfig: ServerConfig, responseCodes: dict[Any, Any], contentTypes: dict[Any, Any], id: int) -> None:
         super().__init__(clientRequest, serverConfig, responseCodes, contentTypes, id)
 
@@ -450,7 +630,7 @@ class OptionsResponse(Response):
         """
         Método que prepara a resposta para uma requisição OPTIONS
         Essa é a requisição mais simples, pois apenas quer saber quais são os métodos que este servidor aceita
-        Nesse caso, apenas GET, HEAD e OPTIONS
+        Os métodos vem da tabela de rotas, são os que tem alguma rota para o recurso requisitado (por padrão GET, HEAD e OPTIONS)
         
         Recebe:
             [ServerConfig] serverConfig: Dados de configuração do servidor 
@@ -460,13 +640,135 @@ class OptionsResponse(Response):
         """
         
         # Definindo o corpo como uma string de JSON indicando os métodos aceitos
-        methods = serverConfig.configValue["implemmentedMethods"]
-        self.body = f"{{\"accepted_methods\": {json.dumps(methods)}}}"
+        methods = Router.routeTable.allowed_methods(self.resource)
+        self.body = f"{{\"accepted_methods\": {json.dumps(methods)}}}".encode("utf-8")
         
         # Arrumando headers
+        self.headers["Allow"]          = ", ".join(methods)
         self.headers["Content-Type"]   = "application/json"
-        self.headers["Content-Lenght"] = len(self.body.encode("utf-8"))
+        self.headers["Content-Lenght"] = len(self.body)
         
         # Definindo código e mensagem de resposta
         self.responseCode = 200
-        self.responseMsg = self.HTTPResponseCodes[str(self.responseCode)]["message"]
\ No newline at end of file
+        self.responseMsg = self.HTTPResponseCodes[str(self.responseCode)]["message"]
+
+@Router.route("GET", pathKey="metricsPath", enabledKey="metricsEnabled")
+class MetricsResponse(Response):
+    
+    __slots__ = ()
+    
+    def __init__(self, clientRequest: Request, serverConfig: ServerConfig, responseCodes: dict[Any, Any], contentTypes: dict[Any, Any], id: int) -> None:
+        super().__init__(clientRequest, serverConfig, responseCodes, contentTypes, id)
+
+    def prepareResponse(self, serverConfig:ServerConfig) -> None:
+        """
+        Método que prepara a resposta da página de métricas do servidor
+        A página é gerada no momento da requisição a partir dos contadores do módulo Metrics
+        
+        Recebe:
+            [ServerConfig] serverConfig: Dados de configuração do servidor 
+        
+        Retona:
+            Nada
+        """
+        
+        self.body = Metrics.render().encode("utf-8")
+        
+        # Arrumando headers
+        self.headers["Content-Type"]   = "text/plain; version=0.0.4; charset=utf-8"
+        self.headers["Content-Lenght"] = len(self.body)
+        self.headers["Cache-Control"]  = "no-store"
+        
+        # Definindo código e mensagem de resposta
+        self.responseCode = 200
+        self.responseMsg = self.HTTPResponseCodes[str(self.responseCode)]["message"]
+
+@Router.route("GET", pathKey="profilerPath", enabledKey="profilerEnabled")
+class ProfileResponse(Response):
+    
+    __slots__ = ()
+    
+    def __init__(self, clientRequest: Request, serverConfig: ServerConfig, responseCodes: dict[Any, Any], contentTypes: dict[Any, Any], id: int) -> None:
+        super().__init__(clientRequest, serverConfig, responseCodes, contentTypes, id)
+
+    def prepareResponse(self, serverConfig:ServerConfig) -> None:
+        """
+        Método que prepara a resposta da página interna do profiler
+        Pede uma sessão de profiling, que começa depois dessa resposta ser enviada
+        O número de requisições e a duração da sessão podem ser passados na query (?requests=N&seconds=T)
+        
+        Recebe:
+            [ServerConfig] serverConfig: Dados de configuração do servidor 
+        
+        Retona:
+            Nada
+        """
+        
+        query = parse_qs(self.query)
+        try:
+            maxRequests = int(query["requests"][0]) if "requests" in query else None
+            seconds     = float(query["seconds"][0]) if "seconds" in query else None
+        except ValueError:
+            raise Exceptions.BadRequest("Parâmetros do profiler inválidos!", self.resource)
+        
+        if Profiler.session is not None:
+            body = "Profiling já em andamento\n"
+        else:
+            Profiler.request_session(serverConfig, maxRequests, seconds)
+            body = f"Profiling iniciado, resultados em {serverConfig.configValue['profilerOutputDir']}/\n"
+        self.body = body.encode("utf-8")
+        
+        # Arrumando headers
+        self.headers["Content-Lenght"] = len(self.body)
+        self.headers["Cache-Control"]  = "no-store"
+        
+        # Definindo código e mensagem de resposta
+        self.responseCode = 200
+        self.responseMsg = self.HTTPResponseCodes[str(self.responseCode)]["message"]
+
+@Router.route(["GET", "HEAD"], pathKey="healthPath", enabledKey="healthEnabled")
+class HealthResponse(Response):
+    
+    __slots__ = ()
+    
+    def __init__(self, clientRequest: Request, serverConfig: ServerConfig, responseCodes: dict[Any, Any], contentTypes: dict[Any, Any], id: int) -> None:
+        super().__init__(clientRequest, serverConfig, responseCodes, contentTypes, id)
+    
+    def prepareResponse(self, serverConfig:ServerConfig) -> None:
+        """
+        Método que prepara a resposta da verificação de saúde do servidor, usada por balanceadores de carga e monitores
+        Se o loop principal conseguiu responder, o servidor está saudável, então a resposta é sempre a mesma
+        
+        Recebe:
+            [ServerConfig] serverConfig: Dados de configuração do servidor 
+        
+        Retona:
+            Nada
+        """
+        
+        body = b"ok\n"
+        self.body = body if self.method == "GET" else None
+        
+        # Arrumando headers
+        self.headers["Content-Lenght"] = len(body)
+        self.headers["Cache-Control"]  = "no-store"
+        
+        # Definindo código e mensagem de resposta
+        self.responseCode = 200
+        self.responseMsg = self.HTTPResponseCodes[str(self.responseCode)]["message"]
+
+    def formatResponse(self) -> bytes:
+        """
+        Método que vai formatar os dados a serem retornados no formato adequado para uma resposta HTTP
+        Respostas de HEAD contém apenas a primeira linha e os headers, como em HeadResponse
+        
+        Recebe:
+            Nada
+            
+        Retorna:
+            A resposta formatada codificada em bytes
+        """
+        if self.body is None:
+            return format_head(self.version, self.responseCode, self.responseMsg, self.headers)
+        
+        return super().formatResponse()
@@ -0,0 +1,273 @@
+import logging                         # Biblioteca de criação de logs
+import Exceptions                      # Módulo de Exceções específicas do Servidor
+from typing import Any, Callable, Optional, Union # Anotações de tipo
+from Configuration import ServerConfig # Configurações do Servidor
+
+"""
+Router.py
+Módulo que define o registro de rotas do servidor, que associa um método HTTP e um caminho à classe que gera a resposta
+As classes de resposta se registram com o decorator route, informando os métodos e um caminho exato ou um prefixo de caminho
+    (ex: arquivos estáticos em "/", a página de métricas em "/__metrics")
+Caminhos que vem das configurações são informados pelo nome da configuração (pathKey),
+    e uma rota pode depender de uma configuração booleana para ser habilitada (enabledKey)
+
+Na inicialização (e quando as configurações são recarregadas), as rotas registradas são compiladas em uma tabela:
+    caminhos exatos ficam em um dict, caminho -> método -> rota
+    prefixos ficam em uma trie de segmentos do caminho, onde cada nó guarda as rotas daquele prefixo por método
+Assim o custo de escolher a rota depende apenas do número de segmentos do caminho requisitado, não do número de rotas registradas
+Um caminho exato só atende os métodos das suas rotas (os outros recebem 405 com o header Allow), os prefixos não valem para ele
+Entre os prefixos, o mais longo que tem rota para o método da requisição é o escolhido
+Os prefixos são comparados por segmentos, então o prefixo "/assets" vale para "/assets/main.css" mas não para "/assetsX"
+
+Os métodos aceitos pelo servidor (e os headers Allow) são gerados a partir da tabela, limitados aos métodos em implemented_methods
+"""
+
+log = logging.getLogger("Main.Server.Router")
+
+class Route():
+    """
+    Classe que representa uma rota registrada
+    
+    Atributos da Classe:
+        [list] methods:    Métodos HTTP atendidos pela rota
+        [Any]  handler:    Classe (ou função) que recebe os mesmos argumentos que Response e retorna a resposta
+        [str]  path:       Caminho exato da rota, ou None
+        [str]  prefix:     Prefixo de caminho da rota, ou None
+        [str]  pathKey:    Nome da configuração que contém o caminho exato da rota, ou None
+        [str]  enabledKey: Nome da configuração booleana que habilita a rota, None caso a rota esteja sempre habilitada
+        [bool] content:    Se a rota envia arquivos da pasta de conteúdo, nesse caso o recurso passa pelas validações da requisição
+    """
+    
+    __slots__ = ("methods", "handler", "path", "prefix", "pathKey", "enabledKey", "content")
+    
+    def __init__(self, methods:"list[str]", handler:Any, path:Optional[str], prefix:Optional[str], pathKey:Optional[str],
+                 enabledKey:Optional[str], content:bool) -> None:
+        self.methods    = methods
+        self.handler    = handler
+        self.path       = path
+        self.prefix     = prefix
+        self.pathKey    = pathKey
+        self.enabledKey = enabledKey
+        self.content    = content
+    
+    def __repr__(self) -> str:
+        where = self.path or self.prefix and self.prefix + "*" or f"<{self.pathKey}>"
+        return f"Route({'/'.join(self.methods)} {where} -> {getattr(self.handler, '__name__', self.handler)})"
+
+# Rotas registradas pelo decorator route, na ordem em que foram registradas
+registeredRoutes: list[Route] = []
+
+def route(methods:Union[str, "list[str]"], path:Optional[str]=None, prefix:Optional[str]=None, pathKey:Optional[str]=None,
+          enabledKey:Optional[str]=None, content:bool=False) -> Callable[[Any], Any]:
+    """
+    Decorator que registra uma classe de resposta como a rota de um ou mais métodos em um caminho
+    Exatamente um entre path, prefix e pathKey deve ser informado
+    As rotas só passam a valer quando a tabela é compilada (ver init_router)
+    
+    Recebe:
+        [str|list] methods: Método ou lista de métodos HTTP atendidos
+        [str] path:         Caminho exato (ex: "/healthz")
+        [str] prefix:       Prefixo de caminho (ex: "/" para todos os caminhos)
+        [str] pathKey:      Nome da configuração que contém o caminho exato (ex: "metricsPath")
+        [str] enabledKey:   Nome da configuração booleana que habilita a rota
+        [bool] content:     Se a rota envia arquivos da pasta de conteúdo
+    
+    Retorna:
+        O decorator, que retorna a própria classe sem alterações
+    """
+    
+    if [path, prefix, pathKey].count(None) != 2:
+        raise ValueError("Uma rota precisa de exatamente um entre path, prefix e pathKey")
+    
+    methodList = [methods] if isinstance(methods, str) else list(methods)
+    
+    def register(handler:Any) -> Any:
+        registeredRoutes.append(Route(methodList, handler, path, prefix, pathKey, enabledKey, content))
+        return handler
+    
+    return register
+
+class TrieNode():
+    """
+    Classe que representa um nó da trie de prefixos, um nó por segmento de caminho
+    
+    Atributos da Classe:
+        [dict] children: Segmento -> nó filho
+        [dict] routes:   Método -> rota cujo prefixo termina nesse nó
+    """
+    
+    __slots__ = ("children", "routes")
+    
+    def __init__(self) -> None:
+        self.children: dict[str, TrieNode] = dict()
+        self.routes: dict[str, Route]      = dict()
+
+def path_segments(path:str) -> "list[str]":
+    """
+    Função que separa um prefixo de caminho nos segmentos usados como chaves da trie, "/" é a raiz (nenhum segmento)
+    """
+    
+    return [segment for segment in path.split("/") if segment]
+
+class RouteTable():
+    """
+    Classe que representa a tabela de rotas compilada
+    
+    Atributos da Classe:
+        [dict]     exact:   Caminho exato -> método -> rota
+        [TrieNode] root:    Raiz da trie de prefixos
+        [list]     methods: Métodos atendidos por alguma rota, na ordem em que foram registrados
+    """
+    
+    __slots__ = ("exact", "root", "methods")
+    
+    def __init__(self) -> None:
+        self.exact: dict[str, dict[str, Route]] = dict()
+        self.root    = TrieNode()
+        self.methods: list[str] = []
+    
+    def add(self, method:str, path:Optional[str], prefix:Optional[str], route:Route) -> None:
+        """
+        Método que adiciona uma rota para um método em um caminho exato ou em um prefixo
+        Uma rota registrada depois para o mesmo método e caminho substitui a anterior
+        """
+        
+        if path is not None:
+            routes = self.exact.setdefault(path, dict())
+        else:
+            node = self.root
+            for segment in path_segments(prefix or "/"):
+                node = node.children.setdefault(segment, TrieNode())
+            routes = node.routes
+        
+        if method in routes:
+            log.warning("Rota %r substitui %r para %s", route, routes[method], method)
+        routes[method] = route
+        
+        if method not in self.methods:
+            self.methods.append(method)
+    
+    def resolve(self, method:str, target:str) -> Route:
+        """
+        Método que escolhe a rota de uma requisição
+        Levanta MethodNotImplemented caso nenhuma rota atenda o método, MethodNotAllowed caso o caminho tenha rotas
+            apenas para outros métodos e NotFound caso o caminho não tenha rotas
+        
+        Recebe:
+            [str] method: Método da requisição
+            [str] target: Recurso requisitado, a query é ignorada
+        
+        Retorna:
+            A rota da requisição
+        """
+        
+        if method not in self.methods:
+            log.error("Erro, método requisitado não foi implementado:%s", method)
+            raise Exceptions.MethodNotImplemented("Método Não Implementado!", method)
+        
+        path = target.split("?", 1)[0]
+        
+        # Um caminho exato só atende os métodos das suas rotas, os prefixos não valem para ele
+        exactRoutes = self.exact.get(path)
+        if exactRoutes is not None:
+            if method in exactRoutes:
+                return exactRoutes[method]
+            log.error("Erro, método %s não permitido em %s", method, path)
+            raise Exceptions.MethodNotAllowed("Método Não Permitido!", method, self.allowed_methods(path))
+        
+        found = None
+        if path.startswith("/"):
+            node  = self.root
+            found = node.routes.get(method)
+            for segment in path[1:].split("/"):
+                child = node.children.get(segment)
+                if child is None:
+                    break
+                node  = child
+                found = node.routes.get(method, found)
+        
+        if found is not None:
+            return found
+        
+        allowed = self.allowed_methods(path)
+        if allowed:
+            log.error("Erro, método %s não permitido em %s", method, path)
+            raise Exceptions.MethodNotAllowed("Método Não Permitido!", method, allowed)
+        
+        log.error("Erro, nenhuma rota para o recurso:%s", path)
+        raise Exceptions.NotFound("Recurso Não Encontrado!", path)
+    
+    def allowed_methods(self, target:str) -> "list[str]":
+        """
+        Método que lista os métodos que tem rota para um caminho, usado nos headers Allow e nas respostas de OPTIONS
+        """
+        
+        path = target.split("?", 1)[0]
+        
+        exactRoutes = self.exact.get(path)
+        if exactRoutes is not None:
+            return [method for method in self.methods if method in exactRoutes]
+        
+        allowed: set[str] = set()
+        if path.startswith("/"):
+            node = self.root
+            allowed.update(node.routes)
+            for segment in path[1:].split("/"):
+                child = node.children.get(segment)
+                if child is None:
+                    break
+                node = child
+                allowed.update(node.routes)
+        
+        return [method for method in self.methods if method in allowed]
+
+def compile_routes(serverConfig:ServerConfig) -> RouteTable:
+    """
+    Função que compila as rotas registradas em uma tabela, de acordo com as configurações
+    Rotas desabilitadas nas configurações e métodos que não estão em implemented_methods ficam fora da tabela
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        A tabela de rotas
+    """
+    
+    implemented = serverConfig.configValue["implemmentedMethods"]
+    table = RouteTable()
+    
+    for registered in registeredRoutes:
+        if registered.enabledKey is not None and not serverConfig.configValue[registered.enabledKey]:
+            continue
+        
+        path = serverConfig.configValue[registered.pathKey] if registered.pathKey is not None else registered.path
+        for method in registered.methods:
+            if method in implemented:
+                table.add(method, path, registered.prefix, registered)
+    
+    for method in implemented:
+        if method not in table.methods:
+            log.warning("Método %s está em implemented_methods mas não tem nenhuma rota registrada", method)
+    
+    return table
+
+# Tabela de rotas em uso, compilada por init_router
+routeTable = RouteTable()
+
+def init_router(serverConfig:ServerConfig) -> None:
+    """
+    Função que compila a tabela de rotas usada pelas requisições
+    Deve ser chamada depois que os módulos que registram rotas (ResponseHandler) forem importados,
+        e novamente quando as configurações forem recarregadas
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Nada
+    """
+    
+    global routeTable
+    
+    routeTable = compile_routes(serverConfig)
+    log.info("Tabela de rotas compilada, métodos: %s", ", ".join(routeTable.methods))
@@ -3,11 +3,30 @@ import logging                                      # Biblioteca de criação de
 import json                                         # Abertura de arquivos .json
 import selectors                                    # Multiplexação de input
 import sys                                          # Funções do sistema
+import os                                           # Variáveis de ambiente
+import signal                                       # Tratamento de sinais (encerramento, recarga e reinício)
+import ssl                                          # Erros das conexões TLS
+import subprocess                                   # Para reiniciar o servidor em um novo processo
+import time                                         # Tempo máximo de encerramento e duração das requisições
+import tomllib                                      # Erros ao recarregar o arquivo de configurações
 from typing import Optional, Any                    # Anotações de tipo
+import ResponseHandler                              # Pré-renderização das respostas de erro
 from ResponseHandler import Response, ErrorResponse # Módulo de Respostas HTTP
 from RequestHandler import Request                  # Módulo de Requisições HTTP
-from Exceptions import HTTPException, ImTeapot      # Módulo de Exceções específicas do Servidor
+from Exceptions import HTTPException, ImTeapot, ServiceUnavailable # Módulo de Exceções específicas do Servidor
 from Configuration import ServerConfig              # Configurações do Servidor
+import ContentHandler                               # Índice, cache e observador de conteúdo
+import AccessLog                                    # Log de acesso
+import Admission                                    # Controle de admissão (recusa de requisições por sobrecarga)
+import Metrics                                      # Métricas internas do servidor
+import Profiler                                     # Profiling sob demanda
+import RateLimit                                    # Limite de requisições por cliente
+import Router                                       # Tabela de rotas
+import Listeners                                    # Sockets que recebem as conexões (TCP, TLS, Unix e descritores herdados)
+import TLS                                          # Handshakes das conexões HTTPS
+import Warmup                                       # Aquecimento do cache na inicialização
+import Watchdog                                     # Detecção de travamentos do loop principal
+from Transfer import ResponseTransfer               # Envio não bloqueante das respostas
 
 """
 Server.py
@@ -18,31 +37,91 @@ Mensagens HTTP são inicialmente processadas aqui, antes de seu processamento se
 
 log = logging.getLogger("Main.Server")
 id = 0 # Um id numérico e sequencial usado para identificar pares de requisição/resposta
+pendingSignals: set[int] = set() # Sinais recebidos que ainda não foram tratados pelo loop principal
 
-def handle_request(clientSocket: socket.socket, serverConfig:ServerConfig, responses:dict[Any, Any], types:dict[Any, Any]) -> bool:
+def record_response(address:Any, startLine:str, response:Any, sentBytes:int, timer:Metrics.PhaseTimer) -> None:
+    """
+    Função que registra uma resposta enviada nas métricas e no log de acesso
+    
+    Recebe:
+        [Any] address:   Endereço do cliente
+        [str] startLine: Primeira linha da requisição
+        [Any] response:  A resposta enviada (Response ou ErrorResponse)
+        [int] sentBytes: Número de bytes enviados
+        [PhaseTimer] timer: Duração das fases do processamento da requisição
+    
+    Retorna:
+        Nada
+    """
+    
+    fields = startLine.split()
+    method = fields[0] if len(fields) > 0 else "-"
+    
+    Metrics.record_response(method, response.responseCode, sentBytes, timer)
+    
+    if AccessLog.accessLog is None:
+        return
+    
+    path     = fields[1] if len(fields) > 1 else "-"
+    encoding = "gzip" if "Content-Encoding" in response.headers else "identity"
+    
+    AccessLog.record(address, method, path, response.responseCode, sentBytes, timer.total(), response.cacheStatus, encoding)
+
+def wants_server_timing(clientRequest:Request, serverConfig:ServerConfig) -> bool:
+    """
+    Função que decide se a resposta deve conter o cabeçalho Server-Timing com a duração das fases do processamento
+    O cabeçalho é enviado em todas as respostas caso [ServerTiming] enabled = true,
+        ou quando a requisição contém o cabeçalho de ativação com o token configurado
+    
+    Recebe:
+        [Request] clientRequest:     A requisição sendo respondida
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        True caso o cabeçalho deva ser enviado, False caso contrário
+    """
+    
+    if serverConfig.configValue["serverTimingEnabled"]:
+        return True
+    
+    token = serverConfig.configValue["serverTimingToken"]
+    if token == "":
+        return False
+    
+    return clientRequest.headers.get(serverConfig.configValue["serverTimingHeader"]) == token
+
+def handle_request(clientSocket: socket.socket, serverConfig:ServerConfig, responses:dict[Any, Any], types:dict[Any, Any], address:Any=None,
+                   refusal:Optional[HTTPException]=None) -> Optional[ResponseTransfer]:
     """
     Função que lida com uma requisição HTTP
     Quando o servidor receber uma requisição, essa função irá processar a mensagem HTTP recebida
     Após processar a mensagem, irá chamar a função que processa a reposta para essa requisição
-    Retorna booleano indicando se a requisição foi aceita ou não
+    A resposta não é enviada aqui, o envio é feito pelo loop principal sem bloquear (ver Transfer.py)
     
     Recebe:
         clienteSocket: A porta na qual um cliente se conectou e está mandando uma requisição HTTP
+        address: O endereço do cliente, usado no log de acesso
+        refusal: Erro com o qual a requisição é recusada antes de ser lida (503 por sobrecarga, ver Admission.py, ou 429, ver RateLimit.py)
+            nesse caso apenas a primeira linha é lida
         
     Retorna:
-        True caso a requisição tenha sido aceita (retorno 1xx, 2xx ou 3xx)
-        False caso a requisição tenha sido recusada (retorno 4xx ou 5xx)
+        O envio da resposta, cujo atributo success indica se a requisição foi aceita (retorno 1xx, 2xx ou 3xx)
+            ou recusada (retorno 4xx ou 5xx)
+        OU
+        None caso nenhuma requisição completa tenha sido lida
     """
     
+    timer         = Metrics.PhaseTimer() # Duração de cada fase do processamento, para as métricas e o log de acesso
     HTTPStartLine = "" # Primeira linha da requisição (onde tem o método)
-    HTTPHeaders   = "" # Cabeçalhos da requisição
-    HTTPBody      = "" # Corpo da requisição
+    HTTPHeaders   = bytearray() # Cabeçalhos da requisição, interpretados apenas quando forem acessados
+    HTTPBody      = bytearray() # Corpo da requisição
     
     # Função anônima para verificar se uma requisição tem um corpo que deve se rprocessado
     has_body = lambda l: "POST" in l or "PUT" in l or "PATCH" in l
     
     # Ouvindo a mensagem que o cliente está mandando para o servidor
-    with clientSocket.makefile() as incomingMessage:
+    # A mensagem é lida em bytes, apenas a primeira linha é decodificada aqui
+    with clientSocket.makefile("rb") as incomingMessage:
         
         # Talvez tenha um jeito melhor de fazer isso
         linesRead = 0
@@ -53,19 +132,23 @@ def handle_request(clientSocket: socket.socket, serverConfig:ServerConfig, respo
         for line in incomingMessage:
         
             if linesRead == 0:
-                HTTPStartLine = line
+                HTTPStartLine = line.decode("utf-8", errors="replace")
                 # Caso o método não tenha um corpo, não preciso contar duas linhas vazias
                 maxBlanks = maxBlanks - 1 if not has_body(HTTPStartLine) else maxBlanks
+                
+                if refusal is not None:
+                    timer.mark("read")
+                    return refuse_request(clientSocket, serverConfig, responses, types, address, HTTPStartLine, timer, refusal)
         
-            if linesRead > 0 and blanksRead == 0 and (line != "\r\n" or line != "\n"):
+            if linesRead > 0 and blanksRead == 0 and (line != b"\r\n" or line != b"\n"):
                 # Cabeçalhos acabam após uma linha vazia
                 HTTPHeaders += line
                 
-            if linesRead > 0 and blanksRead == 1 and (line != "\r\n" or line != "\n"):
+            if linesRead > 0 and blanksRead == 1 and (line != b"\r\n" or line != b"\n"):
                 # Corpo da mensagem começa após uma linha vazia, mas não pode ele mesmo conter uma linha vazia
                 HTTPBody += line
                 
-            if line == "\r\n" or line == "\n":
+            if line == b"\r\n" or line == b"\n":
                 blanksRead += 1
             
             if blanksRead == maxBlanks:
@@ -73,90 +156,155 @@ def handle_request(clientSocket: socket.socket, serverConfig:ServerConfig, respo
                 # Quando ler todas as linhas da requisição enviada, começo a processar a requisição
                 # Ver: https://stackoverflow.com/a/69859356
                 
+                timer.mark("read")
+                
                 try:
                     global id
                     
-                    clientRequest = Request(HTTPStartLine.rstrip(), HTTPHeaders, HTTPBody, serverConfig, id)
+                    Watchdog.requestId, Watchdog.requestLine = id, HTTPStartLine
+                    
+                    clientRequest = Request(HTTPStartLine.rstrip(), bytes(HTTPHeaders), bytes(HTTPBody), serverConfig, id)
+                    timer.mark("validate")
                     
-                    print(f"\tRequisição: {HTTPStartLine.rstrip()} ID: {id}")
+                    if serverConfig.configValue["verbose"]:
+                        print(f"\tRequisição: {HTTPStartLine.rstrip()} ID: {id}")
                     
-                    log.info(f"Requisição recebida e processada:")
-                    log.info(f"\n\n{str(clientRequest)}")
+                    # %s só converte a requisição para string caso a mensagem vá ser escrita no log
+                    log.debug("Requisição recebida e processada:\n\n%s", clientRequest)
                     
                     # Gero o objeto de resposta a partir da requisição
                     responseToClient = Response.createResponse(clientRequest, serverConfig, responses, types, id)
+                    timer.mark("create")
                     responseToClient.prepareResponse(serverConfig) # Preparando a resposta para ser eviada
+                    timer.mark("prepare")
                     
-                    log.info(f"Resposta preparada e pronta para ser enviada:")
-                    log.info(f"\n\n{responseToClient.printHead()}")
+                    # O cabeçalho Server-Timing só pode conter as fases encerradas antes da resposta ser formatada
+                    if wants_server_timing(clientRequest, serverConfig):
+                        responseToClient.headers["Server-Timing"] = timer.server_timing()
                     
-                    # Método formatResponse() retorna a resposta gerada em binário, essa que é transmitida na socket sem conversão
-                    responseInBinary = responseToClient.formatResponse()
-                    ret = clientSocket.sendall(responseInBinary)
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug("Resposta preparada e pronta para ser enviada:\n\n%s", responseToClient.printHead())
                     
-                    if ret is not None:
-                        log.warning("Erro ao enviar resposta!")
-                        print("Erro ao enviar resposta!")
-                    else:                    
-                        log.info("Resposta enviada")
+                    # O método streamResponse() gera a resposta em partes binárias, que são transmitidas na socket sem conversão
+                    transfer = ResponseTransfer(clientSocket, responseToClient, address, HTTPStartLine, timer, True)
+                    timer.mark("format")
                     
                     id += 1
                     
-                    return True
+                    return transfer
                     
                 except HTTPException as exception:
                     # Caso alguma exceção HTTP tenha sido levantada, processo ela com uma resposta de erro correspondente a exceção
-                    log.warning("Excessão HTTP")
-                    log.warning(repr(exception))
+                    log.warning("Excessão HTTP: %r", exception)
                     
                     # Preparando a msg de erro a ser enviada ao cliente
                     errorResponse = ErrorResponse(exception, serverConfig, responses, types, id)
                     errorResponse.prepareResponse(serverConfig)
+                    timer.mark("error")
                     
-                    log.info(f"Mensagem de erro preparada e pronta para ser enviada:")
-                    log.info(f"\n\n{errorResponse.printHead()}")
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug("Mensagem de erro preparada e pronta para ser enviada:\n\n%s", errorResponse.printHead())
                     
-                    errorInBinary = errorResponse.formatResponse()
-                    
-                    ret = clientSocket.sendall(errorInBinary)
-                    
-                    if ret is not None:
-                        log.warning("Erro ao enviar resposta!")
-                        print("Erro ao enviar resposta!")
-                    else:                    
-                        log.info("Resposta enviada")
+                    transfer = ResponseTransfer(clientSocket, errorResponse, address, HTTPStartLine, timer, False)
+                    timer.mark("format")
                     
                     id += 1
                     
-                    return False
+                    return transfer
                 except Exception as exception:
                     # Caso qualquer outra exceção tenha sido levantada,
                     #   registro isso no log, respondo ao cliente com erro 418 e mato a conexão
                     
-                    log.warning("Outra excessão")
-                    log.warning(repr(exception))
+                    log.warning("Outra excessão: %r", exception)
                     
                     # Preparando a msg de erro a ser enviada ao cliente
                     errorResponse = ErrorResponse(ImTeapot("Outra excessão"), serverConfig, responses, types, id)
                     errorResponse.prepareResponse(serverConfig)
+                    timer.mark("error")
                     
-                    errorInBinary = errorResponse.formatResponse()
-                    
-                    ret = clientSocket.sendall(errorInBinary)
-                    
-                    if ret is not None:
-                        log.warning("Erro ao enviar resposta!")
-                        print("Erro ao enviar resposta!")
-                    else:                    
-                        log.info("Resposta enviada")
+                    transfer = ResponseTransfer(clientSocket, errorResponse, address, HTTPStartLine, timer, False)
+                    timer.mark("format")
                     
                     id += 1
                     
-                    return False
+                    return transfer
 
             linesRead += 1
     
-    return False
+    return None
+
+def refuse_request(clientSocket:socket.socket, serverConfig:ServerConfig, responses:dict[Any, Any], types:dict[Any, Any], address:Any,
+                   startLine:str, timer:Metrics.PhaseTimer, refusal:HTTPException) -> ResponseTransfer:
+    """
+    Função que recusa uma requisição porque o servidor está sobrecarregado (503) ou o cliente passou do limite de requisições (429)
+    A resposta é a pré-renderizada (ver ResponseHandler.prerender_overload), então nada além da primeira linha
+        da requisição é interpretado e o disco não é acessado
+    
+    Recebe:
+        [socket] clientSocket:       Socket do cliente
+        [ServerConfig] serverConfig: Configurações do servidor
+        [dict] responses:            Os códigos de resposta HTTP
+        [dict] types:                Os tipos MIME
+        [Any] address:               Endereço do cliente
+        [str] startLine:             Primeira linha da requisição
+        [PhaseTimer] timer:          Duração das fases do processamento da requisição
+        [HTTPException] refusal:     O erro enviado ao cliente, contado nas métricas
+    
+    Retorna:
+        O envio da resposta de erro
+    """
+    
+    global id
+    
+    if isinstance(refusal, ServiceUnavailable):
+        Metrics.shedRequests[refusal.problem] += 1
+    else:
+        Metrics.rateLimited += 1
+    
+    errorResponse = ErrorResponse(refusal, serverConfig, responses, types, id)
+    errorResponse.prepareResponse(serverConfig)
+    timer.mark("error")
+    
+    transfer = ResponseTransfer(clientSocket, errorResponse, address, startLine, timer, False)
+    timer.mark("format")
+    
+    id += 1
+    
+    return transfer
+
+def close_connection(seletor:selectors.BaseSelector, clientSocket:socket.socket, transfer:Optional[ResponseTransfer], serverConfig:ServerConfig) -> None:
+    """
+    Função que encerra uma conexão depois da resposta ser enviada (ou caso nenhuma requisição tenha sido lida),
+        registrando a resposta nas métricas e no log de acesso
+    
+    Recebe:
+        [BaseSelector] seletor:      O seletor do loop principal
+        [socket] clientSocket:       Socket do cliente
+        [ResponseTransfer] transfer: O envio da resposta, None caso nenhuma resposta tenha sido enviada
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Nada
+    """
+    
+    if transfer is not None:
+        record_response(transfer.address, transfer.startLine, transfer.response, transfer.sentBytes, transfer.timer)
+    
+    # TODO: Caso queira respeitar o Connection: keep-alive do cliente, não deveria remover a socket daqui
+    seletor.unregister(clientSocket)
+    if transfer is not None:
+        # Em conexões TLS, o fim da resposta precisa ser avisado antes de fechar a conexão
+        TLS.close_notify(clientSocket)
+    try:
+        clientSocket.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        # O cliente pode ter fechado a conexão durante o envio
+        pass
+    clientSocket.close()
+    Metrics.connectionsClosed += 1
+    
+    if serverConfig.configValue["verbose"]:
+        print("Requisição respondida com sucesso!\n" if transfer is not None and transfer.success else "Erro na requisição!\n")
 
 def load_json_data() -> "tuple[dict[Any, Any], dict[Any, Any]]":
     """
@@ -187,13 +335,116 @@ def load_json_data() -> "tuple[dict[Any, Any], dict[Any, Any]]":
         
     return (responseDict, contentDict)
 
+def handle_signal(signum:int, frame:Any) -> None:
+    """
+    Função que trata os sinais recebidos pelo processo do servidor
+    Apenas anota qual ação foi pedida, a ação em si é executada pelo loop principal do servidor
+        SIGTERM: para de aceitar conexões, responde as conexões abertas e encerra
+        SIGHUP:  recarrega o arquivo de configurações
+        SIGUSR2: inicia um novo processo do servidor com a mesma socket e encerra este graciosamente
+        SIGUSR1: inicia ou encerra uma sessão de profiling
+    
+    Recebe:
+        [int] signum: O número do sinal recebido
+        frame:        O frame que estava executando quando o sinal chegou (não usado)
+    
+    Retorna:
+        Nada
+    """
+    
+    pendingSignals.add(signum)
+
+def install_signal_handlers(wakeupSocket:socket.socket) -> None:
+    """
+    Função que registra os tratadores de sinais do servidor
+    O byte escrito na socket de despertar faz o select() do loop principal retornar assim que um sinal chega
+    
+    Recebe:
+        [socket] wakeupSocket: Lado de escrita do par de sockets usado para acordar o loop principal
+    
+    Retorna:
+        Nada
+    """
+    
+    signal.set_wakeup_fd(wakeupSocket.fileno(), warn_on_full_buffer=False)
+    
+    # SIGHUP, SIGUSR1 e SIGUSR2 não existem no Windows
+    for signalName in ["SIGTERM", "SIGHUP", "SIGUSR1", "SIGUSR2"]:
+        if hasattr(signal, signalName):
+            signal.signal(getattr(signal, signalName), handle_signal)
+
+def reload_config(serverConfig:ServerConfig) -> ServerConfig:
+    """
+    Função que recarrega o arquivo de configurações do servidor
+    As novas configurações são carregadas por completo antes de substituir as antigas, então uma requisição nunca
+        vê uma mistura das duas, e caso o arquivo novo seja inválido as configurações antigas continuam valendo
+    
+    Recebe:
+        [ServerConfig] serverConfig: As configurações atuais
+    
+    Retorna:
+        As novas configurações, ou as atuais caso não tenha sido possível carregar o arquivo
+    """
+    
+    try:
+        newConfig = ServerConfig(serverConfig.cfgName)
+    except (OSError, tomllib.TOMLDecodeError, SystemExit) as err:
+        # ServerConfig chama sys.exit() quando falta uma configuração crítica, o que não deve derrubar o servidor aqui
+        log.error(f"Erro ao recarregar configurações de {serverConfig.cfgName}, mantendo as atuais: {repr(err)}")
+        print("Erro ao recarregar configurações!")
+        return serverConfig
+    
+    for key in ["host", "port", "contentRoot", "listeners"]:
+        if newConfig.configValue[key] != serverConfig.configValue[key]:
+            log.warning(f"A configuração \"{key}\" só passa a valer reiniciando o servidor (SIGUSR2)")
+    
+    log.info(f"Configurações recarregadas de {serverConfig.cfgName}")
+    print("Configurações recarregadas!")
+    
+    return newConfig
+
+def reexec(listeners:Listeners.ListenerSet) -> bool:
+    """
+    Função que inicia um novo processo do servidor, passando para ele as sockets que recebem as conexões
+    Como as sockets continuam abertas durante a troca, nenhuma conexão é recusada enquanto o processo antigo encerra
+    
+    Recebe:
+        [ListenerSet] listeners: As sockets do servidor
+    
+    Retorna:
+        True caso o novo processo tenha sido iniciado, False caso contrário
+    """
+    
+    fds = tuple(listener.socket.fileno() for listener in listeners)
+    environment = dict(os.environ)
+    environment[Listeners.listenFdVariable] = listeners.inheritance()
+    
+    try:
+        child = subprocess.Popen([sys.executable] + sys.argv, env=environment, pass_fds=fds)
+    except OSError as err:
+        log.error(f"Erro ao iniciar novo processo do servidor: {repr(err)}")
+        return False
+    
+    # O novo processo passa a ser o responsável pelos arquivos das sockets Unix
+    listeners.handedOver = True
+    
+    log.info(f"Novo processo do servidor iniciado (pid {child.pid}), encerrando este graciosamente")
+    print(f"Novo processo do servidor iniciado (pid {child.pid})")
+    
+    return True
+
 def server(serverConfig:ServerConfig, port:Optional[int]=None) -> None:
     """
     Função principal do servidor HTTP
     Fica em um loop constante ouvindo por requisições HTTP válidas no localhost numa porta fornecida por argumento
         Caso não tenha recebido uma porta, ouve na porta 9999
+    Também pode escutar em várias sockets ao mesmo tempo (TCP, TLS, Unix e descritores herdados), configuradas em [[Listeners]] (ver Listeners.py)
     Responde as requisições HTTP com respostas HTTP válidas
     
+    Ao receber SIGTERM (ou SIGUSR2, depois de iniciar o novo processo), para de aceitar conexões e continua respondendo as
+        conexões já abertas até que todas sejam respondidas ou o tempo máximo (drain_timeout) seja atingido
+    Ao receber SIGHUP, recarrega o arquivo de configurações
+    
     Recebe:
         port (opcional): um int que indica a porta que o servidor deve estar escutando, caso não seja fornecido, usa a porta 9999
         
@@ -205,65 +456,221 @@ def server(serverConfig:ServerConfig, port:Optional[int]=None) -> None:
     if port is None:
         port = serverConfig.configValue["port"]
     
-    # Inicializando o servidor em uma porta TCP que recebe endereços IPv4
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as serverSocket:
+    with Listeners.open_listeners(serverConfig, port) as listeners:
         
-        # Pegando o host da configuração e a abrindo a conexão
-        host = serverConfig.configValue["host"]
-        serverSocket.bind((host, port))
-        serverSocket.listen(10) # Servidor vai aceitar no máximo 10 conexões simultâneas
-        
-        # Carregando a socket do servidor no seletor para lidar com múltiplas conexões simultâneas
-        serverSocket.setblocking(False) # socket não pode estar em modo bloqueante para isso funcionar
+        # Carregando as sockets do servidor no seletor para lidar com múltiplas conexões simultâneas
         seletor = selectors.DefaultSelector()
-        # Registrando a socket no seletor de modo que quando ela estiver disponível para ser lida poderei acessar ela
-        seletor.register(serverSocket, selectors.EVENT_READ)
+        for listener in listeners:
+            listener.socket.setblocking(False) # socket não pode estar em modo bloqueante para isso funcionar
+            # Registrando a socket no seletor de modo que quando ela estiver disponível para ser lida poderei acessar ela
+            seletor.register(listener.socket, selectors.EVENT_READ, data=listener)
+        
+        # Par de sockets usado pelos tratadores de sinais para acordar o loop principal
+        wakeupReader, wakeupWriter = socket.socketpair()
+        wakeupReader.setblocking(False)
+        wakeupWriter.setblocking(False)
+        seletor.register(wakeupReader, selectors.EVENT_READ)
+        install_signal_handlers(wakeupWriter)
         
-        log.info(f"Servidor funcinando em localhost:{port}")
-        print(f"Servidor funcinando em localhost:{port}")
+        for listener in listeners:
+            log.info(f"Servidor funcinando em {listener.name}")
+            print(f"Servidor funcinando em {listener.name}")
         
         resp, typ = load_json_data()
         
+        # Compilando as rotas registradas pelas respostas (ver ResponseHandler.py) na tabela usada pelas requisições
+        Router.init_router(serverConfig)
+        RateLimit.init_rate_limit(serverConfig)
+        
+        # Construindo o índice de conteúdo e iniciando o observador da pasta de conteúdo
+        watcher = ContentHandler.init_content(serverConfig)
+        
+        AccessLog.init_access_log(serverConfig)
+        watchdog = Watchdog.start_watchdog(serverConfig)
+        
+        # Pré-renderizando as respostas de erro, que são renderizadas novamente quando a página de erro muda
+        ResponseHandler.prerender_errors(serverConfig, resp, typ)
+        if watcher is not None:
+            watcher.subscribe(lambda changed: ResponseHandler.prerender_errors(serverConfig, resp, typ, changed))
+        
+        # Aquecendo o cache com os recursos mais populares, as conexões recebidas enquanto isso esperam na fila do socket
+        Warmup.warm_cache(serverConfig)
+        log.info("Servidor pronto para aceitar conexões")
+        print("Servidor pronto para aceitar conexões")
+        
         # Preciso usar seletores pois navegadores enviam múltiplas requisições de uma vez
         # Parece ser algo parecido com pipelining (https://developer.mozilla.org/en-US/docs/Web/HTTP/Connection_management_in_HTTP_1.x#http_pipelining)
         # Mas não necessáriamente é isso
         # De qualquer forma, essa implementação consegue lidar com o problema
         
         incomingConnections = []
+        accepting     = True # Se o servidor ainda está aceitando novas conexões
+        drainDeadline = 0.0  # Instante em que o servidor desiste de responder as conexões abertas
         
         try:
             # Loop principal do servidor
             while True:
                 # Recebendo conexões 
-                incomingConnections = seletor.select()
+                # Enquanto estiver encerrando, acordo periodicamente para verificar o tempo máximo de espera
+                # Durante uma sessão de profiling, acordo no fim da sessão mesmo que nenhuma conexão chegue
+                timeout = None if accepting else 0.1
+                profilerTimeout = Profiler.timeout()
+                if profilerTimeout is not None:
+                    timeout = profilerTimeout if timeout is None else min(timeout, profilerTimeout)
+                # Acordo também quando a conexão mais antiga esperando a requisição passar do tempo máximo, para fechar ela
+                readTimeout = Admission.next_expiration(serverConfig, time.monotonic())
+                if readTimeout is not None:
+                    timeout = readTimeout if timeout is None else min(timeout, readTimeout)
+                Admission.end_iteration()
+                Watchdog.busySince  = 0.0
+                incomingConnections = seletor.select(timeout)
+                Watchdog.busySince  = time.monotonic()
+                Watchdog.requestId, Watchdog.requestLine = -1, "-"
+                
+                writable: list[ResponseTransfer] = [] # Envios que continuam nessa iteração, depois das novas requisições
+                quantum = serverConfig.configValue["transferQuantum"]
                 
                 for readySocket, _ in incomingConnections:
                     
                     # sanity
                     assert isinstance(readySocket.fileobj, socket.socket)
                     
-                    if readySocket.fileobj is serverSocket:
+                    if readySocket.fileobj is wakeupReader:
+                        # Um sinal chegou, só preciso esvaziar a socket, o sinal é tratado depois desse for
+                        try:
+                            wakeupReader.recv(512)
+                        except BlockingIOError:
+                            pass
+                    
+                    elif isinstance(readySocket.data, Listeners.Listener):
                         # Quando a socket pronta para ser lida é a socket do servidor, aceito a conexão que está chegando e 
                         # registro essa conexão na fila de conexões para ser processada
                         
-                        clientSocket, address = readySocket.fileobj.accept()
+                        try:
+                            clientSocket, address = readySocket.fileobj.accept()
+                        except BlockingIOError:
+                            # Outro processo do servidor (durante um reinício) aceitou essa conexão antes
+                            continue
                         clientSocket.setblocking(False)
-                        seletor.register(clientSocket, selectors.EVENT_READ)
+                        Metrics.connectionsAccepted += 1
+                        
+                        if readySocket.data.context is not None:
+                            # Conexão HTTPS, o handshake é feito sem bloquear antes da requisição ser lida
+                            handshake = TLS.wrap(clientSocket, readySocket.data.context, address)
+                            seletor.register(handshake.clientSocket, selectors.EVENT_READ, data=handshake)
+                            Admission.accepted(handshake.clientSocket, handshake)
+                        else:
+                            pendingRequest = Admission.PendingRequest(address, time.monotonic())
+                            seletor.register(clientSocket, selectors.EVENT_READ, data=pendingRequest)
+                            Admission.accepted(clientSocket, pendingRequest)
                         
-                        print(f"Conexão vinda de {address}")
+                        if serverConfig.configValue["verbose"]:
+                            print(f"Conexão vinda de {address}")
+                    
+                    elif isinstance(readySocket.data, TLS.Handshake):
+                        # Continuando o handshake de uma conexão HTTPS de onde ele parou
+                        handshake = readySocket.data
+                        waitFor   = handshake.step()
+                        
+                        if waitFor is None:
+                            Metrics.tlsHandshakeFailures += 1
+                            Admission.answered(handshake.clientSocket)
+                            close_connection(seletor, handshake.clientSocket, None, serverConfig)
+                        elif waitFor == 0:
+                            # Handshake terminado, a conexão passa a esperar a requisição como qualquer outra
+                            # O tempo máximo para enviar a requisição continua contando desde que a conexão foi aceita
+                            Metrics.tlsHandshakes["resumed" if handshake.resumed else "full"] += 1
+                            pendingRequest = Admission.PendingRequest(handshake.address, handshake.accepted)
+                            seletor.modify(handshake.clientSocket, selectors.EVENT_READ, data=pendingRequest)
+                            Admission.accepted(handshake.clientSocket, pendingRequest)
+                        else:
+                            seletor.modify(handshake.clientSocket, waitFor, data=handshake)
+                    
+                    elif isinstance(readySocket.data, ResponseTransfer):
+                        # A socket de um cliente cuja resposta não foi enviada por completo está disponível para escrita
+                        # O envio continua depois desse for, junto com os outros envios em andamento
+                        writable.append(readySocket.data)
                     
                     else:
                         # Caso não seja a socket do servidor, processo a conexão que chegou
-                        success = handle_request(readySocket.fileobj, serverConfig, resp, typ)
-                        # TODO: Caso queira respeitar o Connection: keep-alive do cliente, não deveria remover a socket daqui
-                        seletor.unregister(readySocket.fileobj)
-                        readySocket.fileobj.shutdown(socket.SHUT_RDWR)
-                        readySocket.fileobj.close()
-                                
-                        if success:
-                            print("Requisição respondida com sucesso!\n")
+                        # Os limites de admissão e do cliente são verificados antes de ler a requisição, acima deles a resposta é 503 ou 429
+                        address = readySocket.data.address
+                        shed    = Admission.overload_reason(serverConfig)
+                        refusal = RateLimit.check(address) if shed is None else \
+                                  ServiceUnavailable("Servidor Sobrecarregado!", shed, serverConfig.configValue["admissionRetryAfter"])
+                        Admission.answered(readySocket.fileobj)
+                        
+                        Metrics.connectionsActive += 1
+                        try:
+                            transfer = handle_request(readySocket.fileobj, serverConfig, resp, typ, address, refusal)
+                        except ssl.SSLError as err:
+                            # Registro TLS incompleto ou inválido, a conexão é fechada como quando nenhuma requisição completa é lida
+                            log.info("Erro TLS ao ler a requisição de %s: %r", address, err)
+                            transfer = None
+                        Metrics.connectionsActive -= 1
+                        
+                        if transfer is not None and not transfer.send(quantum):
+                            # A resposta não coube no buffer da socket (ou no quantum), o resto é enviado quando ela estiver disponível para escrita
+                            seletor.modify(readySocket.fileobj, selectors.EVENT_WRITE, data=transfer)
                         else:
-                            print("Erro na requisição!\n")
+                            close_connection(seletor, readySocket.fileobj, transfer, serverConfig)
+                
+                # Fechando as conexões que não enviaram a requisição (ou não terminaram o handshake TLS) a tempo
+                for expiredSocket in Admission.expired(serverConfig, time.monotonic()):
+                    Metrics.readTimeouts += 1
+                    log.debug("Conexão fechada por não enviar a requisição a tempo")
+                    close_connection(seletor, expiredSocket, None, serverConfig)
+                
+                # Continuando os envios em rodízio, no máximo um quantum por conexão em cada iteração
+                # Respostas inteiras na memória e com menos bytes pendentes primeiro, para que downloads grandes não atrasem as respostas pequenas
+                writable.sort(key=ResponseTransfer.send_priority)
+                for transfer in writable:
+                    if transfer.send(quantum):
+                        close_connection(seletor, transfer.clientSocket, transfer, serverConfig)
+                
+                # Tratando os sinais recebidos
+                if hasattr(signal, "SIGHUP") and signal.SIGHUP in pendingSignals:
+                    pendingSignals.discard(signal.SIGHUP)
+                    serverConfig = reload_config(serverConfig)
+                    # Caminhos e páginas internas habilitadas podem ter mudado
+                    Router.init_router(serverConfig)
+                    RateLimit.init_rate_limit(serverConfig)
+                    # O nome do servidor e a versão do HTTP fazem parte das respostas pré-renderizadas
+                    ResponseHandler.prerender_errors(serverConfig, resp, typ)
+                
+                if hasattr(signal, "SIGUSR1") and signal.SIGUSR1 in pendingSignals:
+                    pendingSignals.discard(signal.SIGUSR1)
+                    Profiler.toggle(serverConfig)
+                
+                # Iniciando a sessão de profiling pedida ou encerrando a sessão em andamento
+                if Profiler.session is not None or Profiler.pending is not None:
+                    Profiler.poll(serverConfig)
+                
+                if hasattr(signal, "SIGUSR2") and signal.SIGUSR2 in pendingSignals:
+                    pendingSignals.discard(signal.SIGUSR2)
+                    if accepting and reexec(listeners):
+                        pendingSignals.add(signal.SIGTERM)
+                
+                if signal.SIGTERM in pendingSignals and accepting:
+                    # Paro de aceitar novas conexões, mas continuo respondendo as que já foram aceitas
+                    pendingSignals.discard(signal.SIGTERM)
+                    accepting     = False
+                    drainDeadline = time.monotonic() + serverConfig.configValue["drainTimeout"]
+                    for listener in listeners:
+                        seletor.unregister(listener.socket)
+                    
+                    log.warning("Encerrando o servidor graciosamente, respondendo as conexões abertas")
+                    print("\nEncerrando o servidor graciosamente, respondendo as conexões abertas")
+                
+                if not accepting:
+                    # As únicas sockets no seletor são as de clientes e a de despertar
+                    openConnections = len(seletor.get_map()) - 1
+                    if openConnections == 0:
+                        log.info("Todas as conexões foram respondidas, servidor encerrado")
+                        break
+                    if time.monotonic() > drainDeadline:
+                        log.warning(f"Tempo máximo de encerramento atingido, fechando {openConnections} conexões abertas")
+                        break
         except (KeyboardInterrupt, Exception) as err: 
             # Caso ocorra qualquer excessão que não foi lidada anteriormente, fecho todas as conexões
             # Apenas "except Exception" não captura exceções de KeyboardInterrupt, pois elas herdam da classe Exception
@@ -274,18 +681,33 @@ def server(serverConfig:ServerConfig, port:Optional[int]=None) -> None:
                 log.critical("Exceção inesperada! Fechando todas as conexões abertas.")
                 log.critical(repr(err))
                 print("\nExceção inesperada! Fechando todas as conexões abertas.")
-            
-            for readySocket, _ in incomingConnections:
+        finally:
+            # Fecho todas as conexões ainda registradas no seletor, não apenas as do último select()
+            for registered in list(seletor.get_map().values()):
                 # sanity
-                assert isinstance(readySocket.fileobj, socket.socket)
+                assert isinstance(registered.fileobj, socket.socket)
                 
-                try:                
-                    readySocket.fileobj.shutdown(socket.SHUT_RDWR)
-                    readySocket.fileobj.close()
+                if isinstance(registered.data, Listeners.Listener):
+                    continue
+                
+                try:
+                    registered.fileobj.shutdown(socket.SHUT_RDWR)
                 except OSError:
                     # As vezes acontece de tentar fechar uma socket já fechada, nesse caso só ignoro a socket e vida que segue
                     pass
+                registered.fileobj.close()
+            
+            seletor.close()
+            wakeupWriter.close()
+            signal.set_wakeup_fd(-1)
+            
+            if watcher is not None:
+                watcher.stop()
+            
+            AccessLog.close_access_log()
+            Profiler.stop(serverConfig)
+            
+            if watchdog is not None:
+                watchdog.stop()
         
     return
-    
-
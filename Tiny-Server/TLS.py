@@ -0,0 +1,155 @@
+import logging                         # Biblioteca de criação de logs
+import selectors                       # Eventos que o handshake espera para continuar
+import socket                          # Socket do cliente
+import ssl                             # Contextos e sockets TLS
+import time                            # Duração dos handshakes
+from typing import Any, Optional       # Anotações de tipo
+
+"""
+TLS.py
+Módulo que permite ao servidor receber conexões HTTPS diretamente, sem um terminador TLS (proxy reverso) na frente dele
+Um listener do tipo tls (ver Listeners.py) é uma socket TCP cujas conexões aceitas são envolvidas em uma socket TLS
+
+O contexto TLS (certificado, chave e configurações) é criado uma única vez na inicialização e guardado em contexts,
+    compartilhado por todos os listeners com o mesmo certificado e chave
+Como o contexto é o mesmo para todas as conexões, o cache de sessões e a chave dos session tickets também são,
+    então um cliente que volta retoma a sessão anterior com um handshake abreviado, sem a troca de chaves e sem o certificado
+A chave dos tickets é gerada pelo OpenSSL ao criar o contexto, então os tickets emitidos antes de um reinício (SIGUSR2)
+    não são aceitos pelo novo processo, e esses clientes fazem um handshake completo uma vez
+
+O handshake é feito sem bloquear, dentro do loop principal: cada passo (ver Handshake.step) avança o que os dados
+    disponíveis na socket permitem e retorna o evento que ele espera (leitura ou escrita), então um cliente lento
+    no handshake não atrasa os outros clientes
+Depois do handshake, a requisição é lida e a resposta enviada como em qualquer outra conexão
+"""
+
+log = logging.getLogger("Main.Server.TLS")
+
+# Contextos TLS criados, (certificado, chave) -> contexto
+contexts: "dict[tuple[str, str], ssl.SSLContext]" = dict()
+
+# Versões mínimas do TLS aceitas na configuração min_version dos listeners
+versions = {"TLSv1.2": ssl.TLSVersion.TLSv1_2, "TLSv1.3": ssl.TLSVersion.TLSv1_3}
+
+def server_context(spec:"dict[str, Any]") -> ssl.SSLContext:
+    """
+    Função que retorna o contexto TLS de um listener, criando ele caso seja o primeiro listener com esse certificado e chave
+    
+    Recebe:
+        [dict] spec: A configuração do listener, com:
+            cert:            Arquivo PEM do certificado (com a cadeia de certificados intermediários, caso exista)
+            key:             Arquivo PEM da chave privada, por padrão o próprio arquivo do certificado
+            password:        Senha da chave privada (opcional)
+            min_version:     Versão mínima do TLS aceita, "TLSv1.2" (padrão) ou "TLSv1.3"
+            ciphers:         Cifras aceitas no TLS 1.2, no formato do OpenSSL (opcional, por padrão as do módulo ssl)
+            session_tickets: Número de tickets de sessão enviados a cada cliente depois do handshake do TLS 1.3 (padrão 2),
+                             0 para desabilitar os tickets, nesse caso apenas o cache de sessões do servidor permite retomar sessões
+    
+    Retorna:
+        O contexto TLS
+    """
+    
+    cert = spec["cert"]
+    key  = spec.get("key", cert)
+    
+    context = contexts.get((cert, key))
+    if context is not None:
+        return context
+    
+    # Contexto de servidor com as configurações seguras do módulo ssl (sem SSLv3, TLS 1.0 e 1.1, nem compressão)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.minimum_version = versions[spec.get("min_version", "TLSv1.2")]
+    if "ciphers" in spec:
+        context.set_ciphers(spec["ciphers"])
+    context.load_cert_chain(cert, key, spec.get("password"))
+    
+    # Retomada de sessão: tickets (TLS 1.2 e 1.3) e o cache de sessões do servidor, que o OpenSSL mantém por contexto
+    tickets = spec.get("session_tickets", 2)
+    if tickets > 0:
+        context.options &= ~ssl.OP_NO_TICKET
+    else:
+        context.options |= ssl.OP_NO_TICKET
+    context.num_tickets = tickets
+    
+    contexts[(cert, key)] = context
+    log.info("Contexto TLS criado para o certificado %s", cert)
+    
+    return context
+
+class Handshake():
+    """
+    Classe que representa um handshake TLS em andamento no loop principal
+    
+    Atributos da Classe:
+        [SSLSocket] clientSocket: Socket TLS do cliente, não bloqueante
+        [Any]       address:      Endereço do cliente, passado adiante quando o handshake termina
+        [float]     accepted:     Instante em que a conexão foi aceita (ver Admission.expired)
+        [bool]      resumed:      Se o cliente retomou uma sessão anterior, válido depois do handshake terminar
+    """
+    
+    __slots__ = ("clientSocket", "address", "accepted", "resumed")
+    
+    def __init__(self, clientSocket:ssl.SSLSocket, address:Any) -> None:
+        self.clientSocket = clientSocket
+        self.address      = address
+        self.accepted     = time.monotonic()
+        self.resumed      = False
+    
+    def step(self) -> Optional[int]:
+        """
+        Método que avança o handshake até ele terminar ou até precisar de dados que ainda não chegaram
+        
+        Retorna:
+            O evento do seletor (EVENT_READ ou EVENT_WRITE) que o handshake espera para continuar,
+            0 caso o handshake tenha terminado, ou None caso ele tenha falhado (a conexão deve ser fechada)
+        """
+        
+        try:
+            self.clientSocket.do_handshake()
+        except ssl.SSLWantReadError:
+            return selectors.EVENT_READ
+        except ssl.SSLWantWriteError:
+            return selectors.EVENT_WRITE
+        except (ssl.SSLError, OSError) as err:
+            # Clientes que desistem, não confiam no certificado ou não falam TLS (ex: HTTP na porta HTTPS)
+            log.info("Handshake TLS com %s falhou: %r", self.address, err)
+            return None
+        
+        self.resumed = self.clientSocket.session_reused
+        log.debug("Handshake TLS com %s terminou em %.3fms (%s, sessão %s)", self.address, (time.monotonic() - self.accepted) * 1000,
+                  self.clientSocket.version(), "retomada" if self.resumed else "nova")
+        
+        return 0
+
+def wrap(clientSocket:socket.socket, context:ssl.SSLContext, address:Any) -> Handshake:
+    """
+    Função que envolve a socket de uma conexão aceita em uma socket TLS, sem iniciar o handshake
+    
+    Recebe:
+        [socket] clientSocket:   Socket do cliente, já não bloqueante
+        [SSLContext] context:    Contexto TLS do listener que aceitou a conexão
+        [Any] address:           Endereço do cliente
+    
+    Retorna:
+        O handshake, que deve ser avançado pelo loop principal quando a socket estiver pronta
+    """
+    
+    tlsSocket = context.wrap_socket(clientSocket, server_side=True, do_handshake_on_connect=False)
+    
+    return Handshake(tlsSocket, address)
+
+def close_notify(clientSocket:socket.socket) -> None:
+    """
+    Função que avisa o cliente que a conexão TLS vai ser fechada (alerta close_notify), sem esperar a resposta do cliente
+    Como as respostas terminam quando a conexão é fechada, sem o aviso o cliente não consegue diferenciar
+        o fim da resposta de uma conexão interrompida
+    """
+    
+    if not isinstance(clientSocket, ssl.SSLSocket):
+        return
+    
+    try:
+        clientSocket.unwrap()
+    except (ssl.SSLError, OSError):
+        # O aviso já foi enviado, o erro é a falta da resposta do cliente (a socket não é bloqueante), ou o cliente já fechou a conexão
+        pass
@@ -0,0 +1,120 @@
+import logging                         # Biblioteca de criação de logs
+import Exceptions                      # Módulo de Exceções específicas do Servidor
+from urllib.parse import unquote       # Decodificação dos caracteres escapados com %
+
+"""
+Target.py
+Módulo que interpreta o alvo de uma requisição (o caminho na primeira linha, ex: /about/index.html?utm_source=x)
+O alvo é separado em caminho e query, o caminho é decodificado (%XX) e normalizado (segmentos vazios, "." e ".." são resolvidos)
+    e então convertido no caminho do arquivo correspondente dentro da pasta de conteúdo
+
+O caminho do arquivo é a chave canônica do recurso, usada pelo índice, pelo cache de conteúdo e pelo cache de caminhos inexistentes,
+    então /about/, /about/index.html, /about/./index.html e /about/index.html?utm_source=x são o mesmo recurso
+    e compartilham a mesma entrada nos caches
+Um caminho que sai da pasta de conteúdo (ex: /../config.toml, /%2e%2e/config.toml) é recusado com 403
+
+Além do formato de origem (/caminho?query), aceita o formato absoluto (http://host/caminho?query), usado por proxies
+"""
+
+log = logging.getLogger("Main.Server.Request.Target")
+
+# Nome do arquivo enviado quando o caminho é uma pasta
+indexFile = "index.html"
+
+def split_target(target:str) -> "tuple[str, str]":
+    """
+    Função que separa o alvo da requisição em caminho e query, descartando o fragmento (#...) caso exista
+    Alvos no formato absoluto tem o esquema e o host removidos
+    
+    Recebe:
+        [str] target: O alvo como veio na primeira linha da requisição
+    
+    Retorna:
+        Uma tupla (caminho ainda codificado, query sem o "?")
+    """
+    
+    if target.startswith(("http://", "https://")):
+        # O host termina no primeiro "/", "?" ou "#", sem caminho (ex: http://host?x) o caminho é "/" e a query é mantida
+        authority = target.index("//") + 2
+        end = min((index for index in (target.find(char, authority) for char in "/?#") if index != -1), default=len(target))
+        target = target[end:] if target.startswith("/", end) else "/" + target[end:]
+    
+    if not target.startswith("/"):
+        log.error("Erro, alvo da requisição inválido:%s", target)
+        raise Exceptions.BadRequest("Alvo da Requisição Inválido!", target)
+    
+    target = target.partition("#")[0]
+    path, _, query = target.partition("?")
+    
+    return (path, query)
+
+def normalize_path(path:str) -> str:
+    """
+    Função que decodifica e normaliza o caminho de uma requisição (RFC 3986, seção 5.2.4)
+    A barra no final do caminho, que indica uma pasta, é mantida
+    
+    Recebe:
+        [str] path: O caminho ainda codificado, começando com "/"
+    
+    Retorna:
+        O caminho decodificado e normalizado
+    """
+    
+    # Caminho mais comum, sem nada para decodificar ou normalizar
+    if "%" not in path and "/." not in path and "//" not in path:
+        return path
+    
+    try:
+        decoded = unquote(path, errors="strict")
+    except UnicodeDecodeError:
+        log.error("Erro, caminho com caracteres inválidos:%s", path)
+        raise Exceptions.BadRequest("Caminho com Caracteres Inválidos!", path)
+    
+    if "\x00" in decoded:
+        log.error("Erro, caminho com caracteres inválidos:%s", path)
+        raise Exceptions.BadRequest("Caminho com Caracteres Inválidos!", path)
+    
+    segments: list[str] = []
+    for segment in decoded.split("/"):
+        if segment == "" or segment == ".":
+            continue
+        if segment == "..":
+            if not segments:
+                # O caminho sairia da pasta de conteúdo
+                log.error("Erro, caminho fora da pasta de conteúdo:%s", path)
+                raise Exceptions.Forbidden("Recurso Proibido de ser Acessado!", path)
+            segments.pop()
+            continue
+        segments.append(segment)
+    
+    normalized = "/" + "/".join(segments)
+    if segments and decoded.endswith(("/", "/.", "/..")):
+        normalized += "/"
+    
+    return normalized
+
+def resource_key(path:str, contentRoot:str) -> str:
+    """
+    Função que converte um caminho já normalizado na chave canônica do recurso, o caminho do arquivo dentro da pasta de conteúdo
+    Pastas são convertidas no arquivo de índice dentro delas
+    """
+    
+    return contentRoot + path + indexFile if path.endswith("/") else contentRoot + path
+
+def parse_target(target:str, contentRoot:str) -> "tuple[str, str, str]":
+    """
+    Função que interpreta o alvo de uma requisição
+    Levanta BadRequest caso o alvo seja inválido e Forbidden caso o caminho saia da pasta de conteúdo
+    
+    Recebe:
+        [str] target:      O alvo como veio na primeira linha da requisição
+        [str] contentRoot: A pasta raiz de conteúdo
+    
+    Retorna:
+        Uma tupla (caminho normalizado, query, chave canônica do recurso)
+    """
+    
+    path, query = split_target(target)
+    path = normalize_path(path)
+    
+    return (path, query, resource_key(path, contentRoot))
@@ -0,0 +1,123 @@
+import logging                # Biblioteca de criação de logs
+import socket                 # Socket do cliente
+import ssl                    # Buffer cheio em conexões TLS
+from typing import Any, Iterator, Optional # Anotações de tipo
+import Metrics                # Duração das fases da requisição
+
+"""
+Transfer.py
+Módulo que envia as respostas para os clientes sem bloquear o loop principal do servidor
+As sockets dos clientes não são bloqueantes, então cada envio escreve apenas o que cabe no buffer da socket
+Quando o buffer enche, o envio para e o loop principal espera a socket ficar disponível para escrita (EVENT_WRITE)
+    para continuar de onde parou, enquanto atende as outras conexões
+
+As partes da resposta vêm do método streamResponse das respostas, então corpos gerados enquanto são enviados
+    (ex: arquivos grandes comprimidos em partes) nunca ficam inteiros na memória
+
+Para que downloads grandes não monopolizem o loop principal, cada envio escreve no máximo um quantum de bytes ([Transfer] quantum_bytes)
+A cada iteração do loop, as conexões prontas para escrita são atendidas em rodízio, começando pelas respostas que já estão
+    inteiras na memória e pelas que tem menos bytes pendentes (ver send_priority), então HTML e CSS não esperam atrás de PDFs
+"""
+
+log = logging.getLogger("Main.Server.Transfer")
+
+class ResponseTransfer():
+    """
+    Classe que representa o envio de uma resposta para um cliente
+    
+    Atributos da Classe:
+        [socket] clientSocket: Socket do cliente
+        [Any] response:        A resposta sendo enviada (Response ou ErrorResponse)
+        [Any] address:         Endereço do cliente, usado no log de acesso
+        [str] startLine:       Primeira linha da requisição, usada no log de acesso
+        [PhaseTimer] timer:    Duração das fases do processamento da requisição
+        [int] sentBytes:       Número de bytes já enviados
+        [bool] success:        Se a requisição foi aceita (resposta 1xx, 2xx ou 3xx)
+        [bool] streaming:      Se o corpo da resposta é gerado enquanto é enviado (ex: arquivos grandes)
+    """
+    
+    __slots__ = ("clientSocket", "response", "address", "startLine", "timer", "success", "sentBytes", "streaming", "chunks", "pending")
+    
+    def __init__(self, clientSocket:socket.socket, response:Any, address:Any, startLine:str, timer:Metrics.PhaseTimer, success:bool) -> None:
+        self.clientSocket = clientSocket
+        self.response     = response
+        self.address      = address
+        self.startLine    = startLine
+        self.timer        = timer
+        self.success      = success
+        self.sentBytes    = 0
+        # Respostas de erro e respostas com o corpo em bytes são enviadas em uma parte só, que já está inteira na memória
+        self.streaming    = not isinstance(getattr(response, "body", None), (bytes, type(None)))
+        
+        # A primeira parte (os headers, ou a resposta inteira) é gerada aqui, para que erros ao formatar a resposta
+        #   aconteçam durante o processamento da requisição e ainda possam ser respondidos com uma resposta de erro
+        self.chunks: Iterator[bytes] = response.streamResponse()
+        self.pending: Optional[memoryview] = memoryview(next(self.chunks)) # Parte atual que ainda não foi enviada por completo
+    
+    def send_priority(self) -> "tuple[bool, int]":
+        """
+        Método que retorna a prioridade do envio no rodízio, menores primeiro
+        Respostas inteiras na memória vem antes das geradas enquanto são enviadas, e entre elas as com menos bytes pendentes
+        """
+        
+        return (self.streaming, len(self.pending) if self.pending is not None else 0)
+    
+    def send(self, quantum:int=0) -> bool:
+        """
+        Método que envia a resposta sem bloquear, até a socket encher ou até o quantum ser atingido
+        
+        Recebe:
+            [int] quantum: Número máximo de bytes enviados nessa chamada, 0 para enviar o máximo possível
+        
+        Retorna:
+            True caso o envio tenha terminado (com sucesso ou não), False caso o envio deva continuar depois
+                (quando a socket estiver disponível para escrita)
+        """
+        
+        budget = quantum if quantum > 0 else -1
+        while True:
+            if not self.pending:
+                try:
+                    self.pending = memoryview(next(self.chunks))
+                except StopIteration:
+                    log.debug("Resposta enviada")
+                    return self.finish()
+                except Exception as err:
+                    # Erro ao gerar o corpo depois dos headers serem enviados, o cliente vai perceber a resposta incompleta
+                    log.error("Erro ao gerar o corpo da resposta %s: %r", self.response.id, err)
+                    return self.finish()
+                continue
+            
+            if budget == 0:
+                # Quantum atingido, o resto é enviado na próxima vez que a conexão for atendida no rodízio
+                return False
+            
+            view = self.pending if budget < 0 else self.pending[:budget]
+            try:
+                sent = self.clientSocket.send(view)
+            except (BlockingIOError, ssl.SSLWantWriteError, ssl.SSLWantReadError):
+                # Em conexões TLS, o buffer cheio aparece como SSLWantWriteError (ou SSLWantReadError durante uma renegociação)
+                return False
+            except OSError as err:
+                log.warning("Erro ao enviar resposta %s: %r", self.response.id, err)
+                return self.finish()
+            
+            self.sentBytes += sent
+            self.pending    = self.pending[sent:]
+            if budget > 0:
+                budget -= sent
+            if sent < len(view):
+                # Envio parcial, o buffer da socket está cheio
+                return False
+    
+    def finish(self) -> bool:
+        """
+        Método que encerra o envio, liberando o gerador das partes da resposta (e os arquivos abertos por ele)
+        """
+        
+        self.pending = None
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            close()
+        self.timer.mark("send")
+        return True
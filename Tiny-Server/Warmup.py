@@ -0,0 +1,227 @@
+import logging                         # Biblioteca de criação de logs
+import os                              # Arquivos da pasta de conteúdo
+import time                            # Tempo máximo do aquecimento
+from collections import Counter        # Popularidade dos recursos no log de acesso
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED # Carregamento paralelo
+import AccessLog                       # Campos do log de acesso
+import ContentHandler                  # Cache de conteúdo
+import Target                          # Chave canônica dos recursos
+from typing import Optional            # Anotações de tipo
+from Configuration import ServerConfig # Configurações do Servidor
+from Exceptions import HTTPException   # Caminhos inválidos
+
+"""
+Warmup.py
+Módulo que aquece o cache de conteúdo quando o servidor inicia, antes de começar a aceitar conexões
+Sem o aquecimento, os primeiros clientes depois de um reinício pagam o custo de ler (e comprimir) cada recurso popular
+
+Os recursos aquecidos vêm de uma das fontes (configuração [Warmup] source):
+    "access_log": os recursos mais requisitados (com resposta 200) no log de acesso do servidor
+    "file":       um arquivo de popularidade, com um caminho por linha, opcionalmente seguido do número de acessos
+    "size":       todos os arquivos da pasta de conteúdo menores que [Warmup] max_file_bytes, dos menores para os maiores
+Em todos os casos, apenas os primeiros [Warmup] max_entries recursos menores que [Warmup] max_file_bytes são carregados
+
+Os recursos são carregados em paralelo por várias threads (a compressão com zlib libera o GIL) dentro de um tempo máximo,
+    depois dele os recursos que ainda não começaram a ser carregados são ignorados e o servidor começa a aceitar conexões
+Um carregamento já em andamento não pode ser interrompido, então o servidor espera ele terminar antes de aceitar conexões,
+    o que pode passar do tempo máximo em até o tempo de carregar (e comprimir) um arquivo de max_file_bytes por thread
+"""
+
+log = logging.getLogger("Main.Server.Warmup")
+
+def resource_path(path:str, serverConfig:ServerConfig) -> Optional[str]:
+    """
+    Função que converte um caminho requisitado (ex: /about/) no caminho do arquivo correspondente na pasta de conteúdo
+    É a mesma chave usada pelas requisições (ver Target.py), então variações do mesmo caminho (query, %XX, "./") são um recurso só
+    Retorna None caso o caminho seja inválido (ex: sai da pasta de conteúdo)
+    """
+    
+    try:
+        return Target.parse_target(path, serverConfig.configValue["contentRoot"])[2]
+    except HTTPException:
+        return None
+
+def from_access_log(serverConfig:ServerConfig) -> "list[str]":
+    """
+    Função que ordena os recursos pelo número de requisições GET respondidas com 200 no log de acesso
+    O log guarda os caminhos como foram requisitados, então as requisições são contadas pela chave canônica do recurso
+    """
+    
+    pathField   = AccessLog.accessLogFields.index("path")
+    statusField = AccessLog.accessLogFields.index("status")
+    methodField = AccessLog.accessLogFields.index("method")
+    
+    popularity: Counter[str] = Counter()
+    with open(serverConfig.configValue["accessLogFile"], encoding="utf-8", errors="replace") as fp:
+        for line in fp:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) == len(AccessLog.accessLogFields) and fields[statusField] == "200" and fields[methodField] == "GET":
+                popularity[fields[pathField]] += 1
+    
+    resources: Counter[str] = Counter()
+    for path, count in popularity.items():
+        key = resource_path(path, serverConfig)
+        if key is not None:
+            resources[key] += count
+    
+    return [key for key, _ in resources.most_common()]
+
+def from_popularity_file(serverConfig:ServerConfig) -> "list[str]":
+    """
+    Função que lê o arquivo de popularidade, cada linha tem um caminho e opcionalmente o número de acessos dele
+    Sem número de acessos, a ordem do arquivo é mantida
+    """
+    
+    entries = []
+    with open(serverConfig.configValue["warmupFile"], encoding="utf-8") as fp:
+        for position, line in enumerate(fp):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            count = int(fields[1]) if len(fields) > 1 and fields[1].isdigit() else 0
+            entries.append((-count, position, fields[0]))
+    
+    keys = [resource_path(path, serverConfig) for _, _, path in sorted(entries)]
+    return [key for key in keys if key is not None]
+
+def from_file_sizes(serverConfig:ServerConfig) -> "list[str]":
+    """
+    Função que lista os arquivos da pasta de conteúdo menores que o tamanho máximo, dos menores para os maiores
+    """
+    
+    maxBytes = serverConfig.configValue["warmupMaxFileBytes"]
+    
+    files = []
+    for directory, _, fileNames in os.walk(serverConfig.configValue["contentRoot"]):
+        for fileName in fileNames:
+            path = os.path.join(directory, fileName)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if size <= maxBytes:
+                files.append((size, path))
+    
+    return [path for _, path in sorted(files)]
+
+def file_size(path:str) -> Optional[int]:
+    """
+    Função que retorna o tamanho de um arquivo da pasta de conteúdo, do índice caso ele exista
+    Retorna None caso o arquivo não exista
+    """
+    
+    if ContentHandler.contentIndex is not None:
+        return ContentHandler.contentIndex.size(path)
+    
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+sources = {"access_log": from_access_log, "file": from_popularity_file, "size": from_file_sizes}
+
+def warm_resource(path:str, useSidecars:bool) -> int:
+    """
+    Função que carrega no cache as variantes de um recurso que são enviadas aos clientes
+    
+    Retorna:
+        O número de bytes carregados
+    """
+    
+    loaded = len(ContentHandler.get_file_contents(path, True, useSidecars))
+    # Arquivos texto também são enviados sem compressão para clientes que não aceitam gzip
+    if ContentHandler.isTextFile(path) and useSidecars:
+        loaded += len(ContentHandler.get_file_contents(path, False, useSidecars))
+    return loaded
+
+def warm_cache(serverConfig:ServerConfig) -> None:
+    """
+    Função que aquece o cache de conteúdo, caso o aquecimento esteja habilitado nas configurações
+    Deve ser chamada depois de ContentHandler.init_content e antes do loop principal começar a aceitar conexões
+    Ao atingir o tempo máximo, espera os carregamentos que já estão em andamento terminarem (ver o início do módulo)
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        Nada
+    """
+    
+    if not serverConfig.configValue["warmupEnabled"]:
+        return
+    
+    if ContentHandler.contentCache is None:
+        log.warning("Cache de conteúdo desabilitado, o aquecimento só vai carregar os arquivos no cache do sistema")
+    
+    source = serverConfig.configValue["warmupSource"]
+    if source not in sources:
+        log.error("Fonte de aquecimento desconhecida: %s", source)
+        return
+    
+    try:
+        candidates = sources[source](serverConfig)
+    except (OSError, ValueError) as err:
+        log.error("Erro ao ler a lista de recursos para o aquecimento: %r", err)
+        print("Erro ao ler a lista de recursos para o aquecimento, o servidor vai iniciar com o cache frio")
+        return
+    
+    # Apenas arquivos que existem e que o servidor enviaria, sem repetições
+    # Arquivos enviados em partes não passam pelo cache, então não são aquecidos
+    # Arquivos maiores que max_file_bytes também não, independente da fonte, o que limita a duração de cada carregamento
+    maxBytes = serverConfig.configValue["warmupMaxFileBytes"]
+    allowed  = []
+    for path in dict.fromkeys(candidates):
+        if not path.endswith(serverConfig.allowedFileRule) or path.endswith(serverConfig.forbiddenFileRule):
+            continue
+        size = file_size(path)
+        if size is not None and size <= maxBytes and ContentHandler.resource_exists(path) and not ContentHandler.is_streamed(path):
+            allowed.append(path)
+    resources = allowed[:serverConfig.configValue["warmupMaxEntries"]]
+    if not resources:
+        log.info("Nenhum recurso para aquecer")
+        return
+    
+    useSidecars = serverConfig.configValue["useSidecars"]
+    budget      = serverConfig.configValue["warmupTimeBudget"]
+    start       = time.monotonic()
+    deadline    = start + budget
+    
+    print(f"Aquecendo o cache com {len(resources)} recursos (fonte: {source})")
+    
+    loaded      = 0
+    loadedBytes = 0
+    lastReport  = start
+    
+    executor = ThreadPoolExecutor(max_workers=serverConfig.configValue["warmupThreads"], thread_name_prefix="Warmup")
+    pending  = {executor.submit(warm_resource, path, useSidecars): path for path in resources}
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    loadedBytes += future.result()
+                    loaded += 1
+                except OSError as err:
+                    log.warning("Erro ao aquecer %s: %r", path, err)
+            
+            now = time.monotonic()
+            if now - lastReport >= 0.5:
+                lastReport = now
+                print(f"\tAquecimento: {loaded}/{len(resources)} recursos, {loadedBytes / 1024:.0f} KiB")
+    finally:
+        # Recursos que não começaram a ser carregados dentro do tempo máximo são descartados,
+        # os que já estão sendo carregados não podem ser interrompidos, então a inicialização espera eles terminarem
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    elapsed = time.monotonic() - start
+    if pending:
+        log.warning("Tempo máximo de aquecimento atingido, %d recursos não foram carregados", len(pending))
+    log.info("Cache aquecido com %d recursos (%d bytes) em %.2fs", loaded, loadedBytes, elapsed)
+    print(f"Cache aquecido com {loaded}/{len(resources)} recursos ({loadedBytes / 1024:.0f} KiB) em {elapsed:.2f}s")
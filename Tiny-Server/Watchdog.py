@@ -0,0 +1,97 @@
+import logging                         # Biblioteca de criação de logs
+import sys                             # Pilha do loop principal (sys._current_frames)
+import threading                       # Thread do watchdog
+import time                            # Duração das iterações do loop
+import traceback                       # Formatação da pilha do loop principal
+from typing import Optional            # Anotações de tipo
+import Metrics                         # Contador de travamentos
+from Configuration import ServerConfig # Configurações do Servidor
+
+"""
+Watchdog.py
+Módulo que detecta travamentos do loop principal do servidor
+Como o servidor processa tudo em uma única thread, uma requisição demorada atrasa todas as outras conexões
+O loop principal anota o instante em que cada iteração começa (e qual requisição está processando), e uma thread separada
+    verifica periodicamente se a iteração atual já passou do tempo limite
+Quando passa, a thread escreve no log o id e a linha da requisição sendo processada junto com a pilha do loop principal,
+    e conta o travamento nas métricas
+"""
+
+log = logging.getLogger("Main.Server.Watchdog")
+
+# Estado publicado pelo loop principal, lido pela thread do watchdog
+# Atribuições simples de atributos, então o loop não precisa de lock para atualizar eles
+busySince   = 0.0  # Instante (time.monotonic) em que a iteração atual começou, 0.0 enquanto o loop espera no select()
+requestId   = -1   # Id da requisição sendo processada
+requestLine = "-"  # Primeira linha da requisição sendo processada
+
+class LoopWatchdog(threading.Thread):
+    """
+    Classe que representa a thread que verifica se o loop principal travou
+    
+    Atributos da Classe:
+        [float] threshold: Duração em segundos de uma iteração do loop que é considerada um travamento
+        [int]   threadId:  Id da thread do loop principal
+    """
+    
+    def __init__(self, threshold:float) -> None:
+        super().__init__(name="LoopWatchdog", daemon=True)
+        
+        self.threshold = threshold
+        self.threadId  = threading.get_ident() # O watchdog é criado pelo loop principal
+        self.stopEvent = threading.Event()
+        self.reported  = 0.0 # Iteração (busySince) cujo travamento já foi registrado
+    
+    def stop(self) -> None:
+        """
+        Método que encerra a thread do watchdog
+        """
+        
+        self.stopEvent.set()
+        self.join()
+    
+    def check(self) -> None:
+        """
+        Método que verifica se a iteração atual do loop passou do tempo limite, registrando o travamento uma vez por iteração
+        """
+        
+        since = busySince
+        if since == 0.0 or since == self.reported:
+            return
+        
+        elapsed = time.monotonic() - since
+        if elapsed < self.threshold:
+            return
+        
+        self.reported = since
+        Metrics.loopStalls += 1
+        
+        frame = sys._current_frames().get(self.threadId)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "(pilha indisponível)\n"
+        
+        log.warning("Loop principal travado há %.3fs processando a requisição %d (%s):\n%s", elapsed, requestId, requestLine.rstrip(), stack)
+    
+    def run(self) -> None:
+        # Verificando duas vezes por tempo limite, assim um travamento é detectado com no máximo 1.5x o tempo limite
+        while not self.stopEvent.wait(self.threshold / 2):
+            self.check()
+
+def start_watchdog(serverConfig:ServerConfig) -> Optional[LoopWatchdog]:
+    """
+    Função que inicia o watchdog do loop principal, caso ele esteja habilitado nas configurações
+    Deve ser chamada pela thread do loop principal
+    
+    Recebe:
+        [ServerConfig] serverConfig: Configurações do servidor
+    
+    Retorna:
+        O watchdog iniciado, ou None caso ele esteja desabilitado
+    """
+    
+    if not serverConfig.configValue["watchdogEnabled"]:
+        return None
+    
+    watchdog = LoopWatchdog(serverConfig.configValue["watchdogThreshold"])
+    watchdog.start()
+    
+    return watchdog
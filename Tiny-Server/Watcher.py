@@ -0,0 +1,126 @@
+import logging                         # Biblioteca de criação de logs
+import threading                       # O observador roda em uma thread separada
+from typing import Callable, Optional  # Anotações de tipo
+import ContentIndex                    # Índice da pasta de conteúdo
+from ContentCache import ContentCache  # Cache de conteúdo
+
+"""
+Watcher.py
+Módulo que define o observador da pasta raiz de conteúdo
+O observador roda em uma thread separada e, a cada intervalo, verifica se arquivos foram adicionados, removidos ou modificados
+Quando encontra mudanças, atualiza o índice de conteúdo e invalida as entradas correspondentes no cache
+Assim, editar um post dentro de Content/ passa a valer sem precisar reiniciar o servidor
+Usa apenas polling (os.walk + os.stat), sem depender de bibliotecas fora da biblioteca padrão
+"""
+
+log = logging.getLogger("Main.Server.Watcher")
+
+class ContentWatcher(threading.Thread):
+    """
+    Classe que representa o observador da pasta de conteúdo
+    
+    Mudanças são agrupadas: quando uma mudança é detectada, o observador espera batchDelay segundos e verifica novamente,
+        até que a pasta pare de mudar, para aplicar todas as mudanças (por exemplo, de um editor que salva vários arquivos) de uma vez
+    
+    Outros módulos podem se inscrever para serem notificados das mudanças com o método subscribe
+    
+    Atributos da Classe:
+        [ContentIndex] index: O índice da pasta de conteúdo
+        [ContentCache] cache: O cache de conteúdo, pode ser None caso o cache esteja desabilitado
+        [float] interval:     Intervalo em segundos entre as verificações
+        [float] batchDelay:   Tempo em segundos esperado para agrupar mudanças
+    """
+    
+    def __init__(self, index:ContentIndex.ContentIndex, cache:Optional[ContentCache], interval:float, batchDelay:float) -> None:
+        super().__init__(name="ContentWatcher", daemon=True)
+        
+        self.index      = index
+        self.cache      = cache
+        self.interval   = interval
+        self.batchDelay = batchDelay
+        self.listeners: list[Callable[[list[str]], None]] = []
+        self.stopEvent  = threading.Event()
+    
+    def subscribe(self, listener:"Callable[[list[str]], None]") -> None:
+        """
+        Método que inscreve uma função para ser chamada sempre que arquivos mudarem
+        A função recebe a lista de caminhos de arquivos que foram adicionados, removidos ou modificados
+        
+        Recebe:
+            [Callable] listener: A função a ser chamada
+        
+        Retorna:
+            Nada
+        """
+        
+        self.listeners.append(listener)
+    
+    def stop(self) -> None:
+        """
+        Método que pede para o observador parar de executar
+        """
+        
+        self.stopEvent.set()
+    
+    def check(self) -> None:
+        """
+        Método que faz uma verificação da pasta de conteúdo e aplica as mudanças encontradas
+        
+        Recebe:
+            Nada
+        
+        Retorna:
+            Nada
+        """
+        
+        files, directories = ContentIndex.scan(self.index.contentRoot)
+        added, removed, modified = self.index.diff(files)
+        
+        if not (added or removed or modified):
+            return
+        
+        # Agrupando as mudanças até a pasta parar de mudar
+        while not self.stopEvent.wait(self.batchDelay):
+            newFiles, newDirectories = ContentIndex.scan(self.index.contentRoot)
+            if newFiles == files:
+                break
+            files, directories = newFiles, newDirectories
+            added, removed, modified = self.index.diff(files)
+        
+        changed = added + removed + modified
+        
+        # Um arquivo .gz pré-comprimido que muda invalida também o arquivo que ele comprime
+        changed += [path[:-len(".gz")] for path in changed if path.endswith(".gz")]
+        
+        # Primeiro o cache é invalidado, depois o índice é atualizado
+        # Assim nenhuma requisição encontra o arquivo novo no índice e o conteúdo antigo no cache
+        invalidated = self.cache.invalidate(changed) if self.cache is not None else 0
+        self.index.update(files, directories)
+        
+        for path in added:
+            log.info(f"Arquivo adicionado: {path}")
+        for path in removed:
+            log.info(f"Arquivo removido: {path}")
+        for path in modified:
+            log.info(f"Arquivo modificado: {path}")
+        log.info(f"{len(changed)} arquivos mudaram, {invalidated} entradas do cache invalidadas")
+        
+        for listener in self.listeners:
+            try:
+                listener(changed)
+            except Exception as err:
+                log.error(f"Erro ao notificar mudanças de conteúdo: {repr(err)}")
+    
+    def run(self) -> None:
+        """
+        Loop principal do observador, executado na thread separada
+        """
+        
+        log.info(f"Observando mudanças em {self.index.contentRoot} a cada {self.interval}s")
+        
+        while not self.stopEvent.wait(self.interval):
+            try:
+                self.check()
+            except Exception as err:
+                # Um erro no observador não pode derrubar o servidor
+                log.error(f"Erro ao verificar mudanças de conteúdo: {repr(err)}")
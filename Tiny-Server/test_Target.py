@@ -0,0 +1,120 @@
+import unittest                        # Testes unitários da biblioteca padrão
+import Target                          # Módulo testado
+from Exceptions import BadRequest, Forbidden # Erros esperados
+
+"""
+test_Target.py
+Testes da interpretação do alvo das requisições (ver Target.py)
+Como o caminho normalizado é a chave dos caches e decide se o arquivo está dentro da pasta de conteúdo,
+    os casos cobrem principalmente as tentativas de sair da pasta e os caminhos que precisam ser recusados
+
+Para rodar, dentro da pasta Tiny-Server:
+    python3 -m unittest test_Target
+"""
+
+class TestNormalizePath(unittest.TestCase):
+    """
+    Testes de Target.normalize_path
+    """
+    
+    def test_fast_path(self) -> None:
+        # Caminhos sem nada para decodificar ou normalizar são retornados sem alteração
+        path = "/about/index.html"
+        self.assertIs(Target.normalize_path(path), path)
+        self.assertEqual(Target.normalize_path("/about/"), "/about/")
+        self.assertEqual(Target.normalize_path("/"), "/")
+    
+    def test_dot_segments(self) -> None:
+        self.assertEqual(Target.normalize_path("/about/./index.html"), "/about/index.html")
+        self.assertEqual(Target.normalize_path("/about//index.html"), "/about/index.html")
+        self.assertEqual(Target.normalize_path("/about/../cv/index.html"), "/cv/index.html")
+    
+    def test_dot_dot_outside_root(self) -> None:
+        self.assertRaises(Forbidden, Target.normalize_path, "/../config.toml")
+        self.assertRaises(Forbidden, Target.normalize_path, "/about/../../config.toml")
+    
+    def test_encoded_dot_dot(self) -> None:
+        # "." e ".." codificados são resolvidos depois da decodificação, como os não codificados
+        self.assertRaises(Forbidden, Target.normalize_path, "/%2e%2e/config.toml")
+        self.assertRaises(Forbidden, Target.normalize_path, "/%2E%2E/config.toml")
+        self.assertRaises(Forbidden, Target.normalize_path, "/about/.%2e/%2e./config.toml")
+        self.assertEqual(Target.normalize_path("/about/%2e%2e/cv/"), "/cv/")
+        self.assertEqual(Target.normalize_path("/about/%2e/index.html"), "/about/index.html")
+    
+    def test_encoded_slash(self) -> None:
+        # Segmentos formados por %2F também são resolvidos, então não escondem um ".." da verificação
+        self.assertRaises(Forbidden, Target.normalize_path, "/about%2F..%2F..%2Fconfig.toml")
+        self.assertRaises(Forbidden, Target.normalize_path, "/%2F..%2Fconfig.toml")
+        self.assertEqual(Target.normalize_path("/about%2F..%2Fcv%2Findex.html"), "/cv/index.html")
+        self.assertEqual(Target.normalize_path("/about%2Findex.html"), "/about/index.html")
+    
+    def test_nul(self) -> None:
+        with self.assertRaises(BadRequest) as caught:
+            Target.normalize_path("/index.html%00.png")
+        self.assertEqual(caught.exception.code, 400)
+    
+    def test_invalid_utf8(self) -> None:
+        for path in ("/%ff.html", "/%c3", "/%c3%28/index.html"):
+            with self.subTest(path=path):
+                with self.assertRaises(BadRequest) as caught:
+                    Target.normalize_path(path)
+                self.assertEqual(caught.exception.code, 400)
+    
+    def test_valid_utf8(self) -> None:
+        self.assertEqual(Target.normalize_path("/caf%C3%A9/"), "/café/")
+    
+    def test_trailing_slash(self) -> None:
+        # Um caminho que termina em "/", "/." ou "/.." é uma pasta, então a barra é mantida
+        self.assertEqual(Target.normalize_path("/about/cv/.."), "/about/")
+        self.assertEqual(Target.normalize_path("/about/cv/%2e%2e"), "/about/")
+        self.assertEqual(Target.normalize_path("/about/."), "/about/")
+        self.assertEqual(Target.normalize_path("/about//"), "/about/")
+        self.assertEqual(Target.normalize_path("/about/.."), "/")
+        self.assertEqual(Target.normalize_path("/about/./index.html"), "/about/index.html")
+
+class TestSplitTarget(unittest.TestCase):
+    """
+    Testes de Target.split_target
+    """
+    
+    def test_origin_form(self) -> None:
+        self.assertEqual(Target.split_target("/about/"), ("/about/", ""))
+        self.assertEqual(Target.split_target("/about/?utm_source=x"), ("/about/", "utm_source=x"))
+        self.assertEqual(Target.split_target("/about/#top"), ("/about/", ""))
+        self.assertEqual(Target.split_target("/about/?a=1#top"), ("/about/", "a=1"))
+    
+    def test_absolute_form(self) -> None:
+        self.assertEqual(Target.split_target("http://example.com/about/?a=1"), ("/about/", "a=1"))
+        self.assertEqual(Target.split_target("https://example.com:8443/about/index.html"), ("/about/index.html", ""))
+        self.assertEqual(Target.split_target("http://example.com"), ("/", ""))
+        self.assertEqual(Target.split_target("http://example.com/"), ("/", ""))
+    
+    def test_absolute_form_without_path(self) -> None:
+        # Sem caminho, a query e o fragmento começam logo depois do host
+        self.assertEqual(Target.split_target("http://example.com?x"), ("/", "x"))
+        self.assertEqual(Target.split_target("http://example.com:8080?a=1#top"), ("/", "a=1"))
+        self.assertEqual(Target.split_target("http://example.com#top"), ("/", ""))
+    
+    def test_invalid(self) -> None:
+        for target in ("about/", "*", "", "ftp://example.com/"):
+            with self.subTest(target=target):
+                with self.assertRaises(BadRequest) as caught:
+                    Target.split_target(target)
+                self.assertEqual(caught.exception.code, 400)
+
+class TestParseTarget(unittest.TestCase):
+    """
+    Testes de Target.parse_target, que junta as funções acima e gera a chave canônica do recurso
+    """
+    
+    def test_same_resource(self) -> None:
+        targets = ("/about/", "/about/index.html", "/about/./index.html", "/about/index.html?utm_source=x",
+                   "/about/%69ndex.html", "http://example.com/about/")
+        keys = {Target.parse_target(target, "dist")[2] for target in targets}
+        self.assertEqual(keys, {"dist/about/index.html"})
+    
+    def test_root(self) -> None:
+        self.assertEqual(Target.parse_target("http://example.com?x", "dist"), ("/", "x", "dist/index.html"))
+
+if __name__ == "__main__":
+    unittest.main()